@@ -0,0 +1,195 @@
+"""Read-only, memory-mapped access to a directory archive (see weather_archive).
+Every column of every location is mapped with np.load(mmap_mode="r"): opening an
+archive reads only the manifest, date-range selections are binary searches that
+return views into the mapping, and pages are loaded by the kernel on first touch.
+Because the mappings are read-only and file-backed, any number of analyst
+processes reading the same archive share a single copy in the OS page cache.
+
+ArchiveReader implements the read side of DBOperations (fetch_data, fetch_page,
+fetch_month_distributions, get_stations, ...), so the viewer and plots can use
+either source.
+"""
+import numpy as np
+from observations import WeatherRecord
+from rollups import SKETCH_SCALE
+from weather_archive import COLUMNS, archive_kind, load_archive, restore_column
+
+
+class ArchiveView:
+    """
+    Date-range selection of one location: zero-copy views of the archive columns.
+    """
+
+    def __init__(self, location, day, min_temp, max_temp, mean_temp):
+        self.location = location
+        self.day = day  # int32 days since 1970-01-01
+        self.min_temp = min_temp
+        self.max_temp = max_temp
+        self.mean_temp = mean_temp
+
+    def __len__(self):
+        return len(self.day)
+
+    @property
+    def dates(self):
+        """
+        The days as datetime64[D] (a converted copy; the day column itself is int32).
+        """
+        return self.day.astype("datetime64[D]")
+
+    def records(self):
+        """
+        :return: List of WeatherRecord tuples as DBOperations.fetch_data returns them; the id is None,
+        and missing temperatures are None as in the database.
+        """
+        if not len(self):
+            return []
+        dates = np.datetime_as_string(self.dates).tolist()
+        columns = [restore_column(values) for values in (self.min_temp, self.max_temp, self.mean_temp)]
+        return [WeatherRecord(None, date, self.location, *temperatures) for date, *temperatures in zip(dates, *columns)]
+
+
+class ArchiveReader:
+    """
+    Read-only data source backed by a memory-mapped directory archive.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Directory written by weather_archive.export_archive.
+        :raises ValueError: If the path is not a directory archive (.npz and .parquet cannot be mapped).
+        """
+        if archive_kind(path) != "dir":
+            raise ValueError(f"Only directory archives can be memory-mapped, not {path!r}")
+        self.path = path
+        self.manifest, self.columns = load_archive(path, mmap=True)
+        self.entries = {entry["location"]: entry for entry in self.manifest["stations"]}
+
+    def view(self, location, start_date=None, end_date=None):
+        """
+        Selects the days of a location between two dates (inclusive) with binary searches.
+        :param location: Location name.
+        :param start_date: First date (date, datetime64 or "YYYY-MM-DD"); None for the first stored day.
+        :param end_date: Last date; None for the last stored day.
+        :return: ArchiveView whose columns are views into the mapped files.
+        """
+        columns = self.columns.get(location)
+        if columns is None:
+            empty = np.array([], dtype=np.float32)
+            return ArchiveView(location, np.array([], dtype=np.int32), empty, empty, empty)
+        day = columns["day"]
+        start = 0 if start_date is None else np.searchsorted(day, _day_number(start_date), side="left")
+        stop = len(day) if end_date is None else np.searchsorted(day, _day_number(end_date), side="right")
+        return ArchiveView(location, day[start:stop], *(columns[name][start:stop] for name in COLUMNS))
+
+    def series(self, location="Winnipeg"):
+        """
+        :return: The location's full history as a WeatherSeries; the temperature
+        arrays are the mapped columns themselves.
+        """
+        from weather_series import WeatherSeries
+        selection = self.view(location)
+        return WeatherSeries(selection.dates, selection.min_temp, selection.max_temp, selection.mean_temp, location)
+
+    # Read side of the DBOperations interface
+
+    def get_stations(self):
+        """
+        :return: List of (station_id, location, province, first_year) tuples ordered by location.
+        """
+        # Sort on the location alone: station_id is None for locations without a registered station
+        return sorted(((entry.get("station_id"), location, entry.get("province"), entry.get("first_year"))
+                       for location, entry in self.entries.items()), key=lambda station: station[1])
+
+    def get_station(self, location):
+        entry = self.entries.get(location)
+        if entry is None:
+            return None
+        return entry.get("station_id"), location, entry.get("province"), entry.get("first_year")
+
+    def get_high_water_mark(self, location="Winnipeg"):
+        entry = self.entries.get(location)
+        return entry["last_date"] if entry else None
+
+    def fetch_data(self, location="Winnipeg"):
+        return self.view(location).records()
+
+    def fetch_data_range(self, location, start_date, end_date):
+        return self.view(location, start_date, end_date).records()
+
+    def fetch_month_data(self, location, year, month):
+        return self.fetch_data_range(location, f"{year:04d}-{month:02d}-01", _month_end(year, month))
+
+    def fetch_page(self, location, page_size=50, after=None, before=None):
+        """
+        Same contract as DBOperations.fetch_page, served from a binary search.
+        """
+        columns = self.columns.get(location)
+        if columns is None:
+            return []
+        day = columns["day"]
+        if after is None and before is not None:
+            stop = np.searchsorted(day, _day_number(before), side="left")
+            start = max(0, stop - page_size)
+        else:
+            start = 0 if after is None else np.searchsorted(day, _day_number(after), side="right")
+            stop = start + page_size
+        return ArchiveView(location, day[start:stop], *(columns[name][start:stop] for name in COLUMNS)).records()
+
+    def iter_records(self, location, batch_size=1000):
+        columns = self.columns.get(location)
+        total = 0 if columns is None else len(columns["day"])
+        for start in range(0, total, batch_size):
+            stop = start + batch_size
+            yield from ArchiveView(location, columns["day"][start:stop],
+                                   *(columns[name][start:stop] for name in COLUMNS)).records()
+
+    def fetch_daily_means(self, location, year, month):
+        """
+        :return: List of (day, avg_temp) tuples ordered by day; days without a mean are left out.
+        """
+        selection = self.view(location, f"{year:04d}-{month:02d}-01", _month_end(year, month))
+        present = ~np.isnan(selection.mean_temp)
+        first_day = int(np.datetime64(f"{year:04d}-{month:02d}-01", "D").astype(np.int64))
+        days = (selection.day[present] - first_day + 1).tolist()
+        means = np.round(selection.mean_temp[present].astype(np.float64), 4).tolist()
+        return list(zip(days, means))
+
+    def fetch_monthly_means(self, location, start_year, end_year):
+        """
+        :return: Dictionary mapping month number (1-12) to a list of daily mean temperatures.
+        """
+        series = self.series(location).year_range(start_year, end_year)
+        return {month: np.round(values.astype(np.float64), 4).tolist()
+                for month, values in series.group_by_month().items()}
+
+    def fetch_month_distributions(self, location, start_year, end_year):
+        """
+        Builds the per-month sketches DBOperations reads from its rollup table, with one
+        vectorized pass over the mapped mean column.
+        :return: Dictionary mapping month number (1-12) to a sketch of its daily mean temperatures.
+        """
+        selection = self.view(location, f"{start_year:04d}-01-01", f"{end_year:04d}-12-31")
+        present = ~np.isnan(selection.mean_temp)
+        months = selection.day[present].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12 + 1
+        bins = np.round(selection.mean_temp[present].astype(np.float64) * SKETCH_SCALE).astype(np.int64)
+        # One flat key per (month, bin) pair, so a single 1-D np.unique does the counting
+        keys, counts = np.unique(months * 2 ** 32 + (bins + 2 ** 31), return_counts=True)
+        sketches = {month: {} for month in range(1, 13)}
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            sketches[key >> 32][(key & 0xFFFFFFFF) - 2 ** 31] = count
+        return sketches
+
+    def close(self):
+        """
+        Drops the mappings (they are also released when the reader is garbage collected).
+        """
+        self.columns = {}
+
+
+def _day_number(value):
+    return np.int32(np.datetime64(str(value), "D").astype(np.int64))
+
+
+def _month_end(year, month):
+    return str((np.datetime64(f"{year:04d}-{month:02d}", "M") + 1).astype("datetime64[D]") - 1)
@@ -0,0 +1,221 @@
+"""Asyncio ingest pipeline: download, parse and store as three concurrent stages.
+Month pages are downloaded by a pool of fetch tasks, parsed by parse tasks in an
+executor (threads, or the process pool of parse_pool) and stored by a single
+writer task, which upserts several parsed months in one save_data transaction.
+The stages are connected by bounded asyncio queues: when the database is busy
+committing, the queues fill up and the fetch tasks wait instead of piling pages
+up in memory, and while a batch is being committed the network and the parser
+keep working on the next months.
+
+Stopping (Ctrl+C, a cancel event, or cancelling the ingest task) only stops new
+downloads. Pages already downloaded are still parsed and stored, and the writer
+finishes its current transaction, so no month is left half written or fetched
+for nothing.
+"""
+import asyncio
+import signal
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import metrics
+from observations import ObservationBatch
+from parse_pool import parse_pages
+
+_DONE = object()  # Queue sentinel: the stage feeding the queue has finished
+
+
+class AsyncIngest:
+    """
+    Downloads, parses and stores a list of months for one location.
+    """
+
+    def __init__(self, db, scraper, location="Winnipeg", fetch_workers=4, parse_workers=1, queue_size=8,
+                 batch_months=6, last_date=None, on_month=None, parse_executor=None, pages_per_task=1):
+        """
+        :param db: DBOperations instance the months are upserted into.
+        :param scraper: WeatherScraper whose get_page (page cache, rate limiter, retries) downloads the pages.
+        :param location: Location the rows are stored under.
+        :param fetch_workers: Month pages downloaded at the same time.
+        :param parse_workers: Month pages parsed at the same time.
+        :param queue_size: Maximum number of months waiting between two stages.
+        :param batch_months: Maximum number of months upserted in one transaction.
+        :param last_date: Optional date; later days (e.g. the rest of the current month) are not stored.
+        :param on_month: Optional callable receiving ((year, month), ObservationBatch stored, or None if
+        the month failed) after each batch is committed; it runs on the writer thread and may use db.
+        :param parse_executor: Executor running parse_pool.parse_pages (defaults to the loop's thread pool),
+        e.g. a process pool from parse_pool.create_parse_pool.
+        :param pages_per_task: Maximum number of waiting pages handed to the executor at once.
+        """
+        self.db = db
+        self.scraper = scraper
+        self.location = location
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.batch_months = batch_months
+        self.last_date = last_date
+        self.on_month = on_month
+        self.parse_executor = parse_executor
+        self.pages_per_task = pages_per_task
+
+    def run(self, months, cancel=None):
+        """
+        Runs the pipeline to completion on a new event loop.
+        Ctrl+C stops new downloads and drains the pipeline instead of raising KeyboardInterrupt.
+        :param months: Iterable of (year, month) tuples, in the order to download them.
+        :param cancel: Optional threading.Event with the same effect as Ctrl+C.
+        :return: Summary dictionary (see ingest).
+        """
+        return asyncio.run(self._main(months, cancel))
+
+    async def _main(self, months, cancel):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        if cancel is not None and cancel.is_set():
+            stop.set()
+        try:
+            loop.add_signal_handler(signal.SIGINT, stop.set)
+            handles_sigint = True
+        except (NotImplementedError, RuntimeError):
+            handles_sigint = False  # Not on the main thread, or not supported by the platform
+        watcher = asyncio.create_task(self._watch(cancel, stop)) if cancel is not None else None
+        try:
+            return await self.ingest(months, stop)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if handles_sigint:
+                loop.remove_signal_handler(signal.SIGINT)
+
+    @staticmethod
+    async def _watch(cancel, stop, interval=0.1):
+        while not cancel.is_set():
+            await asyncio.sleep(interval)
+        stop.set()
+
+    async def ingest(self, months, stop=None):
+        """
+        Downloads, parses and stores months on the running event loop.
+        :param months: Iterable of (year, month) tuples, in the order to download them.
+        :param stop: Optional asyncio.Event; once set, no new month is downloaded and the pipeline drains.
+        :return: Dictionary with "inserted", "updated" and "skipped" row counts, the months "stored",
+        the months that "failed" and whether the run was "interrupted" (stopped with months neither stored
+        nor failed).
+        """
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Room for a full chunk per parse task, so every worker can be kept busy
+        fetched = asyncio.Queue(maxsize=max(self.queue_size, self.parse_workers * self.pages_per_task))
+        parsed = asyncio.Queue(maxsize=self.queue_size)
+        summary = {"inserted": 0, "updated": 0, "skipped": 0, "stored": [], "failed": [], "interrupted": False}
+        months = list(months)
+        pending = iter(months)
+        # Blocking downloads get threads of their own; one writer thread keeps SQLite to a single connection
+        fetch_executor = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="ingest-fetch")
+        write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-write")
+        fetchers = [asyncio.create_task(self._fetch_stage(pending, fetched, stop, fetch_executor))
+                    for _ in range(self.fetch_workers)]
+        parsers = [asyncio.create_task(self._parse_stage(fetched, parsed)) for _ in range(self.parse_workers)]
+        tasks = [*fetchers, *parsers,
+                 asyncio.create_task(self._close_after(fetchers, fetched, self.parse_workers)),
+                 asyncio.create_task(self._close_after(parsers, parsed, 1)),
+                 asyncio.create_task(self._write_stage(parsed, summary, write_executor))]
+        try:
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            except asyncio.CancelledError:
+                stop.set()
+                await asyncio.wait(tasks)
+                raise
+            failed = [task for task in done if not task.cancelled() and task.exception() is not None]
+            if failed:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise failed[0].exception()
+        finally:
+            fetch_executor.shutdown(wait=False, cancel_futures=True)
+            # Never return while a transaction is still being written
+            await loop.run_in_executor(None, write_executor.shutdown)
+        handled = set(summary["stored"]) | set(summary["failed"])
+        summary["interrupted"] = any(key not in handled for key in months)
+        return summary
+
+    async def _fetch_stage(self, pending, fetched, stop, executor):
+        loop = asyncio.get_running_loop()
+        # Check stop before taking a month, so a stopped pipeline leaves every untaken month pending
+        while not stop.is_set():
+            key = next(pending, None)
+            if key is None:
+                break
+            year, month = key
+            try:
+                html = await loop.run_in_executor(executor, self.scraper.get_page, year, month)
+            except requests.exceptions.RequestException as e:
+                print(f"[ERROR] Request failed for {year}-{month:02d}: {e}")
+                html = None
+            await fetched.put(((year, month), html))
+
+    async def _parse_stage(self, fetched, parsed):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            items = [await fetched.get()]
+            # Pages already waiting go to the executor together, which matters for a process pool
+            while items[-1] is not _DONE and len(items) < self.pages_per_task and not fetched.empty():
+                items.append(fetched.get_nowait())
+            if items[-1] is _DONE:
+                items.pop()
+                finished = True
+            pages = [(html, year, month) for (year, month), html in items if html is not None]
+            results = iter(())
+            if pages:
+                with metrics.span("parse"):
+                    results = iter(await loop.run_in_executor(self.parse_executor, parse_pages, pages))
+            for (year, month), html in items:
+                month_data = None if html is None else next(results)
+                if isinstance(month_data, Exception):
+                    print(f"[ERROR] Failed to parse HTML for {year}-{month:02d}: {month_data}")
+                    month_data = None
+                elif month_data is not None:
+                    metrics.increment("rows_parsed", len(month_data))
+                await parsed.put(((year, month), month_data))
+
+    @staticmethod
+    async def _close_after(producers, queue, consumers):
+        await asyncio.wait(producers)
+        for _ in range(consumers):
+            await queue.put(_DONE)
+
+    async def _write_stage(self, parsed, summary, executor):
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            items = [await parsed.get()]
+            # Take whatever else is already waiting, so a busy pipeline commits several months at once
+            while len(items) < self.batch_months and not parsed.empty():
+                items.append(parsed.get_nowait())
+            if items[-1] is _DONE:
+                items.pop()
+                finished = True
+            if items:
+                await loop.run_in_executor(executor, self._store, items, summary)
+
+    def _store(self, items, summary):
+        """
+        Upserts a batch of parsed months in one transaction, then reports each month to on_month.
+        """
+        stored = [(key, month_data if self.last_date is None else month_data.until(self.last_date))
+                  for key, month_data in items if month_data is not None]
+        rows = ObservationBatch()
+        for _, month_data in stored:
+            rows.extend(month_data)
+        if rows:
+            counts = self.db.save_data(rows, self.location, chunk_size=len(rows))
+            for name, count in counts.items():
+                summary[name] += count
+        summary["stored"].extend(key for key, _ in stored)
+        summary["failed"].extend(key for key, month_data in items if month_data is None)
+        if self.on_month is not None:
+            results = dict(stored)
+            for key, _ in items:
+                self.on_month(key, results.get(key))
@@ -0,0 +1,143 @@
+"""Resumable, checkpointed download of a station's full history.
+Each month is stored and checkpointed in the backfill_months table as soon as it
+is parsed, so an interrupted backfill (Ctrl+C, a crash, a network outage) keeps
+everything stored so far. Running it again skips the completed months and
+retries only the failed and missing ones. Months are fetched through
+WeatherScraper.iter_months, which keeps a small bounded window in flight, so
+memory holds a few months of rows rather than the whole history.
+
+A month is checkpointed after its rows are committed. If the process dies in
+between, the month is fetched again on the next run; save_data upserts, so
+storing it twice is harmless.
+
+run(..., pipeline="async") drives the same checkpoints through the asyncio
+pipeline in async_ingest, which overlaps downloading, parsing and storing and
+upserts several months per transaction. Given parse_processes, that pipeline
+parses on a process pool (parse_pool), for backfills served from the page cache
+where parsing rather than the network is the bottleneck.
+"""
+from datetime import date
+from scrape_weather import month_range
+
+
+class Backfill:
+    """
+    Downloads a range of months for one location, resuming from its checkpoints.
+    """
+
+    def __init__(self, db, scraper, location="Winnipeg", max_workers=4, parse_processes=None):
+        """
+        :param db: DBOperations instance to store rows and checkpoints in.
+        :param scraper: WeatherScraper for the location's station.
+        :param location: Location the rows are stored under.
+        :param max_workers: Worker threads downloading months concurrently.
+        :param parse_processes: Worker processes parsing pages in the async pipeline (None parses on threads).
+        """
+        self.db = db
+        self.scraper = scraper
+        self.location = location
+        self.max_workers = max_workers
+        self.parse_processes = parse_processes
+
+    def plan(self, start_year, start_month, end_year, end_month):
+        """
+        Lists the months of a range that still need downloading: never attempted, failed, or
+        stored while still in progress (the current month is never final).
+        :return: List of (year, month) tuples, newest first.
+        """
+        status = self.db.fetch_backfill_status(self.location)
+        return [key for key in month_range(start_year, start_month, end_year, end_month)
+                if status.get(key, ("missing",))[0] != "done"]
+
+    def run(self, start_year, start_month, end_year, end_month, cancel=None, progress=None, pipeline="threads"):
+        """
+        Downloads, stores and checkpoints every pending month of a range, newest first.
+        Interrupting it with Ctrl+C (or the cancel event) keeps all completed months.
+        :param start_year: Most recent year.
+        :param start_month: Most recent month.
+        :param end_year: Oldest year.
+        :param end_month: Oldest month.
+        :param cancel: Optional threading.Event; once set, the run stops after the month being stored.
+        :param progress: Optional callable receiving ((year, month), rows saved or None if it failed);
+        with the async pipeline, months are upserted in batches and rows saved is the number of rows stored.
+        :param pipeline: "threads" (WeatherScraper.iter_months, one transaction per month) or "async"
+        (async_ingest.AsyncIngest).
+        :return: Dictionary with "inserted", "updated" and "skipped" row counts, the number of months
+        "done" and "failed" in this run, the months still "remaining" and whether it was "interrupted".
+        """
+        if pipeline not in ("threads", "async"):
+            raise ValueError(f"pipeline must be 'threads' or 'async', not {pipeline!r}")
+        months = self.plan(start_year, start_month, end_year, end_month)
+        summary = {"inserted": 0, "updated": 0, "skipped": 0, "done": 0, "failed": 0,
+                   "remaining": len(months), "interrupted": False}
+        today = date.today()
+        if pipeline == "async":
+            return self._run_async(months, summary, today, cancel, progress)
+        month_iter = self.scraper.iter_months(months, max(1, min(self.max_workers, len(months))))
+        try:
+            for (year, month), month_data in month_iter:
+                if month_data is None:
+                    self._checkpoint((year, month), None, summary, today)
+                    saved = None
+                else:
+                    rows = month_data.until(today)
+                    counts = self.db.save_data(rows, self.location)
+                    for name, count in counts.items():
+                        summary[name] += count
+                    saved = counts["inserted"] + counts["updated"]
+                    self._checkpoint((year, month), rows, summary, today)
+                if progress is not None:
+                    progress((year, month), saved)
+                if cancel is not None and cancel.is_set():
+                    summary["interrupted"] = True
+                    break
+        except KeyboardInterrupt:
+            summary["interrupted"] = True
+        finally:
+            month_iter.close()
+        return self._finish(summary)
+
+    def _run_async(self, months, summary, today, cancel, progress):
+        from async_ingest import AsyncIngest
+
+        def checkpoint(key, rows):
+            self._checkpoint(key, rows, summary, today)
+            if progress is not None:
+                progress(key, None if rows is None else len(rows))
+
+        if self.parse_processes:
+            from parse_pool import PAGES_PER_TASK, create_parse_pool
+            with create_parse_pool(self.parse_processes) as pool:
+                # Two chunks per process, so a worker never waits for the parent between chunks
+                ingest = AsyncIngest(self.db, self.scraper, self.location, fetch_workers=self.max_workers,
+                                     parse_workers=2 * self.parse_processes, last_date=today, on_month=checkpoint,
+                                     parse_executor=pool, pages_per_task=PAGES_PER_TASK)
+                result = ingest.run(months, cancel)
+        else:
+            ingest = AsyncIngest(self.db, self.scraper, self.location, fetch_workers=self.max_workers,
+                                 last_date=today, on_month=checkpoint)
+            result = ingest.run(months, cancel)
+        for name in ("inserted", "updated", "skipped"):
+            summary[name] += result[name]
+        summary["interrupted"] = result["interrupted"]
+        return self._finish(summary)
+
+    def _checkpoint(self, key, rows, summary, today):
+        """
+        Records a month as done (or partial, for the current month) once its rows are stored, or as failed.
+        """
+        year, month = key
+        if rows is None:
+            self.db.mark_backfill_month(self.location, year, month, "failed", error="download or parse failed")
+            summary["failed"] += 1
+            return
+        final = (year, month) < (today.year, today.month)
+        self.db.mark_backfill_month(self.location, year, month, "done" if final else "partial", len(rows))
+        summary["done"] += 1
+        summary["remaining"] -= 1
+
+    def _finish(self, summary):
+        status = "ok" if not (summary["failed"] or summary["interrupted"]) else \
+            f"backfill incomplete: {summary['remaining']} months left"
+        self.db.record_sync(self.location, status, summary["inserted"] + summary["updated"])
+        return summary
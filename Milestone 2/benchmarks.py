@@ -0,0 +1,565 @@
+"""Benchmarks for the scrape, parse, store and plot paths.
+Runs against the local stub server in stub_server.py, so no network access is needed;
+month pages recorded with "stub_server.py --record" are used when --pages-dir is given.
+Results can be written as JSON and compared with an earlier run to catch regressions.
+
+Usage:
+    python benchmarks.py                                  # full suite
+    python benchmarks.py --quick --only parse,save        # smaller inputs, selected benchmarks
+    python benchmarks.py --json after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from html.parser import HTMLParser
+from backfill import Backfill
+from db_operations import DBOperations
+from dbcm import DBCM
+from scrape_weather import WeatherScraper, RateLimiter
+from stub_server import StubServer, load_page
+from parse_pool import create_parse_pool, parse_all, parse_pages
+
+
+class LegacyWeatherParser(HTMLParser):
+    """
+    The HTMLParser state machine WeatherScraper used before table_parser,
+    kept as the baseline for the parse benchmark.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.in_table = False
+        self.in_row = False
+        self.in_td = False
+        self.current_data = []
+        self.valid_row = False
+        self.all_data = []
+        self.col_index = 0
+
+    def handle_starttag(self, tag, attrs):
+        dict(attrs)  # The original parser built an attribute dict for every tag
+        if tag == "table":
+            self.in_table = True
+        elif self.in_table and tag == "tr":
+            self.in_row = True
+            self.col_index = 0
+            self.current_data = []
+            self.valid_row = False
+        elif self.in_row and tag == "td":
+            self.in_td = True
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            self.in_table = False
+        elif tag == "tr":
+            if self.valid_row and len(self.current_data) >= 3:
+                self.all_data.append(self.current_data.copy())
+            self.in_row = False
+        elif tag == "td":
+            self.in_td = False
+
+    def handle_data(self, data):
+        if self.in_td:
+            data = data.strip()
+            if data.replace(".", "").replace("-", "").isdigit():
+                if self.col_index < 3:
+                    self.current_data.append(float(data))
+                    self.valid_row = True
+                self.col_index += 1
+
+
+def legacy_parse_month_page(html, year, month):
+    """
+    Parses a page the way the original scraper did (rows keyed by position, last three dropped).
+    """
+    parser = LegacyWeatherParser()
+    parser.feed(html)
+    return {
+        f"{year}-{month:02d}-{i+1:02d}": {"Max": row[0], "Min": row[1], "Mean": row[2]}
+        for i, row in enumerate(parser.all_data[:-3])
+    }
+
+
+def fixture_pages(count=120, pages_dir=None):
+    """
+    Builds a deterministic set of month pages to parse.
+    :param pages_dir: Optional directory of recorded pages, used where it holds a month.
+    :return: List of (html, year, month) tuples.
+    """
+    pages = []
+    for index in range(count):
+        year, month = 2000 + index // 12, index % 12 + 1
+        pages.append((load_page(year, month, pages_dir=pages_dir), year, month))
+    return pages
+
+
+def bench_parse(repeat=3, pages_dir=None):
+    """
+    Compares pages/sec of WeatherScraper.parse_month (table_parser) with the legacy HTMLParser state machine.
+    :param repeat: Number of passes over the fixture pages (best pass is reported).
+    :return: Dictionary of parser name to pages per second.
+    """
+    pages = fixture_pages(pages_dir=pages_dir)
+    scraper = WeatherScraper("http://127.0.0.1")
+    results = {}
+    for name, parse in (("legacy HTMLParser", legacy_parse_month_page), ("WeatherScraper", scraper.parse_month)):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for html, year, month in pages:
+                parse(html, year, month)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(pages) / best
+    return results
+
+
+def bench_parse_pool(process_counts=(1, 2, 4), passes=8, pages_dir=None):
+    """
+    Measures pages/sec of parse_pool on process pools of several sizes, against parsing in-process.
+    Pools are started and warmed up before timing, as a long backfill amortizes their start-up.
+    :param process_counts: Pool sizes to compare.
+    :param passes: Copies of the fixture pages parsed per run.
+    :return: Dictionary mapping label to pages per second.
+    """
+    pages = fixture_pages(pages_dir=pages_dir) * passes
+    started = time.perf_counter()
+    parse_pages(pages)
+    results = {"in-process": len(pages) / (time.perf_counter() - started)}
+    for processes in process_counts:
+        with create_parse_pool(processes) as pool:
+            list(parse_all(pages[:processes * 16], pool))
+            started = time.perf_counter()
+            list(parse_all(pages, pool))
+            results[f"processes={processes}"] = len(pages) / (time.perf_counter() - started)
+    return results
+
+
+def bench_parallel_fetch(worker_counts=(1, 2, 4, 8), months=24, latency=0.05, pages_dir=None):
+    """
+    Measures wall-clock time of a month backfill for several worker counts.
+    :param worker_counts: Worker pool sizes to compare.
+    :param months: Number of months to scrape per run.
+    :param latency: Simulated server round trip in seconds.
+    :return: List of (workers, seconds, days scraped) tuples.
+    """
+    end_year, end_month = 2023, 1
+    start_year, start_month = end_year + (end_month - 1 + months - 1) // 12, (end_month - 1 + months - 1) % 12 + 1
+    results = []
+    with StubServer(latency=latency, pages_dir=pages_dir) as server:
+        for workers in worker_counts:
+            scraper = WeatherScraper(server.url, RateLimiter(max_concurrent=workers, requests_per_second=None))
+            started = time.perf_counter()
+            data = scraper.fetch_weather_data_parallel(start_year, start_month, end_year, end_month,
+                                                       max_workers=workers)
+            results.append((workers, time.perf_counter() - started, len(data)))
+    return results
+
+
+def bench_ingest(months=120, latency=0.02, workers=4, pages_dir=None):
+    """
+    Measures wall-clock time of a checkpointed backfill into a fresh database with each pipeline:
+    threads (one transaction per month) and async (overlapped stages, batched transactions).
+    :param months: Number of months to download.
+    :param latency: Simulated server round trip in seconds.
+    :param workers: Concurrent downloads.
+    :return: Dictionary mapping pipeline to seconds.
+    """
+    end_year, end_month = 2010, 1
+    start_year, start_month = end_year + (end_month - 1 + months - 1) // 12, (end_month - 1 + months - 1) % 12 + 1
+    results = {}
+    with StubServer(latency=latency, pages_dir=pages_dir) as server:
+        for pipeline in ("threads", "async"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db = DBOperations(os.path.join(tmp_dir, "bench.db"))
+                scraper = WeatherScraper(server.url, RateLimiter(max_concurrent=workers, requests_per_second=None))
+                job = Backfill(db, scraper, "Winnipeg", max_workers=workers)
+                started = time.perf_counter()
+                job.run(start_year, start_month, end_year, end_month, pipeline=pipeline)
+                results[pipeline] = time.perf_counter() - started
+                db.close()
+    return results
+
+
+def bench_small_queries(queries=500):
+    """
+    Compares small-query latency with a connection per call against the persistent per-thread connection.
+    :param queries: Number of single-month queries to run per mode.
+    :return: Dictionary of mode name to microseconds per query.
+    """
+    sql = "SELECT * FROM weather_data WHERE location = ? AND sample_date LIKE ?"
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DBOperations(os.path.join(tmp_dir, "bench.db"))
+        db.save_data({f"2020-{m:02d}-{d:02d}": {"Min": -1.0, "Max": 1.0, "Mean": 0.0}
+                      for m in range(1, 13) for d in range(1, 29)})
+        for name, manager in (("connection per call", None), ("persistent connection", db.connections)):
+            started = time.perf_counter()
+            for i in range(queries):
+                with DBCM(db.db_name, manager) as cursor:
+                    cursor.execute(sql, ("Winnipeg", f"2020-{i % 12 + 1:02d}-%"))
+                    cursor.fetchall()
+            results[name] = (time.perf_counter() - started) / queries * 1e6
+        uncached = DBOperations(db.db_name, cache_bytes=0)
+        for name, source in (("fetch_month_data uncached", uncached), ("fetch_month_data cached", db)):
+            started = time.perf_counter()
+            for i in range(queries):
+                source.fetch_month_data("Winnipeg", 2020, i % 12 + 1)
+            results[name] = (time.perf_counter() - started) / queries * 1e6
+        uncached.close()
+        db.close()
+    return results
+
+
+def synthetic_rows(days, first_date=date(1900, 1, 1)):
+    """
+    Generates deterministic daily rows in the save_data layout.
+    :param days: Number of consecutive days.
+    :return: Generator of (sample_date, min_temp, max_temp, avg_temp) tuples.
+    """
+    for offset in range(days):
+        min_temp = float(offset % 40 - 30)
+        yield (first_date + timedelta(days=offset)).isoformat(), min_temp, min_temp + 10.0, min_temp + 5.0
+
+
+def build_history_db(db_name, years=50, location="Winnipeg", cache_bytes=0):
+    """
+    Creates a database holding years of daily rows for one location, ending in 2024.
+    :param cache_bytes: Query cache budget; the cache is off by default so repeated queries reach SQLite.
+    :return: DBOperations instance.
+    """
+    db = DBOperations(db_name, cache_bytes=cache_bytes)
+    first = date(2024 - years + 1, 1, 1)
+    db.save_data(synthetic_rows((date(2024, 12, 31) - first).days + 1, first), location)
+    return db
+
+
+def bench_save_data(sizes=(1_000, 100_000, 1_000_000), days_per_location=36_500):
+    """
+    Measures save_data throughput into a fresh database, and again with every row unchanged.
+    Rows beyond days_per_location go to further locations so all dates stay in range.
+    :param sizes: Total numbers of rows to store.
+    :return: Dictionary mapping size to (inserted rows/s, unchanged rows/s).
+    """
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = DBOperations(os.path.join(tmp_dir, "bench.db"))
+            batches = [(f"Station {index}", min(days_per_location, size - start))
+                       for index, start in enumerate(range(0, size, days_per_location))]
+            timings = []
+            for _ in range(2):
+                started = time.perf_counter()
+                for location, days in batches:
+                    db.save_data(synthetic_rows(days), location)
+                timings.append(size / (time.perf_counter() - started))
+            db.close()
+        results[size] = tuple(timings)
+    return results
+
+
+def _best_of(repeat, function, *args):
+    """
+    :return: Fastest of repeat calls, in milliseconds.
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def bench_queries(years=50, repeat=5):
+    """
+    Measures the latency of the queries and data preparation behind the viewer and the plots.
+    :param years: Years of daily history in the benchmark database.
+    :return: Dictionary mapping query name to milliseconds (best of repeat).
+    """
+    from archive_reader import ArchiveReader
+    from weather_archive import export_archive
+    from weather_series import WeatherSeries
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = build_history_db(os.path.join(tmp_dir, "bench.db"), years)
+        cached = DBOperations(db.db_name)
+        cached.fetch_data("Winnipeg")
+        series = WeatherSeries.from_db(db)
+        first_year = 2024 - years + 1
+        results = {
+            "fetch_data": _best_of(repeat, db.fetch_data, "Winnipeg"),
+            "fetch_page": _best_of(repeat, db.fetch_page, "Winnipeg", 30, "2000-01-01"),
+            "fetch_monthly_means": _best_of(repeat, db.fetch_monthly_means, "Winnipeg", first_year, 2024),
+            "fetch_daily_means": _best_of(repeat, db.fetch_daily_means, "Winnipeg", 2000, 1),
+            "fetch_month_distributions": _best_of(repeat, db.fetch_month_distributions, "Winnipeg",
+                                                  first_year, 2024),
+            "fetch_yearly_summary": _best_of(repeat, db.fetch_yearly_summary, "Winnipeg", first_year, 2024),
+            "WeatherSeries.from_db": _best_of(repeat, WeatherSeries.from_db, db),
+            "fetch_data cached": _best_of(repeat, cached.fetch_data, "Winnipeg"),
+            "group_by_month": _best_of(repeat, series.group_by_month),
+            "resample monthly": _best_of(repeat, series.resample, "M"),
+        }
+        export_archive(db, os.path.join(tmp_dir, "archive"))
+        reader = ArchiveReader(os.path.join(tmp_dir, "archive"))
+        results["archive open"] = _best_of(repeat, ArchiveReader, os.path.join(tmp_dir, "archive"))
+        results["archive series"] = _best_of(repeat, reader.series, "Winnipeg")
+        results["archive distributions"] = _best_of(repeat, reader.fetch_month_distributions, "Winnipeg",
+                                                    first_year, 2024)
+        reader.close()
+        cached.close()
+        db.close()
+    return results
+
+
+def bench_render(years=50, repeat=3):
+    """
+    Measures PlotOperations render time to files with the Agg backend.
+    :return: Dictionary mapping plot name to milliseconds (best of repeat).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from plot_operations import PlotOperations
+    from weather_series import WeatherSeries
+    plotter = PlotOperations()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = build_history_db(os.path.join(tmp_dir, "bench.db"), years)
+        series = WeatherSeries.from_db(db)
+        db.close()
+        month = series.month(2000, 1)
+        days, temperatures = month.days, month.mean_temp
+        output = os.path.join(tmp_dir, "plot")
+        results = {}
+        for fmt in ("png", "svg"):
+            results[f"boxplot {fmt}"] = _best_of(repeat, plotter.plot_boxplot, series, f"{output}.{fmt}")
+            results[f"lineplot {fmt}"] = _best_of(repeat, plotter.plot_lineplot, days, temperatures,
+                                                  1, 2000, f"{output}.{fmt}")
+    return results
+
+
+def bench_analytics(years=100, stations=20, repeat=3):
+    """
+    Measures the climate_analytics functions over many stations' histories held in memory.
+    :param years: Years of daily history per station, ending in 2024.
+    :param stations: Number of stations analyzed per run.
+    :return: Dictionary mapping step name to milliseconds for all stations (best of repeat).
+    """
+    import climate_analytics
+    from weather_series import WeatherSeries
+    first = date(2024 - years + 1, 1, 1)
+    dates, min_temp, max_temp, mean_temp = zip(*synthetic_rows((date(2024, 12, 31) - first).days + 1, first))
+    series = [WeatherSeries(dates, min_temp, max_temp, mean_temp, f"Station {index}") for index in range(stations)]
+    normals = [climate_analytics.daily_normals(station) for station in series]
+
+    def each(function, *args):
+        return lambda: [function(station, *args) for station in series]
+
+    results = {
+        "daily_normals": _best_of(repeat, each(climate_analytics.daily_normals)),
+        "anomalies": _best_of(repeat, lambda: [climate_analytics.anomalies(station, station_normals)
+                                               for station, station_normals in zip(series, normals)]),
+        "rolling 7/30/365": _best_of(repeat, lambda: [climate_analytics.rolling_mean(station, window)
+                                                      for station in series for window in (7, 30, 365)]),
+        "daily_records": _best_of(repeat, each(climate_analytics.daily_records)),
+        "degree_days monthly": _best_of(repeat, each(climate_analytics.degree_days, 18.0, "M")),
+        "yearly_report": _best_of(repeat, each(climate_analytics.yearly_report)),
+    }
+    results["total"] = sum(results.values()) - results["yearly_report"]
+    return results
+
+
+HEAVY_MODULES = ("requests", "numpy", "matplotlib", "tabulate")
+
+
+def import_profile(args):
+    """
+    Runs a Python command line with -X importtime and adds up its import cost.
+    :param args: Arguments after "python -X importtime".
+    :return: (total import time in ms, sorted list of the HEAVY_MODULES it loaded).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", *args],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    total = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # Top-level import; nested ones are already in its cumulative time
+            total += int(cumulative)
+        if name.strip() in HEAVY_MODULES:
+            loaded.add(name.strip())
+    return total / 1000, sorted(loaded)
+
+
+def bench_startup():
+    """
+    Measures the import cost of weather_processor subcommands against loading every
+    dependency up front, as the module did before its imports were made lazy.
+    :return: Dictionary mapping label to (import time in ms, heavy modules loaded).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "weather.db")
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather.db"), db_name)
+        # Log to the temporary directory, so the runs leave the real log file alone
+        processor = ["weather_processor.py", "--db", db_name, "--log-file", os.path.join(tmp, "weather_process.log")]
+        commands = {
+            "eager imports": ["-c", "import requests, numpy, tabulate, matplotlib.pyplot"],
+            "--help": ["weather_processor.py", "--help"],
+            "view --csv": [*processor, "view", "--csv", os.path.join(tmp, "out.csv")],
+            "view": [*processor, "view"],
+            "lineplot --output": [*processor, "lineplot", "--year", "2020", "--month", "1",
+                                  "--output", os.path.join(tmp, "plot.png")],
+        }
+        return {label: import_profile(args) for label, args in commands.items()}
+
+
+BENCHMARKS = ("fetch", "ingest", "parse", "parse_pool", "save", "queries", "small_queries", "render", "analytics", "startup")
+
+
+def run_suite(selected=BENCHMARKS, quick=False, pages_dir=None, report=print):
+    """
+    Runs the selected benchmarks and collects their results in one structure.
+    Every metric carries its unit; units ending in "/s" are throughputs (higher is better),
+    the others are durations (lower is better).
+    :param selected: Names from BENCHMARKS to run.
+    :param quick: Use smaller inputs (for a fast check rather than a reference run).
+    :param pages_dir: Optional directory of recorded month pages.
+    :param report: Called with a line of text for every result as it comes in.
+    :return: Dictionary mapping benchmark name to {metric: {"value": number, "unit": text}}.
+    """
+    results = {}
+
+    def add(benchmark, metric, value, unit):
+        results.setdefault(benchmark, {})[metric] = {"value": round(value, 3), "unit": unit}
+        report(f"  {metric:<28s} {value:12.2f} {unit}")
+
+    if "fetch" in selected:
+        report("Parallel month fetch (24 months, 50 ms simulated latency)")
+        for workers, seconds, days in bench_parallel_fetch((1, 4) if quick else (1, 2, 4, 8), pages_dir=pages_dir):
+            add("fetch", f"workers={workers}", seconds * 1000, "ms")
+    if "ingest" in selected:
+        months = 36 if quick else 120
+        report(f"Checkpointed backfill ({months} months, 20 ms simulated latency)")
+        for pipeline, seconds in bench_ingest(months, pages_dir=pages_dir).items():
+            add("ingest", f"pipeline={pipeline}", seconds * 1000, "ms")
+    if "parse" in selected:
+        report("Month page parsing")
+        for name, pages_per_second in bench_parse(pages_dir=pages_dir).items():
+            add("parse", name, pages_per_second, "pages/s")
+    if "parse_pool" in selected:
+        report(f"Month page parsing on a process pool ({os.cpu_count()} CPUs)")
+        for name, pages_per_second in bench_parse_pool((1, 2) if quick else (1, 2, 4), 2 if quick else 8,
+                                                       pages_dir).items():
+            add("parse_pool", name, pages_per_second, "pages/s")
+    if "save" in selected:
+        report("save_data throughput")
+        sizes = (1_000, 10_000) if quick else (1_000, 100_000, 1_000_000)
+        for size, (inserted, unchanged) in bench_save_data(sizes).items():
+            add("save", f"insert {size} rows", inserted, "rows/s")
+            add("save", f"unchanged {size} rows", unchanged, "rows/s")
+    if "queries" in selected:
+        years = 10 if quick else 50
+        report(f"Query and plot data preparation latency ({years} years of daily rows)")
+        for name, millis in bench_queries(years).items():
+            add("queries", name, millis, "ms")
+    if "small_queries" in selected:
+        report("Small query latency")
+        for name, micros in bench_small_queries(100 if quick else 500).items():
+            add("small_queries", name, micros, "us")
+    if "render" in selected:
+        report("Plot render time (Agg)")
+        for name, millis in bench_render(10 if quick else 50, 1 if quick else 3).items():
+            add("render", name, millis, "ms")
+    if "analytics" in selected:
+        years, stations = (30, 5) if quick else (100, 20)
+        report(f"Climate analytics ({stations} stations x {years} years of daily rows)")
+        for name, millis in bench_analytics(years, stations, 1 if quick else 3).items():
+            add("analytics", name, millis, "ms")
+    if "startup" in selected:
+        report("CLI import time (python -X importtime)")
+        for label, (millis, loaded) in bench_startup().items():
+            add("startup", label, millis, "ms")
+    return results
+
+
+def git_commit():
+    """
+    :return: Current commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current, baseline, threshold=0.1):
+    """
+    Finds metrics that got worse than in a baseline run by more than a relative threshold.
+    :param current: "results" section of this run.
+    :param baseline: "results" section of the run to compare with.
+    :param threshold: Tolerated relative change, e.g. 0.1 for 10%.
+    :return: List of (benchmark, metric, baseline value, current value, relative change) tuples.
+    """
+    regressions = []
+    for benchmark, metrics in current.items():
+        for metric, entry in metrics.items():
+            previous = baseline.get(benchmark, {}).get(metric)
+            if not previous or not previous["value"]:
+                continue
+            change = entry["value"] / previous["value"] - 1
+            worse = -change if entry["unit"].endswith("/s") else change
+            if worse > threshold:
+                regressions.append((benchmark, metric, previous["value"], entry["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scrape, parse, store and plot paths.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS),
+                        help=f"Comma-separated benchmarks to run (default: all of {','.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="Use smaller inputs")
+    parser.add_argument("--pages-dir", default=None, help="Directory of recorded month pages")
+    parser.add_argument("--json", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change reported as a regression (default: 0.1)")
+    args = parser.parse_args(argv)
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run_suite(selected, args.quick, args.pages_dir)
+    if args.json:
+        run = {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(run, json_file, indent=2)
+        print(f"Results written to {args.json}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as json_file:
+            baseline = json.load(json_file)
+        regressions = compare_results(results, baseline["results"], args.threshold)
+        print(f"Compared with {baseline.get('commit') or args.compare}: {len(regressions)} regression(s)")
+        for benchmark, metric, before, after, change in regressions:
+            print(f"  {benchmark}/{metric}: {before} -> {after} ({change:+.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Vectorized climate statistics over a WeatherSeries.
+Every function works on whole NumPy columns (bincount, cumulative sums, sorting)
+rather than per-row Python loops, so a century of daily data for dozens of
+stations is processed in well under a second.
+
+Calendar days are identified by a slot, (month - 1) * 31 + (day - 1), which gives
+February 29 a slot of its own and never shifts days between leap and common years.
+"""
+from collections import namedtuple
+import numpy as np
+
+SLOTS = 12 * 31
+
+DailyNormals = namedtuple("DailyNormals", ["values", "counts", "base_start", "base_end"])
+DailyRecords = namedtuple("DailyRecords", ["months", "days", "high", "high_year", "low", "low_year"])
+
+
+def day_slots(dates):
+    """
+    :param dates: datetime64[D] array.
+    :return: int array of calendar day slots (0 for January 1, 59 for February 29, ...).
+    """
+    months = dates.astype("datetime64[M]")
+    day = (dates - months.astype("datetime64[D]")).astype(np.int64)
+    return (months.astype(np.int64) % 12) * 31 + day
+
+
+def slot_month_day(slots):
+    """
+    :return: (months, days) arrays for calendar day slots.
+    """
+    slots = np.asarray(slots)
+    return slots // 31 + 1, slots % 31 + 1
+
+
+def daily_normals(series, base_start=1991, base_end=2020, column="mean"):
+    """
+    Computes the climatological normal of every calendar day: its mean over a base period.
+    :param series: WeatherSeries.
+    :param base_start: First year of the base period (the WMO standard is 1991-2020).
+    :param base_end: Last year of the base period.
+    :param column: "min", "max" or "mean".
+    :return: DailyNormals whose values and counts are indexed by day slot
+    (NaN and 0 for calendar days without data in the base period).
+    """
+    base = series.year_range(base_start, base_end)
+    values = base.column(column)
+    present = ~np.isnan(values)
+    slots = day_slots(base.dates[present])
+    sums = np.bincount(slots, weights=values[present], minlength=SLOTS)
+    counts = np.bincount(slots, minlength=SLOTS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normals = (sums / counts).astype(np.float32)
+    return DailyNormals(normals, counts, base_start, base_end)
+
+
+def anomalies(series, normals, column="mean"):
+    """
+    Departure of every day from its calendar day's normal.
+    :param series: WeatherSeries.
+    :param normals: DailyNormals of the same column.
+    :return: float32 array aligned with series.dates (NaN where the value or the normal is missing).
+    """
+    return series.column(column) - normals.values[day_slots(series.dates)]
+
+
+def rolling_mean(series, window, column="mean", min_periods=None, values=None):
+    """
+    Trailing mean over a window of calendar days, ending on each day.
+    Missing days (gaps between dates or NaN values) are skipped, so a 30-day window
+    averages the days of the last 30 calendar days that have a value.
+    :param series: WeatherSeries.
+    :param window: Window length in days, e.g. 7, 30 or 365.
+    :param column: "min", "max" or "mean" (ignored when values is given).
+    :param min_periods: Days with values needed for a result (defaults to half the window).
+    :param values: Optional array aligned with series.dates to average instead of a column (e.g. anomalies).
+    :return: float32 array aligned with series.dates, NaN where too few days are available.
+    """
+    if not len(series):
+        return np.array([], dtype=np.float32)
+    values = series.column(column) if values is None else np.asarray(values)
+    min_periods = max(1, window // 2) if min_periods is None else min_periods
+    offsets = (series.dates - series.dates[0]).astype(np.int64)
+    present = ~np.isnan(values)
+    # Running totals on a gap-free daily grid; a window is the difference of two totals
+    grid_sums = np.zeros(offsets[-1] + 2)
+    grid_counts = np.zeros(offsets[-1] + 2, dtype=np.int64)
+    grid_sums[offsets[present] + 1] = values[present]
+    grid_counts[offsets[present] + 1] = 1
+    grid_sums = np.cumsum(grid_sums)
+    grid_counts = np.cumsum(grid_counts)
+    window_start = np.maximum(offsets + 1 - window, 0)
+    sums = grid_sums[offsets + 1] - grid_sums[window_start]
+    counts = grid_counts[offsets + 1] - grid_counts[window_start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts >= min_periods, sums / counts, np.nan)
+    return means.astype(np.float32)
+
+
+def daily_records(series):
+    """
+    Finds the record high (highest maximum) and record low (lowest minimum) of every calendar day.
+    Ties go to the earliest year, the one that set the record.
+    :param series: WeatherSeries.
+    :return: DailyRecords of arrays, one entry per calendar day with data, ordered by date.
+    """
+    slots = day_slots(series.dates)
+    years = series.years
+    highs = _extreme_per_slot(slots, years, series.max_temp, highest=True)
+    lows = _extreme_per_slot(slots, years, series.min_temp, highest=False)
+    all_slots = np.union1d(highs[0], lows[0])
+    high = np.full(len(all_slots), np.nan, dtype=np.float32)
+    high_year = np.zeros(len(all_slots), dtype=np.int32)
+    low = np.full(len(all_slots), np.nan, dtype=np.float32)
+    low_year = np.zeros(len(all_slots), dtype=np.int32)
+    high_index = np.searchsorted(all_slots, highs[0])
+    high[high_index], high_year[high_index] = highs[1], highs[2]
+    low_index = np.searchsorted(all_slots, lows[0])
+    low[low_index], low_year[low_index] = lows[1], lows[2]
+    return DailyRecords(*slot_month_day(all_slots), high, high_year, low, low_year)
+
+
+def _extreme_per_slot(slots, years, values, highest):
+    present = ~np.isnan(values)
+    slots, years, values = slots[present], years[present], values[present]
+    # One float key orders by slot, then best value first (temperatures stay far below 1000 degrees);
+    # the stable sort keeps equal keys in date order, so ties go to the earliest year
+    keys = slots * 1000.0 + (-values if highest else values)
+    order = np.argsort(keys, kind="stable")
+    sorted_slots = slots[order]
+    first = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]]) if len(order) else order
+    pick = order[first]
+    return slots[pick], values[pick], years[pick]
+
+
+def _period_totals(dates, values, freq):
+    """
+    Sums an array aligned with dates per calendar month or year, ignoring NaN.
+    :return: (periods, sums, counts) arrays covering every period from the first date to the last.
+    """
+    if freq not in ("M", "Y"):
+        raise ValueError(f"freq must be 'M' or 'Y', not {freq!r}")
+    if not len(dates):
+        return np.array([], dtype=f"datetime64[{freq}]"), np.array([]), np.array([], dtype=np.int64)
+    period_index = dates.astype(f"datetime64[{freq}]").astype(np.int64)
+    first = period_index[0]
+    period_index = period_index - first
+    present = ~np.isnan(values)
+    length = period_index[-1] + 1
+    sums = np.bincount(period_index[present], weights=values[present], minlength=length)
+    counts = np.bincount(period_index[present], minlength=length)
+    return (np.arange(length) + first).astype(f"datetime64[{freq}]"), sums, counts
+
+
+def period_means(dates, values, freq="M"):
+    """
+    Averages an array aligned with dates per calendar month or year, ignoring NaN.
+    :param freq: "M" for monthly or "Y" for yearly periods.
+    :return: (periods, means) arrays; periods are datetime64[M] or datetime64[Y],
+    means are NaN for periods without values.
+    """
+    periods, sums, counts = _period_totals(dates, values, freq)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (sums / counts).astype(np.float32)
+    return periods, means
+
+
+def degree_days(series, base=18.0, freq="Y"):
+    """
+    Heating and cooling degree days per month or year, from the daily mean temperature.
+    A day contributes max(0, base - mean) heating and max(0, mean - base) cooling degree days;
+    days without a mean contribute nothing.
+    :param series: WeatherSeries.
+    :param base: Base temperature in °C (18 °C is the Environment Canada convention).
+    :param freq: "M" for monthly or "Y" for yearly totals.
+    :return: (periods, heating, cooling) arrays; periods are datetime64[M] or datetime64[Y].
+    """
+    mean = series.mean_temp.astype(np.float64)
+    periods, heating, _ = _period_totals(series.dates, np.maximum(base - mean, 0), freq)
+    _, cooling, _ = _period_totals(series.dates, np.maximum(mean - base, 0), freq)
+    return periods, heating, cooling
+
+
+def yearly_report(series, base_start=1991, base_end=2020, base_temp=18.0):
+    """
+    Summarizes every year of a series: mean temperature, its anomaly against the daily
+    normals, heating/cooling degree days and the number of calendar-day records it still holds.
+    :param series: WeatherSeries.
+    :return: List of (year, mean, anomaly, heating degree days, cooling degree days,
+    record highs, record lows) tuples.
+    """
+    if not len(series):
+        return []
+    normals = daily_normals(series, base_start, base_end)
+    years, means = period_means(series.dates, series.mean_temp.astype(np.float64), "Y")
+    _, anomaly_means = period_means(series.dates, anomalies(series, normals).astype(np.float64), "Y")
+    _, heating, cooling = degree_days(series, base_temp, "Y")
+    records = daily_records(series)
+    year_numbers = years.astype(np.int64) + 1970
+    first_year = year_numbers[0]
+    record_highs = np.bincount(records.high_year[records.high_year > 0] - first_year, minlength=len(years))
+    record_lows = np.bincount(records.low_year[records.low_year > 0] - first_year, minlength=len(years))
+    return [
+        (int(year), _number(mean), _number(anomaly), round(float(hdd), 1), round(float(cdd), 1), int(highs), int(lows))
+        for year, mean, anomaly, hdd, cdd, highs, lows
+        in zip(year_numbers, means, anomaly_means, heating, cooling, record_highs, record_lows)
+    ]
+
+
+def _number(value):
+    return None if np.isnan(value) else round(float(value), 2)
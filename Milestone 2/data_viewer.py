@@ -0,0 +1,113 @@
+"""Paginated, streaming view of stored weather data.
+Pages are fetched on demand with keyset pagination, so neither the viewer nor
+the CSV export ever holds more than one page of records in memory.
+"""
+import csv
+import io
+from datetime import date, timedelta
+
+HEADERS = ["ID", "Date", "Location", "Min Temp", "Max Temp", "Mean Temp"]
+
+
+class WeatherPager:
+    """
+    Walks through a location's records page by page.
+    """
+
+    def __init__(self, db, location="Winnipeg", page_size=30):
+        """
+        :param db: DBOperations instance to read from.
+        :param location: Location whose records are shown.
+        :param page_size: Number of records per page.
+        """
+        self.db = db
+        self.location = location
+        self.page_size = page_size
+        self.page = []
+
+    def first(self):
+        """
+        Loads the first page.
+        :return: List of records.
+        """
+        self.page = self.db.fetch_page(self.location, self.page_size)
+        return self.page
+
+    def next(self):
+        """
+        Loads the page after the current one; stays on the last page at the end.
+        :return: List of records.
+        """
+        if not self.page:
+            return self.first()
+        page = self.db.fetch_page(self.location, self.page_size, after=self.page[-1].sample_date)
+        if page:
+            self.page = page
+        return self.page
+
+    def previous(self):
+        """
+        Loads the page before the current one; stays on the first page at the start.
+        :return: List of records.
+        """
+        if not self.page:
+            return self.first()
+        page = self.db.fetch_page(self.location, self.page_size, before=self.page[0].sample_date)
+        if page:
+            self.page = page
+        return self.page
+
+    def jump_to(self, start_date):
+        """
+        Loads the page starting at a date (or the first stored date after it).
+        :param start_date: Date object or "YYYY-MM-DD" string.
+        :return: List of records.
+        """
+        day_before = date.fromisoformat(str(start_date)) - timedelta(days=1)
+        page = self.db.fetch_page(self.location, self.page_size, after=day_before.isoformat())
+        if page:
+            self.page = page
+        return self.page
+
+    def render(self):
+        """
+        Formats the current page as a grid table.
+        :return: The table as a string.
+        """
+        from tabulate import tabulate  # Only needed for display, not for CSV export
+        return tabulate(self.page, headers=HEADERS, tablefmt="grid")
+
+
+def iter_csv_lines(db, location="Winnipeg", batch_size=1000):
+    """
+    Streams a location's records as CSV text, header first.
+    Lines are buffered into chunks of about 64 KB to keep writes cheap.
+    :param db: DBOperations instance to read from.
+    :param location: Location to export.
+    :param batch_size: Number of records fetched per query.
+    :return: Generator of CSV text chunks, each made of whole lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(HEADERS)
+    for record in db.iter_records(location, batch_size):
+        writer.writerow(record)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_csv(db, path, location="Winnipeg"):
+    """
+    Writes a location's records to a CSV file without loading them all at once.
+    :param path: File to write.
+    :return: Number of records written.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as csv_file:
+        for chunk in iter_csv_lines(db, location):
+            csv_file.write(chunk)
+            count += chunk.count("\n")
+    return count - 1
@@ -1,26 +1,95 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import logging
 import os
-from dbcm import DBCM
-from scrape_weather import WeatherScraper
+import socket
+import threading
+import time
+from dbcm import DBCM, ConnectionManager
+import metrics
+from observations import DailyObservation, ObservationBatch, record_factory
+from query_cache import QueryCache, cached_query
 from datetime import datetime
+from rollups import SKETCH_SCALE, decode_sketch, encode_sketch, merge_sketches
 
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "weather.db")
+UPDATE_LOCK = "update"  # Held by every update of the stored history: scheduler runs and interactive updates
+
+RECORD_COLUMNS = "id, sample_date, location, min_temp, max_temp, avg_temp"
+_INSERT_SQL = """INSERT INTO weather_data (sample_date, location, min_temp, max_temp, avg_temp, station_id, revision)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)"""
+UPSERT_SQL = {
+    "update": _INSERT_SQL + """
+        ON CONFLICT(sample_date, location) DO UPDATE SET
+            min_temp = excluded.min_temp,
+            max_temp = excluded.max_temp,
+            avg_temp = excluded.avg_temp,
+            revision = excluded.revision
+        WHERE min_temp IS NOT excluded.min_temp
+           OR max_temp IS NOT excluded.max_temp
+           OR avg_temp IS NOT excluded.avg_temp""",
+    "ignore": _INSERT_SQL + """
+        ON CONFLICT(sample_date, location) DO NOTHING""",
+}
+
+
+def iter_rows(weather_data):
+    """
+    Normalizes weather data into DailyObservation rows.
+    :param weather_data: ObservationBatch, iterable of (sample_date, min_temp, max_temp, avg_temp) rows,
+    or a dictionary keyed by date with "Min", "Max" and "Mean" values (the older scraper format).
+    :return: Generator of DailyObservation tuples.
+    """
+    if hasattr(weather_data, "items"):
+        for date, temps in weather_data.items():
+            yield DailyObservation(date, temps["Min"], temps["Max"], temps["Mean"])
+    else:
+        for row in weather_data:
+            yield row if type(row) is DailyObservation else DailyObservation._make(row)
+
+
+def iter_chunks(rows, size):
+    """
+    Groups an iterable into lists of at most size items without materializing it.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 
 class DBOperations:
-    def __init__(self, db_name=DB_PATH):
+    def __init__(self, db_name=DB_PATH, pragmas=None, cache_bytes=32 * 1024 * 1024):
         """
         Initialize database operations and ensure the required table exists.
+        Queries run on persistent per-thread connections (WAL journal by default).
+        Read queries are memoized in a QueryCache that every write invalidates (see query_cache).
         :param db_name: Name of the SQLite database file.
+        :param pragmas: Optional PRAGMA overrides, e.g. {"synchronous": "FULL"} (see dbcm.DEFAULT_PRAGMAS).
+        :param cache_bytes: Memory budget of the query result cache; 0 disables it.
         """
         self.db_name = db_name
+        self.connections = ConnectionManager(db_name, pragmas)
+        self.query_cache = QueryCache(cache_bytes)
+        self.seen_versions = threading.local()  # (connection, PRAGMA data_version) last seen by each thread
+        self.seen_revision = None  # Revision counter at the last check, shared by every thread
         self.initialize_db()
 
     def initialize_db(self):
         """
-        Creates the weather_data table if it does not already exist.
+        Creates the weather_data table if it does not already exist, and adds the
+        integer date_key column (YYYYMMDD, derived from sample_date), the station_id
+        column tying rows to the station registry, the revision column stamping the
+        write that last changed a row, and the indexes used by the date-range queries.
         """
-        with DBCM(self.db_name) as cursor:
+        with DBCM(self.db_name, self.connections) as cursor:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS weather_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,50 +101,625 @@ class DBOperations:
                     UNIQUE(sample_date, location)
                 )
             """)
-    def save_data(self, weather_dict, location="Winnipeg"):
-        """
-        Saves weather data into the database while avoiding duplicate entries.
-        :param weather_dict: Dictionary containing weather data with dates as
-        keys and temperature values.
-        :param location: Location name for the weather data (default: "Winnipeg").
-        """
-        with DBCM(self.db_name) as cursor:
-            for date, temps in weather_dict.items():
-                try:
-                    cursor.execute('''INSERT INTO weather_data (sample_date,
-                                   location, min_temp, max_temp, avg_temp)
-                                      VALUES (?, ?, ?, ?, ?)''',
-                                   (date, location, temps["Min"], temps["Max"], temps["Mean"]))
-                except Exception:
-                    print(f"Skipping duplicate entry for {date} in {location}.")
+            columns = [row[1] for row in cursor.execute("PRAGMA table_xinfo(weather_data)")]
+            if "date_key" not in columns:
+                cursor.execute("""
+                    ALTER TABLE weather_data ADD COLUMN date_key INTEGER
+                    GENERATED ALWAYS AS (CAST(replace(sample_date, '-', '') AS INTEGER)) VIRTUAL
+                """)
+            link_stations = "station_id" not in columns
+            if link_stations:
+                cursor.execute("ALTER TABLE weather_data ADD COLUMN station_id INTEGER REFERENCES stations(station_id)")
+            if "revision" not in columns:
+                cursor.execute("ALTER TABLE weather_data ADD COLUMN revision INTEGER")
+                # The covering index gains the column, so data_version still reads the index alone
+                cursor.execute("DROP INDEX IF EXISTS idx_weather_location_date")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weather_station_date
+                ON weather_data (station_id, sample_date)
+            """)
+            # Covering index: location/date-range queries never touch the table itself
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weather_location_date
+                ON weather_data (location, sample_date, min_temp, max_temp, avg_temp, revision)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_weather_location_date_key
+                ON weather_data (location, date_key, avg_temp)
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS stations (
+                    station_id INTEGER PRIMARY KEY,
+                    location TEXT NOT NULL UNIQUE,
+                    province TEXT,
+                    first_year INTEGER
+                )
+            """)
+            cursor.execute("""
+                INSERT OR IGNORE INTO stations (station_id, location, province, first_year)
+                VALUES (27174, 'Winnipeg', 'MB', 1996)
+            """)
+            if link_stations:
+                # Rows stored before the column existed are linked to their location's station once
+                cursor.execute("""
+                    UPDATE weather_data SET station_id =
+                        (SELECT station_id FROM stations WHERE stations.location = weather_data.location)
+                    WHERE location IN (SELECT location FROM stations)
+                """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS locks (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    location TEXT PRIMARY KEY,
+                    high_water_mark TEXT,
+                    last_sync TEXT,
+                    last_status TEXT,
+                    rows_upserted INTEGER
+                )
+            """)
+            # Rollups of the daily mean temperature per station and month/year, kept
+            # in step with weather_data by save_data (see _refresh_rollups)
+            for table, key_columns in (("monthly_stats", "year INTEGER NOT NULL, month INTEGER NOT NULL"),
+                                       ("yearly_stats", "year INTEGER NOT NULL")):
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        location TEXT NOT NULL,
+                        {key_columns},
+                        days INTEGER NOT NULL,
+                        mean_count INTEGER NOT NULL,
+                        mean_sum REAL,
+                        mean_sumsq REAL,
+                        mean_min REAL,
+                        mean_max REAL,
+                        lowest_min REAL,
+                        highest_max REAL,
+                        sketch TEXT,
+                        PRIMARY KEY (location, {key_columns.replace(' INTEGER NOT NULL', '')})
+                    ) WITHOUT ROWID
+                """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS backfill_months (
+                    location TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    rows_saved INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (location, year, month)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM monthly_stats)")
+            if not cursor.fetchone()[0]:
+                # Databases created before the rollups existed get them built once
+                cursor.execute("""SELECT DISTINCT location, CAST(substr(sample_date, 1, 4) AS INTEGER),
+                                         CAST(substr(sample_date, 6, 2) AS INTEGER) FROM weather_data""")
+                by_location = {}
+                for location, year, month in cursor.fetchall():
+                    by_location.setdefault(location, set()).add((year, month))
+                for location, months in by_location.items():
+                    self._refresh_rollups(cursor, location, months)
+    def _refresh_rollups(self, cursor, location, months):
+        """
+        Recomputes the monthly rollups of the given months, and the yearly rollups of their years,
+        from the stored daily rows. Runs on the caller's cursor, so the rollups are committed in the
+        same transaction as the daily rows they summarize.
+        :param cursor: Cursor of the open transaction.
+        :param location: Location whose rollups are refreshed.
+        :param months: Iterable of (year, month) tuples.
+        """
+        months = set(months)
+        if not months:
+            return
+        first, last = min(months), max(months)
+        span = (location, f"{first[0]:04d}-{first[1]:02d}-01", f"{last[0]:04d}-{last[1]:02d}-31")
+        # One grouped scan over the date range the months cover instead of a query per month
+        cursor.execute("""SELECT CAST(substr(sample_date, 1, 4) AS INTEGER), CAST(substr(sample_date, 6, 2) AS INTEGER),
+                                 COUNT(*), COUNT(avg_temp), SUM(avg_temp), SUM(avg_temp * avg_temp),
+                                 MIN(avg_temp), MAX(avg_temp), MIN(min_temp), MAX(max_temp)
+                          FROM weather_data WHERE location = ? AND sample_date BETWEEN ? AND ?
+                          GROUP BY 1, 2""", span)
+        stats = {(row[0], row[1]): row[2:] for row in cursor.fetchall() if (row[0], row[1]) in months}
+        cursor.execute("""SELECT CAST(substr(sample_date, 1, 4) AS INTEGER), CAST(substr(sample_date, 6, 2) AS INTEGER),
+                                 CAST(ROUND(avg_temp * ?) AS INTEGER), COUNT(*)
+                          FROM weather_data WHERE location = ? AND sample_date BETWEEN ? AND ? AND avg_temp IS NOT NULL
+                          GROUP BY 1, 2, 3""", (SKETCH_SCALE, *span))
+        sketches = {}
+        for year, month, key, count in cursor.fetchall():
+            sketches.setdefault((year, month), {})[key] = count
+        cursor.executemany("DELETE FROM monthly_stats WHERE location = ? AND year = ? AND month = ?",
+                           [(location, *key) for key in months - stats.keys()])
+        cursor.executemany("INSERT OR REPLACE INTO monthly_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           [(location, *key, *values, encode_sketch(sketches.get(key, {})))
+                            for key, values in stats.items()])
+        years = sorted({year for year, _ in months})
+        placeholders = ", ".join("?" * len(years))
+        cursor.execute(f"""SELECT year, SUM(days), SUM(mean_count), SUM(mean_sum), SUM(mean_sumsq), MIN(mean_min),
+                                  MAX(mean_max), MIN(lowest_min), MAX(highest_max), json_group_array(sketch)
+                           FROM monthly_stats WHERE location = ? AND year IN ({placeholders})
+                           GROUP BY year""", (location, *years))
+        yearly = {row[0]: row for row in cursor.fetchall()}
+        cursor.executemany("DELETE FROM yearly_stats WHERE location = ? AND year = ?",
+                           [(location, year) for year in years if year not in yearly])
+        cursor.executemany("INSERT OR REPLACE INTO yearly_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           [(location, *row[:-1], encode_sketch(merge_sketches(
+                               decode_sketch(text) for text in json.loads(row[-1]))))
+                            for row in yearly.values()])
+    def save_data(self, weather_data, location="Winnipeg", on_conflict="update", chunk_size=500):
+        """
+        Bulk-upserts weather data in chunked transactions.
+        Rows whose (sample_date, location) already exist are updated when their
+        temperatures changed (on_conflict="update") or left alone (on_conflict="ignore").
+        The monthly and yearly rollups of every month a chunk changed are refreshed
+        before the chunk is committed.
+        :param weather_data: ObservationBatch, any iterable/generator of (sample_date, min_temp,
+        max_temp, avg_temp) rows such as DailyObservation, or a dictionary keyed by date with
+        "Min", "Max" and "Mean" values.
+        :param location: Location name for the weather data (default: "Winnipeg"); rows are linked to the
+        station registered for it.
+        :param on_conflict: "update" or "ignore".
+        :param chunk_size: Number of rows written and committed per transaction.
+        :return: Dictionary with the number of "inserted", "updated" and "skipped" rows.
+        """
+        if on_conflict not in UPSERT_SQL:
+            raise ValueError(f"on_conflict must be one of {sorted(UPSERT_SQL)}, not {on_conflict!r}")
+        summary = {"inserted": 0, "updated": 0, "skipped": 0}
+        station = self.get_station(location)
+        station_id = station[0] if station else None
+        with metrics.span("save_data"), DBCM(self.db_name, self.connections) as cursor:
+            for chunk in iter_chunks(iter_rows(weather_data), chunk_size):
+                # The last row wins when a chunk repeats a date
+                unique = {row[0]: row for row in chunk}
+                placeholders = ", ".join("?" * len(unique))
+                cursor.execute(f"""SELECT COUNT(*) FROM weather_data
+                                   WHERE location = ? AND sample_date IN ({placeholders})""",
+                               (location, *unique))
+                existing = cursor.fetchone()[0]
+                revision = self._next_revision(cursor)
+                changes_before = cursor.connection.total_changes
+                cursor.executemany(UPSERT_SQL[on_conflict],
+                                   [(date, location, min_temp, max_temp, avg_temp, station_id, revision)
+                                    for date, min_temp, max_temp, avg_temp in unique.values()])
+                changed = cursor.connection.total_changes - changes_before
+                if changed:
+                    self._refresh_rollups(cursor, location, {(int(date[:4]), int(date[5:7])) for date in unique})
+                cursor.connection.commit()
+                if changed:
+                    self.query_cache.invalidate()
+                inserted = len(unique) - existing
+                summary["inserted"] += inserted
+                summary["updated"] += changed - inserted
+                summary["skipped"] += len(chunk) - changed
+        metrics.increment("rows_upserted", summary["inserted"] + summary["updated"])
+        metrics.increment("rows_unchanged", summary["skipped"])
+        return summary
+    @cached_query
     def fetch_data(self, location="Winnipeg"):
         """
         Retrieves all weather data for a given location, ordered by date.
         :param location: Location name to filter weather data (default: "Winnipeg").
-        :return: List of tuples containing weather records.
+        :return: List of WeatherRecord tuples.
         """
-        with DBCM(self.db_name) as cursor:
-            cursor.execute('''SELECT * FROM weather_data WHERE location = ?
+        with metrics.span("fetch_data"), DBCM(self.db_name, self.connections) as cursor:
+            cursor.row_factory = record_factory
+            cursor.execute(f'''SELECT {RECORD_COLUMNS} FROM weather_data WHERE location = ?
                            ORDER BY sample_date''', (location,))
             return cursor.fetchall()
+    @cached_query
+    def fetch_observations(self, location="Winnipeg", start_date="0000-01-01", end_date="9999-12-31"):
+        """
+        Retrieves a location's days between two dates (inclusive) as an ObservationBatch.
+        Day numbers are computed by SQLite, so no date string is parsed in Python, and the batch
+        takes a fraction of the memory of the equivalent fetch_data records.
+        :param location: Location name to filter weather data.
+        :param start_date: First date, as a date object or "YYYY-MM-DD" string.
+        :param end_date: Last date, as a date object or "YYYY-MM-DD" string.
+        :return: ObservationBatch ordered by date.
+        """
+        with metrics.span("fetch_data"), DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''SELECT CAST(julianday(sample_date) - 2440587.5 AS INTEGER), min_temp, max_temp, avg_temp
+                           FROM weather_data WHERE location = ? AND sample_date BETWEEN ? AND ?
+                           ORDER BY sample_date''', (location, str(start_date), str(end_date)))
+            rows = cursor.fetchall()
+        if not rows:
+            return ObservationBatch()
+        return ObservationBatch.from_columns(*zip(*rows))
+    def fetch_page(self, location, page_size=50, after=None, before=None):
+        """
+        Retrieves one page of records using keyset pagination on sample_date,
+        so every page costs one index seek regardless of its position in the history.
+        :param location: Location name to filter weather data.
+        :param page_size: Maximum number of records per page.
+        :param after: Return the records following this date (exclusive).
+        :param before: Return the records preceding this date (exclusive); ignored if after is given.
+        :return: List of WeatherRecord tuples, ordered by date.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.row_factory = record_factory
+            if after is None and before is not None:
+                cursor.execute(f'''SELECT {RECORD_COLUMNS} FROM weather_data
+                               WHERE location = ? AND sample_date < ?
+                               ORDER BY sample_date DESC LIMIT ?''', (location, str(before), page_size))
+                return cursor.fetchall()[::-1]
+            cursor.execute(f'''SELECT {RECORD_COLUMNS} FROM weather_data
+                           WHERE location = ? AND sample_date > ?
+                           ORDER BY sample_date LIMIT ?''', (location, str(after or ""), page_size))
+            return cursor.fetchall()
+    def iter_records(self, location, batch_size=1000):
+        """
+        Streams every record of a location in date order, one keyset page at a time,
+        so memory stays flat however large the table is.
+        :return: Generator of WeatherRecord tuples.
+        """
+        after = None
+        while True:
+            page = self.fetch_page(location, batch_size, after=after)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after = page[-1][1]
+    @cached_query
+    def fetch_data_range(self, location, start_date, end_date):
+        """
+        Retrieves the weather records of a location between two dates (inclusive), ordered by date.
+        :param location: Location name to filter weather data.
+        :param start_date: First date, as a date object or "YYYY-MM-DD" string.
+        :param end_date: Last date, as a date object or "YYYY-MM-DD" string.
+        :return: List of WeatherRecord tuples, as fetch_data.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.row_factory = record_factory
+            cursor.execute(f'''SELECT {RECORD_COLUMNS} FROM weather_data
+                           WHERE location = ? AND sample_date BETWEEN ? AND ?
+                           ORDER BY sample_date''', (location, str(start_date), str(end_date)))
+            return cursor.fetchall()
+    def fetch_month_data(self, location, year, month):
+        """
+        Retrieves the weather records of a single month, ordered by date.
+        :return: List of WeatherRecord tuples, as fetch_data.
+        """
+        return self.fetch_data_range(location, f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31")
+    @cached_query
+    def fetch_daily_means(self, location, year, month):
+        """
+        Retrieves the daily mean temperatures of a month, with the day number computed in SQL.
+        :return: List of (day, avg_temp) tuples ordered by day; days without a mean are left out.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''SELECT date_key % 100, avg_temp FROM weather_data
+                           WHERE location = ? AND date_key BETWEEN ? AND ?
+                           AND avg_temp IS NOT NULL
+                           ORDER BY date_key''',
+                           (location, year * 10000 + month * 100, year * 10000 + month * 100 + 99))
+            return cursor.fetchall()
+    @cached_query
+    def fetch_monthly_means(self, location, start_year, end_year):
+        """
+        Retrieves the distribution of daily mean temperatures for each calendar month over a year range.
+        The year filter and month grouping run in SQL.
+        :param location: Location name to filter weather data.
+        :param start_year: First year (inclusive).
+        :param end_year: Last year (inclusive).
+        :return: Dictionary mapping month number (1-12) to a list of daily mean temperatures.
+        """
+        monthly_means = {month: [] for month in range(1, 13)}
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''SELECT date_key / 100 % 100 AS month, avg_temp FROM weather_data
+                           WHERE location = ? AND date_key BETWEEN ? AND ?
+                           AND avg_temp IS NOT NULL''',
+                           (location, start_year * 10000, end_year * 10000 + 9999))
+            for month, avg_temp in cursor:
+                monthly_means[month].append(avg_temp)
+        return monthly_means
+    @cached_query
+    def fetch_monthly_summary(self, location, start_year, end_year):
+        """
+        Reads per-month statistics of the daily mean temperature from the monthly rollup table.
+        :param location: Location name.
+        :param start_year: First year (inclusive).
+        :param end_year: Last year (inclusive).
+        :return: List of (year, month, days, mean, standard deviation, lowest mean, highest mean,
+        lowest minimum, highest maximum) tuples, ordered by month; mean and deviation are None
+        for months without mean temperatures.
+        """
+        return self._fetch_summary("monthly_stats", "year, month", location, start_year, end_year)
+    @cached_query
+    def fetch_yearly_summary(self, location, start_year, end_year):
+        """
+        Reads per-year statistics from the yearly rollup table.
+        :return: List of (year, days, mean, standard deviation, lowest mean, highest mean,
+        lowest minimum, highest maximum) tuples, ordered by year.
+        """
+        return self._fetch_summary("yearly_stats", "year", location, start_year, end_year)
+    def _fetch_summary(self, table, key_columns, location, start_year, end_year):
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute(f"""SELECT {key_columns}, days, mean_count, mean_sum, mean_sumsq, mean_min, mean_max,
+                                      lowest_min, highest_max
+                               FROM {table} WHERE location = ? AND year BETWEEN ? AND ?
+                               ORDER BY {key_columns}""", (location, start_year, end_year))
+            rows = cursor.fetchall()
+        summary = []
+        width = len(key_columns.split(","))
+        for row in rows:
+            days, count, total, total_squares = row[width:width + 4]
+            mean = total / count if count else None
+            deviation = max(0.0, total_squares / count - mean * mean) ** 0.5 if count else None
+            summary.append((*row[:width], days, mean, deviation, *row[width + 4:]))
+        return summary
+    @cached_query
+    def fetch_month_distributions(self, location, start_year, end_year):
+        """
+        Combines the monthly rollup sketches of a year range into one distribution per calendar month.
+        Reads twelve rows per year instead of every daily row; see rollups.box_stats.
+        :param location: Location name.
+        :param start_year: First year (inclusive).
+        :param end_year: Last year (inclusive).
+        :return: Dictionary mapping month number (1-12) to a sketch of its daily mean temperatures.
+        """
+        sketches = {month: [] for month in range(1, 13)}
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("""SELECT month, sketch FROM monthly_stats
+                              WHERE location = ? AND year BETWEEN ? AND ?""", (location, start_year, end_year))
+            for month, sketch in cursor:
+                sketches[month].append(decode_sketch(sketch))
+        return {month: merge_sketches(parts) for month, parts in sketches.items()}
+    def data_version(self, location="Winnipeg", start_date="0000-01-01", end_date="9999-12-31"):
+        """
+        Returns a fingerprint of a location's stored data between two dates that changes whenever
+        rows in that range are added, removed or revised: the row count, the first and last dates and
+        the latest revision (every save_data transaction stamps the rows it changes with a new one).
+        Computed from the covering index, so the table itself is not read.
+        :return: Short hex string.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''SELECT COUNT(*), MIN(sample_date), MAX(sample_date), MAX(revision)
+                           FROM weather_data WHERE location = ? AND sample_date BETWEEN ? AND ?''',
+                           (location, str(start_date), str(end_date)))
+            return hashlib.sha256(repr(cursor.fetchone()).encode("utf-8")).hexdigest()[:16]
+    def _next_revision(self, cursor):
+        """
+        Advances the database's revision counter inside the caller's transaction.
+        :return: The new revision number.
+        """
+        cursor.execute('''INSERT INTO counters (name, value) VALUES ('revision', 1)
+                       ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value''')
+        return cursor.fetchone()[0]
+    def cache_version(self):
+        """
+        Returns the data version query results are cached at: the cache's write counter. It does not depend
+        on the connection, so every thread shares the cached results. Commits by other connections are
+        caught first: when PRAGMA data_version of this thread's connection has changed since its last
+        lookup, the cache is invalidated; a connection without an earlier lookup compares the database's
+        revision counter, which every DBOperations write advances, with the last one seen.
+        :return: Hashable version.
+        """
+        conn = self.connections.connection()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        last = getattr(self.seen_versions, "value", None)
+        if last is None or last[0] is not conn or last[1] != data_version:
+            row = conn.execute("SELECT value FROM counters WHERE name = 'revision'").fetchone()
+            revision = row[0] if row else 0
+            if (last is not None and last[0] is conn) or revision != self.seen_revision:
+                self.query_cache.invalidate()
+            self.seen_revision = revision
+            self.seen_versions.value = (conn, data_version)
+        return self.query_cache.version
+    def register_station(self, station_id, location, province=None, first_year=None):
+        """
+        Adds a station to the registry, or updates its details if it is already registered.
+        Rows of a station are stored under its location name and carry its station_id; rows already
+        stored under the location are linked to the station.
+        :param station_id: Climate station ID on the climate site.
+        :param location: Unique location name the station's data is saved under.
+        :param province: Optional province code.
+        :param first_year: Optional first year with data, used as the start of its initial backfill.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''INSERT INTO stations (station_id, location, province, first_year)
+                           VALUES (?, ?, ?, ?)
+                           ON CONFLICT(station_id) DO UPDATE SET
+                               location = excluded.location,
+                               province = excluded.province,
+                               first_year = excluded.first_year''',
+                           (station_id, location, province, first_year))
+            cursor.execute("UPDATE weather_data SET station_id = ? WHERE location = ? AND station_id IS NOT ?",
+                           (station_id, location, station_id))
+            self._next_revision(cursor)
+        self.query_cache.invalidate()
+    @cached_query
+    def get_stations(self):
+        """
+        Lists the registered stations.
+        :return: List of (station_id, location, province, first_year) tuples ordered by location.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("SELECT station_id, location, province, first_year FROM stations ORDER BY location")
+            return cursor.fetchall()
+    @cached_query
+    def fetch_location_extents(self):
+        """
+        Summarizes the stored history of every location.
+        :return: List of (location, row count, first date, last date) tuples ordered by location.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("""SELECT location, COUNT(*), MIN(sample_date), MAX(sample_date)
+                              FROM weather_data GROUP BY location ORDER BY location""")
+            return cursor.fetchall()
+    @cached_query
+    def get_station(self, location):
+        """
+        Looks up the station registered for a location.
+        :return: (station_id, location, province, first_year) tuple, or None if unknown.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("SELECT station_id, location, province, first_year FROM stations WHERE location = ?",
+                           (location,))
+            return cursor.fetchone()
+    def get_high_water_mark(self, location="Winnipeg"):
+        """
+        Returns the latest stored date of a location.
+        It is read from the data (one seek on the location/date index) rather than from sync_state,
+        so rows stored by save_data or import_archive outside a sync are always counted.
+        :return: Date string "YYYY-MM-DD", or None if the location has no data.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("SELECT MAX(sample_date) FROM weather_data WHERE location = ?", (location,))
+            return cursor.fetchone()[0]
+    def fetch_month_counts(self, location="Winnipeg"):
+        """
+        Counts the stored days of every month of a location.
+        :return: Dictionary mapping (year, month) to the number of stored days.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''SELECT date_key / 100 AS year_month, COUNT(*) FROM weather_data
+                           WHERE location = ? GROUP BY year_month''', (location,))
+            return {(year_month // 100, year_month % 100): count for year_month, count in cursor}
+    def record_sync(self, location, status, rows_upserted=0):
+        """
+        Records the outcome of a sync and moves the location's high-water mark to its latest stored date.
+        :param location: Location that was synced.
+        :param status: Short status text, e.g. "ok" or an error message.
+        :param rows_upserted: Number of rows inserted or updated by the sync.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''INSERT INTO sync_state (location, high_water_mark, last_sync, last_status, rows_upserted)
+                           VALUES (?, (SELECT MAX(sample_date) FROM weather_data WHERE location = ?),
+                                   datetime('now'), ?, ?)
+                           ON CONFLICT(location) DO UPDATE SET
+                               high_water_mark = excluded.high_water_mark,
+                               last_sync = excluded.last_sync,
+                               last_status = excluded.last_status,
+                               rows_upserted = excluded.rows_upserted''',
+                           (location, location, status, rows_upserted))
+    def mark_backfill_month(self, location, year, month, status, rows_saved=0, error=None):
+        """
+        Records the outcome of one month of a backfill (its checkpoint).
+        :param location: Location being backfilled.
+        :param status: "done", "partial" (stored, but the month was not over yet) or "failed".
+        :param rows_saved: Number of rows the month stored.
+        :param error: Error text of a failed month.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''INSERT INTO backfill_months (location, year, month, status, attempts, rows_saved, error,
+                                                        updated_at)
+                           VALUES (?, ?, ?, ?, 1, ?, ?, datetime('now'))
+                           ON CONFLICT(location, year, month) DO UPDATE SET
+                               status = excluded.status,
+                               attempts = attempts + 1,
+                               rows_saved = excluded.rows_saved,
+                               error = excluded.error,
+                               updated_at = excluded.updated_at''',
+                           (location, year, month, status, rows_saved, error))
+    def fetch_backfill_status(self, location):
+        """
+        :return: Dictionary mapping (year, month) to (status, attempts) for every checkpointed month.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("SELECT year, month, status, attempts FROM backfill_months WHERE location = ?", (location,))
+            return {(year, month): (status, attempts) for year, month, status, attempts in cursor.fetchall()}
+    def clear_backfill(self, location):
+        """
+        Forgets a location's backfill checkpoints, so the next backfill starts over.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("DELETE FROM backfill_months WHERE location = ?", (location,))
+    def acquire_lock(self, name, owner, ttl=3600):
+        """
+        Takes an advisory lock stored as a row in the locks table.
+        The lock is granted if it is free, expired, or already held by the same owner.
+        :param name: Lock name, e.g. "update".
+        :param owner: Identifier of the caller (host and process ID).
+        :param ttl: Seconds after which the lock expires if it is never released.
+        :return: True if the lock was acquired.
+        """
+        now = time.time()
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute('''INSERT INTO locks (name, owner, expires_at) VALUES (?, ?, ?)
+                           ON CONFLICT(name) DO UPDATE SET
+                               owner = excluded.owner,
+                               expires_at = excluded.expires_at
+                           WHERE locks.expires_at < ? OR locks.owner = excluded.owner''',
+                           (name, owner, now + ttl, now))
+            return cursor.rowcount == 1
+    def release_lock(self, name, owner):
+        """
+        Releases an advisory lock if it is held by owner.
+        """
+        with DBCM(self.db_name, self.connections) as cursor:
+            cursor.execute("DELETE FROM locks WHERE name = ? AND owner = ?", (name, owner))
+    @contextmanager
+    def hold_lock(self, name, owner=None, ttl=600):
+        """
+        Holds an advisory lock for the duration of a with block, however long the block runs.
+        A background thread renews the lock every third of its TTL, so the TTL only bounds how long
+        the lock of a crashed process blocks others, not how long an update may take.
+        :param name: Lock name, e.g. UPDATE_LOCK.
+        :param owner: Identifier of the caller (defaults to host and process ID).
+        :param ttl: Seconds after which the lock expires if its holder stops renewing it.
+        :return: Context manager yielding True if the lock was acquired (and is held until the block
+        ends), False if another owner holds it.
+        """
+        owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        if not self.acquire_lock(name, owner, ttl):
+            yield False
+            return
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(ttl / 3):
+                if not self.acquire_lock(name, owner, ttl):
+                    logging.error("Lost the %s lock to another owner while holding it.", name)
+                    return
+
+        renewer = threading.Thread(target=renew, name=f"lock-{name}", daemon=True)
+        renewer.start()
+        try:
+            yield True
+        finally:
+            done.set()
+            renewer.join()
+            self.release_lock(name, owner)
     def purge_data(self):
         """
         Deletes all weather records from the database while keeping the table structure intact.
         """
-        with DBCM(self.db_name) as cursor:
+        with DBCM(self.db_name, self.connections) as cursor:
             cursor.execute("DELETE FROM weather_data")
+            cursor.execute("DELETE FROM sync_state")
+            cursor.execute("DELETE FROM monthly_stats")
+            cursor.execute("DELETE FROM yearly_stats")
+            cursor.execute("DELETE FROM backfill_months")
+            self._next_revision(cursor)
+        self.query_cache.invalidate()
+    def close(self):
+        """
+        Closes the persistent database connections.
+        """
+        self.connections.close()
             
 def main():
-    url = "https://climate.weather.gc.ca/climate_data/daily_data_e.html"
-    scraper = WeatherScraper(url)
+    from scrape_weather import WeatherScraper, BASE_URL
+    scraper = WeatherScraper(BASE_URL)
     current_date = datetime.today()
     current_year = current_date.year
     current_month = current_date.month
     data = scraper.fetch_weather_data(current_year, current_month, end_year=2020,end_month=1)
     try:
         database = DBOperations()
-        database.save_data(data)
-        print("Weather data saved successfully.")
+        summary = database.save_data(data)
+        print(f"Weather data saved successfully: {summary}")
     except Exception as e:
         print(f"Database operation failed: {e}")
     # Fetch and print all weather data from the database
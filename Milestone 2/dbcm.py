@@ -1,16 +1,74 @@
 import sqlite3
+import threading
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers are not blocked while an update is writing
+    "synchronous": "NORMAL",  # Safe with WAL and much cheaper than FULL
+    "cache_size": -16000,  # Page cache size in KiB when negative (16 MB)
+    "mmap_size": 64 * 1024 * 1024,  # Read through a memory map instead of read() calls
+    "temp_store": "MEMORY",  # Keep temporary tables and indexes in memory
+}
+class ConnectionManager:
+    """
+    Keeps one long-lived SQLite connection per thread for a database file.
+    Connections are opened lazily, tuned with PRAGMAs once, and reused by every
+    DBCM block on the same thread, so each query no longer pays for connection
+    setup and the statement cache stays warm between calls.
+    """
+    def __init__(self, db_name, pragmas=None, cached_statements=256, timeout=30):
+        """
+        :param db_name: Name of the SQLite database file.
+        :param pragmas: PRAGMA overrides merged into DEFAULT_PRAGMAS (use None as a value to skip one).
+        :param cached_statements: Number of prepared statements cached per connection.
+        :param timeout: Seconds to wait for a lock held by another connection.
+        """
+        self.db_name = db_name
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = []  # Every connection opened, so close() can reach all threads
+    def connection(self):
+        """
+        Returns the calling thread's connection, opening and tuning it on first use.
+        :return: sqlite3.Connection
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=self.timeout,
+                                   cached_statements=self.cached_statements,
+                                   check_same_thread=False)
+            for name, value in self.pragmas.items():
+                if value is not None:
+                    conn.execute(f"PRAGMA {name} = {value}")
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+    def close(self):
+        """
+        Closes every connection opened by this manager.
+        """
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections = []
+        self.local = threading.local()
 class DBCM:
     """
     Database Context Manager (DBCM) for handling SQLite database connections.
     This class simplifies database interactions by automatically managing
     connections, cursors, and transactions.
     """
-    def __init__(self, db_name):
+    def __init__(self, db_name, manager=None):
         """
         Initialize the database context manager with the database name.
         :param db_name: Name of the SQLite database file.
+        :param manager: Optional ConnectionManager to borrow a persistent connection from.
+        Without one, a connection is opened and closed for this block only.
         """
         self.db_name = db_name
+        self.manager = manager
         self.conn = None  # Database connection object
         self.cursor = None  # Cursor for executing SQL queries
     def __enter__(self):
@@ -18,14 +76,17 @@ class DBCM:
         Open a connection to the database and return a cursor.
         :return: SQLite cursor for executing queries.
         """
-        self.conn = sqlite3.connect(self.db_name)
+        if self.manager is not None:
+            self.conn = self.manager.connection()
+        else:
+            self.conn = sqlite3.connect(self.db_name)
         self.cursor = self.conn.cursor()
         return self.cursor
     def __exit__(self, exc_type, exc_value, exc_traceback):
         """
         Handle exit operations for the context manager.
         Commits changes if no exceptions occur; otherwise, rolls back transactions.
-        Closes the cursor and the database connection.
+        Closes the cursor, and the database connection unless it belongs to a ConnectionManager.
         :param exc_type: Exception type, if an exception occurred.
         :param exc_value: Exception value, if an exception occurred.
         :param exc_traceback: Exception traceback, if an exception occurred.
@@ -35,4 +96,5 @@ class DBCM:
         else:
             self.conn.rollback()  # Rollback changes in case of an error
         self.cursor.close()
-        self.conn.close()
\ No newline at end of file
+        if self.manager is None:
+            self.conn.close()
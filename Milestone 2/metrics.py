@@ -0,0 +1,153 @@
+"""Lightweight timing and counter instrumentation for the fetch/parse/store/plot pipeline.
+Code records spans (timed sections) and counters into a process-wide registry:
+
+    with metrics.span("http_get"):
+        response = session.get(url)
+    metrics.increment("bytes_downloaded", len(response.content))
+
+A run ends by writing metrics.summary() as JSON (write_json) and, optionally, as a
+Prometheus text exposition file (write_prometheus) for node_exporter's textfile
+collector. Recording costs two perf_counter calls and a lock, so the hooks stay on.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Metrics:
+    """
+    Thread-safe registry of timers and counters.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = {}  # name -> [count, total seconds, min seconds, max seconds]
+        self.counters = {}
+        self.started = time.time()
+
+    def reset(self):
+        """
+        Drops everything recorded so far, e.g. at the start of a run.
+        """
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def observe(self, name, seconds):
+        """
+        Records one timed occurrence of a span.
+        :param name: Span name, e.g. "http_get".
+        :param seconds: Duration in seconds.
+        """
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = min(timer[2], seconds)
+                timer[3] = max(timer[3], seconds)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Times the enclosed block, whether it returns or raises.
+        :param name: Span name.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """
+        Decorator timing every call of a function as a span.
+        :param name: Span name.
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def increment(self, name, value=1):
+        """
+        Adds to a counter.
+        :param name: Counter name, e.g. "rows_parsed".
+        :param value: Amount to add.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self):
+        """
+        :return: Dictionary with the run's "started" time, "elapsed_seconds", per-span
+        "timers" (count, total/mean/min/max seconds) and "counters".
+        """
+        with self.lock:
+            timers = {
+                name: {"count": count, "total_seconds": total, "mean_seconds": total / count,
+                       "min_seconds": low, "max_seconds": high}
+                for name, (count, total, low, high) in sorted(self.timers.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+            started = self.started
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+            "elapsed_seconds": time.time() - started,
+            "timers": timers,
+            "counters": counters,
+        }
+
+    def prometheus_text(self, prefix="weather_"):
+        """
+        Formats the metrics in the Prometheus text exposition format.
+        Spans become summaries (<name>_seconds_sum/_count), counters become <name>_total.
+        :param prefix: Prefix of every metric name.
+        :return: The exposition text.
+        """
+        summary = self.summary()
+        lines = []
+        for name, timer in summary["timers"].items():
+            metric = f"{prefix}{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_sum {timer['total_seconds']:.6f}")
+            lines.append(f"{metric}_count {timer['count']}")
+        for name, value in summary["counters"].items():
+            metric = f"{prefix}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Writes the summary as JSON.
+        """
+        _write_atomic(path, json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path, prefix="weather_"):
+        """
+        Writes the Prometheus text file; the file is replaced atomically so a scraper never reads half of it.
+        """
+        _write_atomic(path, self.prometheus_text(prefix))
+
+
+def _write_atomic(path, text):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as out_file:
+        out_file.write(text)
+    os.replace(temp_path, path)
+
+
+METRICS = Metrics()
+span = METRICS.span
+timed = METRICS.timed
+increment = METRICS.increment
@@ -0,0 +1,162 @@
+"""Record types for daily weather data.
+DailyObservation is one scraped day, in the (sample_date, min_temp, max_temp,
+avg_temp) layout save_data takes; WeatherRecord is one stored row, in the
+fetch_data layout. Both are named tuples: fields are read by name, instances
+carry no per-row __dict__, and they still unpack like the plain tuples they replace.
+
+ObservationBatch holds many days in four typed arrays (an int32 day number and
+three float64 temperatures, NaN where missing): 28 bytes per day instead of the
+few hundred of a dict of dicts keyed by date string. Days are stored as numbers,
+so the parser never formats dates and series loading never parses them; ISO
+strings are produced only when a batch is iterated.
+"""
+from array import array
+from collections import namedtuple
+from datetime import date
+import math
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# One scraped day; missing readings are None
+DailyObservation = namedtuple("DailyObservation", ["sample_date", "min_temp", "max_temp", "mean_temp"])
+# One stored row of the weather_data table; id is None for rows read from an archive
+WeatherRecord = namedtuple("WeatherRecord", ["id", "sample_date", "location", "min_temp", "max_temp", "avg_temp"])
+
+
+def record_factory(cursor, row):
+    """
+    sqlite3 row_factory building WeatherRecord rows from a query selecting RECORD_COLUMNS.
+    """
+    return WeatherRecord._make(row)
+
+
+def day_number(sample_date):
+    """
+    :param sample_date: date object or "YYYY-MM-DD" string.
+    :return: Days since 1970-01-01.
+    """
+    if isinstance(sample_date, str):
+        sample_date = date.fromisoformat(sample_date)
+    return sample_date.toordinal() - EPOCH_ORDINAL
+
+
+def _stored(value):
+    return math.nan if value is None else value
+
+
+def _reading(value):
+    return None if value != value else value
+
+
+class ObservationBatch:
+    """
+    Array-backed sequence of DailyObservation, in insertion order.
+    """
+    __slots__ = ("days", "min_temp", "max_temp", "mean_temp")
+
+    def __init__(self):
+        self.days = array("i")
+        self.min_temp = array("d")
+        self.max_temp = array("d")
+        self.mean_temp = array("d")
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Builds a batch from (sample_date, min_temp, max_temp, mean_temp) rows, e.g. DailyObservation tuples.
+        """
+        batch = cls()
+        for sample_date, min_temp, max_temp, mean_temp in rows:
+            batch.append_day(day_number(sample_date), min_temp, max_temp, mean_temp)
+        return batch
+
+    @classmethod
+    def from_columns(cls, days, min_temp, max_temp, mean_temp):
+        """
+        Builds a batch from equally long sequences: day numbers and temperatures (None where missing).
+        """
+        batch = cls()
+        batch.days = array("i", days)
+        batch.min_temp, batch.max_temp, batch.mean_temp = (
+            array("d", [math.nan if value is None else value for value in column])
+            for column in (min_temp, max_temp, mean_temp))
+        return batch
+
+    def append_day(self, day, min_temp, max_temp, mean_temp):
+        """
+        Adds a day given as a day number (see day_number); missing readings are None.
+        """
+        self.days.append(day)
+        self.min_temp.append(_stored(min_temp))
+        self.max_temp.append(_stored(max_temp))
+        self.mean_temp.append(_stored(mean_temp))
+
+    def append(self, observation):
+        """
+        Adds a DailyObservation (or any (sample_date, min_temp, max_temp, mean_temp) tuple).
+        """
+        self.append_day(day_number(observation[0]), *observation[1:])
+
+    def extend(self, other):
+        """
+        Appends another batch with array copies, or any iterable of observations.
+        """
+        if isinstance(other, ObservationBatch):
+            self.days.extend(other.days)
+            self.min_temp.extend(other.min_temp)
+            self.max_temp.extend(other.max_temp)
+            self.mean_temp.extend(other.mean_temp)
+        else:
+            for observation in other:
+                self.append(observation)
+
+    def until(self, last_date):
+        """
+        :param last_date: Last date to keep (date or "YYYY-MM-DD").
+        :return: New batch without the days after last_date.
+        """
+        last_day = day_number(last_date)
+        batch = ObservationBatch()
+        for index, day in enumerate(self.days):
+            if day <= last_day:
+                batch.append_day(day, *(_reading(column[index])
+                                        for column in (self.min_temp, self.max_temp, self.mean_temp)))
+        return batch
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getitem__(self, index):
+        return DailyObservation(date.fromordinal(self.days[index] + EPOCH_ORDINAL).isoformat(),
+                                _reading(self.min_temp[index]), _reading(self.max_temp[index]),
+                                _reading(self.mean_temp[index]))
+
+    def __iter__(self):
+        for day, min_temp, max_temp, mean_temp in zip(self.days, self.min_temp, self.max_temp, self.mean_temp):
+            yield DailyObservation(date.fromordinal(day + EPOCH_ORDINAL).isoformat(),
+                                   _reading(min_temp), _reading(max_temp), _reading(mean_temp))
+
+    def __eq__(self, other):
+        if not isinstance(other, ObservationBatch):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"ObservationBatch({len(self)} days)"
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + sum(column.buffer_info()[1] * column.itemsize
+                                             for column in (self.days, self.min_temp, self.max_temp, self.mean_temp))
+
+    def to_series(self, location=None):
+        """
+        Converts the batch into a WeatherSeries, reading the arrays with np.frombuffer
+        instead of a pass over Python objects. The days must be in date order.
+        """
+        import numpy as np
+        from weather_series import WeatherSeries
+        dates = np.frombuffer(self.days, dtype=np.int32).astype("datetime64[D]") if self.days else []
+        columns = [np.frombuffer(column, dtype=np.float64) if column else []
+                   for column in (self.min_temp, self.max_temp, self.mean_temp)]
+        return WeatherSeries(dates, *columns, location)
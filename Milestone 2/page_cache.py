@@ -0,0 +1,168 @@
+"""On-disk cache for scraped month pages.
+Pages are stored under a hash of (site, station, year, month), so pages of a
+stub or mirror site never stand in for the real one. A closed month no
+longer changes, so a page downloaded after its month closed (and late
+corrections had time to arrive) is served straight from disk; any other page,
+including one saved while its month was still current, is revalidated with
+ETag / If-Modified-Since before it is reused.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+import metrics
+
+FINAL_GRACE = timedelta(days=3)  # Corrections to a closed month still appear this long after it ends
+
+
+class PageCache:
+    """
+    Size-bounded, least-recently-used cache of raw month pages with hit/miss counters.
+    """
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        """
+        :param cache_dir: Directory holding the cached pages (created if missing).
+        :param max_bytes: Total size of cached pages above which the least recently used are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(cache_dir) if entry.name.endswith(".html")
+        )
+
+    @staticmethod
+    def make_key(source, station_id, year, month):
+        """
+        Builds the cache key of a month page.
+        :param source: Base URL of the site the page comes from.
+        :return: Hex digest identifying (site, station, year, month).
+        """
+        return hashlib.sha256(f"{source}:{station_id}:{year:04d}:{month:02d}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_immutable(year, month, fetched_at, grace=FINAL_GRACE):
+        """
+        Checks whether a cached page is final, i.e. it was downloaded after its month closed
+        (plus a grace period for late corrections) and can no longer change.
+        :param fetched_at: Time the page was downloaded, in seconds since the epoch (the "fetched_at" metadata).
+        :param grace: Time after the end of the month during which the page may still change.
+        """
+        month_end = datetime.combine(date(year + month // 12, month % 12 + 1, 1), datetime.min.time())
+        return fetched_at >= (month_end + grace).timestamp()
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, key + ".html"), os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, source, station_id, year, month):
+        """
+        Looks up a cached page without counting it as a hit or miss.
+        :param source: Base URL of the site the page comes from.
+        :return: (body, metadata) tuple, or None if the page is not cached.
+        """
+        page_path, meta_path = self._paths(self.make_key(source, station_id, year, month))
+        try:
+            with open(page_path, encoding="utf-8") as page_file:
+                body = page_file.read()
+            with open(meta_path, encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        os.utime(page_path)  # Mark as recently used for eviction
+        return body, meta
+
+    def put(self, source, station_id, year, month, body, etag=None, last_modified=None):
+        """
+        Stores a page and its validators, evicting old pages if the cache grows too large.
+        :param source: Base URL of the site the page comes from.
+        """
+        key = self.make_key(source, station_id, year, month)
+        page_path, meta_path = self._paths(key)
+        meta = {
+            "source": source,
+            "station_id": station_id,
+            "year": year,
+            "month": month,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        data = body.encode("utf-8")
+        with self.lock:
+            old_size = os.path.getsize(page_path) if os.path.exists(page_path) else 0
+            for path, content in ((page_path, data), (meta_path, json.dumps(meta).encode("utf-8"))):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as tmp_file:
+                    tmp_file.write(content)
+                os.replace(tmp_path, path)
+            self.total_bytes += len(data) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        """
+        Removes least recently used pages until the cache fits in max_bytes.
+        Must be called with the lock held.
+        """
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".html")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            key = entry.name[:-len(".html")]
+            if key == keep:
+                continue
+            size = entry.stat().st_size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def record(self, outcome):
+        """
+        Increments a counter.
+        :param outcome: "hit", "miss" or "revalidated".
+        """
+        with self.lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+        metrics.increment(f"cache_{outcome}")
+
+    def stats(self):
+        """
+        :return: Dictionary of cache counters and current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "bytes": self.total_bytes,
+        }
+
+    def clear(self):
+        """
+        Deletes every cached page.
+        """
+        with self.lock:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith((".html", ".json")):
+                    os.remove(entry.path)
+            self.total_bytes = 0
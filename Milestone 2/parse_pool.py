@@ -0,0 +1,57 @@
+"""Process pool for parsing month pages on every core.
+table_parser is pure Python, so parsing threads share one core through the GIL.
+For large backfills served from the page cache, parsing is the bottleneck. This
+module hands raw pages to worker processes in chunks: parse_pages runs there and
+sends back one ObservationBatch per page. That is about 1 KB of arrays instead of
+the 9 KB page, ready for save_data. Chunking keeps the cost of moving work between
+processes small next to the parsing itself.
+
+Workers are started with forkserver (spawn where it is unavailable), not fork, so
+a pool can be created safely by a process that is already running threads.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from observations import ObservationBatch
+from table_parser import parse_month_page
+
+PAGES_PER_TASK = 16
+
+
+def parse_pages(pages):
+    """
+    Parses a chunk of month pages; runs in a worker process.
+    :param pages: List of (html, year, month) tuples.
+    :return: List with the ObservationBatch of each page (empty when the page has no data),
+    or the exception raised while parsing it.
+    """
+    results = []
+    for html, year, month in pages:
+        try:
+            results.append(ObservationBatch() if "No data available" in html else parse_month_page(html, year, month))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+def create_parse_pool(processes=None):
+    """
+    :param processes: Number of worker processes (defaults to the number of CPUs).
+    :return: ProcessPoolExecutor ready to run parse_pages.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=processes or os.cpu_count(), mp_context=context)
+
+
+def parse_all(pages, pool, pages_per_task=PAGES_PER_TASK):
+    """
+    Parses pages on a process pool, chunk by chunk.
+    :param pages: List of (html, year, month) tuples.
+    :param pool: Executor from create_parse_pool.
+    :param pages_per_task: Pages sent to a worker at a time.
+    :return: Generator of results in page order (see parse_pages).
+    """
+    chunks = [pages[start:start + pages_per_task] for start in range(0, len(pages), pages_per_task)]
+    for results in pool.map(parse_pages, chunks):
+        yield from results
@@ -6,25 +6,81 @@ Samson Fakiye
 
 import matplotlib.pyplot as plt
 from db_operations import DBOperations
+import metrics
+from rollups import box_stats
 import os
 
 class PlotOperations:
     """
     Handles plotting operations for visualizing weather data.
     """
-    def plot_boxplot(self, weather_data):
+    def _finish(self, output):
+        """
+        Shows the current figure, or saves it to a file and closes it when output is given.
+        :param output: Path of the PNG/SVG file to write (format taken from the extension), or None.
+        """
+        if output is None:
+            plt.show()
+        else:
+            # Drawing happens here, so this span is the render time (the figure set-up is lazy)
+            with metrics.span("plot_render"):
+                plt.savefig(output)
+            plt.close()
+
+    def plot_boxplot(self, weather_data, output=None, title="Monthly Mean Temperature Distribution"):
+        """
+        Plots the distribution of daily mean temperatures for each month.
+        :param weather_data: Dictionary mapping month (1-12) to mean temperatures,
+        or a WeatherSeries, which is grouped by month in one vectorized pass.
+        :param output: Optional file to save the plot to instead of showing it.
+        :param title: Plot title.
+        """
+        if hasattr(weather_data, "group_by_month"):
+            weather_data = weather_data.group_by_month()
         plt.figure(figsize=(10, 6))
-        plt.boxplot([weather_data.get(month, []) for month in range(1, 13)], 
-                    labels=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                            'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+        plt.boxplot([weather_data.get(month, []) for month in range(1, 13)])
+        # Set the tick labels separately: boxplot's labels= keyword was removed in newer Matplotlib
+        plt.xticks(range(1, 13), ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
         plt.xlabel("Month")
         plt.ylabel("Mean Temperature (°C)")
-        plt.title("Monthly Mean Temperature Distribution")
+        plt.title(title)
         plt.grid(True)
         plt.tight_layout()
-        plt.show()
+        self._finish(output)
 
-    def plot_lineplot(self, days, temperatures, month, year):
+    def plot_boxplot_summary(self, month_sketches, output=None, title="Monthly Mean Temperature Distribution"):
+        """
+        Plots the same box plot as plot_boxplot from per-month rollup sketches
+        (DBOperations.fetch_month_distributions), without the daily values.
+        :param month_sketches: Dictionary mapping month (1-12) to a temperature sketch.
+        :param output: Optional file to save the plot to instead of showing it.
+        :param title: Plot title.
+        """
+        labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        positions, stats = [], []
+        for month in range(1, 13):
+            month_stats = box_stats(month_sketches.get(month, {}), labels[month - 1])
+            if month_stats is not None:
+                positions.append(month)
+                stats.append(month_stats)
+        plt.figure(figsize=(10, 6))
+        plt.gca().bxp(stats, positions=positions, showmeans=False)
+        plt.xticks(range(1, 13), labels)
+        plt.xlabel("Month")
+        plt.ylabel("Mean Temperature (°C)")
+        plt.title(title)
+        plt.grid(True)
+        plt.tight_layout()
+        self._finish(output)
+
+    def plot_lineplot(self, days, temperatures, month, year, output=None):
+        """
+        Plots the daily mean temperatures of a month.
+        :param days: Day numbers (list or array).
+        :param temperatures: Mean temperatures matching days.
+        :param output: Optional file to save the plot to instead of showing it.
+        """
         plt.figure(figsize=(10, 6))
         plt.plot(days, temperatures, marker='o', linestyle='-', label="Mean Temperature")
         plt.xlabel("Day")
@@ -34,7 +90,33 @@ class PlotOperations:
         plt.grid(True)
         plt.legend()
         plt.tight_layout()
-        plt.show()
+        self._finish(output)
+
+    def plot_anomalies(self, periods, monthly_anomalies, dates=None, rolling=None, output=None,
+                       title="Monthly Mean Temperature Anomaly"):
+        """
+        Plots monthly temperature anomalies as bars (red above the normal, blue below),
+        optionally with a rolling mean of the daily anomalies as a line.
+        :param periods: datetime64[M] array of months (climate_analytics.period_means).
+        :param monthly_anomalies: Mean anomaly of each month, NaN for months without data.
+        :param dates: datetime64[D] array matching rolling.
+        :param rolling: Rolling mean of the daily anomalies (climate_analytics.rolling_mean).
+        :param output: Optional file to save the plot to instead of showing it.
+        :param title: Plot title.
+        """
+        plt.figure(figsize=(12, 6))
+        colors = ["tab:red" if value > 0 else "tab:blue" for value in monthly_anomalies]
+        plt.bar(periods.astype("datetime64[D]"), monthly_anomalies, width=25, color=colors, label="Monthly anomaly")
+        if rolling is not None:
+            plt.plot(dates, rolling, color="black", linewidth=1.5, label="Rolling mean")
+        plt.axhline(0, color="grey", linewidth=0.8)
+        plt.xlabel("Date")
+        plt.ylabel("Anomaly (°C)")
+        plt.title(title)
+        plt.grid(True)
+        plt.legend()
+        plt.tight_layout()
+        self._finish(output)
 
 def main():
     # Get the directory where the script is located
@@ -46,15 +128,7 @@ def main():
         start_year = int(input("Enter the start year for box plot (e.g. 2020): "))
         end_year = int(input("Enter the end year for box plot (e.g. 2024): "))
         location = input("Enter the location (default: Winnipeg): ") or "Winnipeg"
-        records = db.fetch_data(location)
-        
-        weather_data = {m: [] for m in range(1, 13)}
-        for record in records:
-            date = record[1]
-            mean_temp = record[5]
-            year, m, _ = map(int, date.split('-'))
-            if start_year <= year <= end_year:
-                weather_data[m].append(mean_temp)
+        weather_data = db.fetch_monthly_means(location, start_year, end_year)
         if any(weather_data.values()):
             plotter.plot_boxplot(weather_data)
         else:
@@ -65,15 +139,9 @@ def main():
         year = int(input("Enter the year for the line plot (e.g. 2023): "))
         selected_month = int(input("Enter the month (1-12) for the line plot: "))
         location = input("Enter the location (default: Winnipeg): ") or "Winnipeg"
-        records = db.fetch_data(location)
-        days, temperatures = [], []
-        for record in records:
-            date = record[1]
-            mean_temp = record[5]
-            rec_year, rec_month, day = map(int, date.split('-'))
-            if rec_year == year and rec_month == selected_month:
-                days.append(day)
-                temperatures.append(mean_temp)
+        daily_means = db.fetch_daily_means(location, year, selected_month)
+        days = [day for day, _ in daily_means]
+        temperatures = [mean_temp for _, mean_temp in daily_means]
         if days and temperatures:
             plotter.plot_lineplot(days, temperatures, selected_month, year)
         else:
@@ -0,0 +1,147 @@
+"""In-memory, read-through cache of DBOperations query results.
+Results are keyed on the query method and its arguments and stored together with
+the data version they were read at: a counter that every write through
+DBOperations increments, and that DBOperations also advances when another
+connection (the scheduler, a second process) has committed, as shown by SQLite's
+PRAGMA data_version and the database's revision counter. The version does not
+depend on the connection, so every thread shares the same entries. A lookup made
+at a different version is a miss, so cached results never outlive the data they
+came from.
+
+Cached results are shared between callers, like functools.lru_cache results:
+treat them as read-only.
+"""
+from collections import OrderedDict
+import functools
+import inspect
+import sys
+import threading
+import metrics
+
+
+def estimate_size(value, sample=16):
+    """
+    Estimates the memory held by a query result: nested lists, tuples and dicts of scalars.
+    Large containers are estimated from their first items rather than walked in full.
+    :param value: Result to measure.
+    :param sample: Items measured per container before extrapolating.
+    :return: Approximate size in bytes.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = list(value.items())
+        measured = sum(estimate_size(key, sample) + estimate_size(item, sample) for key, item in items[:sample])
+    elif isinstance(value, (list, tuple)):
+        items = value
+        measured = sum(estimate_size(item, sample) for item in value[:sample])
+    else:
+        return size
+    if len(items) > sample:
+        measured = measured * len(items) // sample
+    return size + measured
+
+
+class QueryCache:
+    """
+    Size-bounded, least-recently-used map of query results with hit/miss counters.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        """
+        :param max_bytes: Estimated size of cached results above which the least recently used are evicted;
+        0 disables caching.
+        """
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (version, result, size)
+        self.total_bytes = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self):
+        """
+        Advances the data version and drops every cached result; called after each write.
+        """
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get(self, key, version):
+        """
+        Looks up a result cached at the given data version.
+        :return: (True, result) on a hit, (False, None) on a miss.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment("query_cache_hit")
+                return True, entry[1]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+        metrics.increment("query_cache_miss")
+        return False, None
+
+    def put(self, key, version, result):
+        """
+        Stores a result read at the given data version, evicting least recently used results as needed.
+        Results larger than the whole budget are not cached.
+        """
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (version, result, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self.total_bytes -= self.entries.pop(key)[2]
+
+    def stats(self):
+        """
+        :return: Dictionary of entries, bytes, hits, misses and evictions.
+        """
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.total_bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+def cached_query(method):
+    """
+    Decorates a DBOperations query method so its results are served from self.query_cache
+    while the data version (self.cache_version()) is unchanged. Calls that bind the same
+    arguments (positional, keyword or default) share one entry.
+    """
+    signature = inspect.signature(method)
+    names = tuple(signature.parameters)[1:]
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self.query_cache
+        if not cache.max_bytes:
+            return method(self, *args, **kwargs)
+        # Keyed on the bound arguments with defaults applied, so fetch_data(), fetch_data("Winnipeg")
+        # and fetch_data(location="Winnipeg") share one entry
+        if not kwargs and len(args) == len(names):
+            key = (method.__name__, tuple(zip(names, args)))
+        else:
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = (method.__name__, tuple(bound.arguments.items())[1:])
+        version = self.cache_version()
+        hit, result = cache.get(key, version)
+        if not hit:
+            result = method(self, *args, **kwargs)
+            cache.put(key, version, result)
+        return result
+    return wrapper
@@ -0,0 +1,180 @@
+"""Headless batch rendering of weather plots.
+Plots are drawn with Matplotlib's non-interactive Agg backend in worker
+processes and written to PNG/SVG files. Every file name carries a key derived
+from (plot type, parameters, data version), so a plot whose data has not
+changed is never rendered twice.
+"""
+import argparse
+import hashlib
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from db_operations import DBOperations, DB_PATH
+
+PLOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plots")
+
+RenderJob = namedtuple("RenderJob", ["kind", "location", "params"])
+
+_worker_db = None
+_worker_series = {}
+
+
+def lineplot_jobs(location, start_year, end_year):
+    """
+    Builds one line plot job for every month of every year in a range.
+    :return: List of RenderJob tuples with params (year, month).
+    """
+    return [RenderJob("lineplot", location, (year, month))
+            for year in range(start_year, end_year + 1) for month in range(1, 13)]
+
+
+def decade_boxplot_jobs(location, start_year, end_year):
+    """
+    Builds one box plot job per decade overlapping a year range.
+    :return: List of RenderJob tuples with params (first year, last year).
+    """
+    return [RenderJob("boxplot", location, (max(decade, start_year), min(decade + 9, end_year)))
+            for decade in range(start_year - start_year % 10, end_year + 1, 10)]
+
+
+def job_date_range(job):
+    """
+    :return: (first date, last date) of the data a job plots, as ISO strings.
+    """
+    if job.kind == "lineplot":
+        year, month = job.params
+        return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31"
+    start_year, end_year = job.params
+    return f"{start_year:04d}-01-01", f"{end_year:04d}-12-31"
+
+
+def job_key(job, data_version, fmt):
+    """
+    Computes the cache key of a rendered plot.
+    :return: Hex digest of (plot type, location, parameters, data version, format).
+    """
+    raw = f"{job.kind}|{job.location}|{job.params}|{data_version}|{fmt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def job_prefix(job):
+    """
+    File name prefix shared by every version of a plot, e.g. "lineplot_Winnipeg_2024-02".
+    """
+    if job.kind == "lineplot":
+        params = "{:04d}-{:02d}".format(*job.params)
+    else:
+        params = "{}-{}".format(*job.params)
+    return f"{job.kind}_{job.location.replace(' ', '_')}_{params}"
+
+
+def _init_worker(db_name):
+    """
+    Sets up a worker process: selects the Agg backend before pyplot is used and opens the database.
+    """
+    global _worker_db
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    _worker_db = DBOperations(db_name)
+
+
+def _render(job, output):
+    """
+    Renders a single job to a file inside a worker process.
+    :return: (output path, True) if rendered, (output path, False) if there was no data to plot.
+    """
+    import numpy as np
+    from plot_operations import PlotOperations
+    from weather_series import WeatherSeries
+    plotter = PlotOperations()
+    if job.kind == "lineplot":
+        if job.location not in _worker_series:
+            _worker_series[job.location] = WeatherSeries.from_db(_worker_db, job.location)
+        year, month = job.params
+        month_series = _worker_series[job.location].month(year, month)
+        present = ~np.isnan(month_series.mean_temp)
+        if not present.any():
+            return output, False
+        plotter.plot_lineplot(month_series.days[present], month_series.mean_temp[present], month, year, output=output)
+    elif job.kind == "boxplot":
+        start_year, end_year = job.params
+        month_sketches = _worker_db.fetch_month_distributions(job.location, start_year, end_year)
+        if not any(month_sketches.values()):
+            return output, False
+        plotter.plot_boxplot_summary(month_sketches, output=output,
+                                     title=f"Monthly Mean Temperature Distribution {start_year}-{end_year}")
+    else:
+        raise ValueError(f"Unknown plot type: {job.kind}")
+    return output, True
+
+
+def render_batch(jobs, out_dir=PLOT_DIR, fmt="png", workers=None, db_name=DB_PATH):
+    """
+    Renders a batch of plots in parallel, skipping plots already rendered for the current data.
+    The data version is taken over each plot's own date range, so revising one month only
+    re-renders the plots that show it. Older renders of the same plot are deleted when a
+    new version is written.
+    :param jobs: Iterable of RenderJob tuples.
+    :param out_dir: Directory the files are written to.
+    :param fmt: "png" or "svg".
+    :param workers: Number of worker processes (defaults to the CPU count).
+    :param db_name: Database to read the data from.
+    :return: Dictionary with "rendered", "cached" and "empty" counts and the list of "files".
+    """
+    if fmt not in ("png", "svg"):
+        raise ValueError(f"fmt must be 'png' or 'svg', not {fmt!r}")
+    os.makedirs(out_dir, exist_ok=True)
+    db = DBOperations(db_name)
+    existing = set(os.listdir(out_dir))
+    summary = {"rendered": 0, "cached": 0, "empty": 0, "files": []}
+    pending = []
+    for job in jobs:
+        version = db.data_version(job.location, *job_date_range(job))
+        name = f"{job_prefix(job)}_{job_key(job, version, fmt)}.{fmt}"
+        if name in existing:
+            summary["cached"] += 1
+            summary["files"].append(os.path.join(out_dir, name))
+        else:
+            pending.append((job, name))
+    db.close()
+    if not pending:
+        return summary
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_name,)) as executor:
+        outputs = [os.path.join(out_dir, name) for _, name in pending]
+        for (job, name), (output, drawn) in zip(pending, executor.map(_render, [job for job, _ in pending], outputs)):
+            if not drawn:
+                summary["empty"] += 1
+                continue
+            summary["rendered"] += 1
+            summary["files"].append(output)
+            prefix = job_prefix(job) + "_"
+            for stale in existing:
+                if stale.startswith(prefix) and stale.endswith(f".{fmt}") and stale != name:
+                    os.remove(os.path.join(out_dir, stale))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render weather plots to files without a display.")
+    parser.add_argument("start_year", type=int, help="First year to plot")
+    parser.add_argument("end_year", type=int, help="Last year to plot")
+    parser.add_argument("--location", default="Winnipeg")
+    parser.add_argument("--lineplots", action="store_true", help="Render a line plot for every month")
+    parser.add_argument("--boxplots", action="store_true", help="Render a box plot for every decade")
+    parser.add_argument("--format", choices=("png", "svg"), default="png")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=PLOT_DIR, help="Output directory")
+    parser.add_argument("--db", default=DB_PATH, help="Database file")
+    args = parser.parse_args()
+    jobs = []
+    if args.lineplots or not args.boxplots:
+        jobs += lineplot_jobs(args.location, args.start_year, args.end_year)
+    if args.boxplots:
+        jobs += decade_boxplot_jobs(args.location, args.start_year, args.end_year)
+    summary = render_batch(jobs, args.out, args.format, args.workers, args.db)
+    print(f"Rendered {summary['rendered']}, reused {summary['cached']}, "
+          f"skipped {summary['empty']} without data. Files in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Quantile sketches for the monthly and yearly rollup tables.
+A sketch is a histogram of daily mean temperatures in 0.1 °C bins, which is the
+precision the climate site publishes, so quantiles computed from it are exact.
+Sketches of different months add up bin by bin, which is what lets a box plot
+over decades be drawn from a few hundred rollup rows instead of every daily row.
+Sketches are stored as JSON objects mapping bin (temperature * 10) to day count.
+"""
+import json
+import math
+
+SKETCH_SCALE = 10  # Bins per degree
+
+
+def encode_sketch(bins):
+    """
+    :param bins: Dictionary mapping bin number to count.
+    :return: JSON text for the sketch column.
+    """
+    return json.dumps({str(key): count for key, count in sorted(bins.items())}, separators=(",", ":"))
+
+
+def decode_sketch(text):
+    """
+    :param text: JSON text from a sketch column (None for an empty sketch).
+    :return: Dictionary mapping bin number to count.
+    """
+    if not text:
+        return {}
+    return {int(key): count for key, count in json.loads(text).items()}
+
+
+def merge_sketches(sketches):
+    """
+    Adds sketches bin by bin.
+    :param sketches: Iterable of decoded sketches.
+    :return: The combined sketch.
+    """
+    merged = {}
+    for sketch in sketches:
+        for key, count in sketch.items():
+            merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def sketch_quantile(sketch, q):
+    """
+    Computes a quantile with linear interpolation between ranks (the NumPy default).
+    :param sketch: Decoded sketch.
+    :param q: Quantile between 0 and 1.
+    :return: The quantile in degrees, or None for an empty sketch.
+    """
+    keys = sorted(sketch)
+    total = sum(sketch.values())
+    if not total:
+        return None
+    position = q * (total - 1)
+    lower_rank, upper_rank = math.floor(position), math.ceil(position)
+    lower = upper = None
+    seen = 0
+    for key in keys:
+        seen += sketch[key]
+        if lower is None and seen > lower_rank:
+            lower = key
+        if seen > upper_rank:
+            upper = key
+            break
+    value = lower + (upper - lower) * (position - lower_rank)
+    return value / SKETCH_SCALE
+
+
+def box_stats(sketch, label=None, whisker=1.5):
+    """
+    Computes the statistics Matplotlib's bxp() draws, like boxplot() would from the raw values.
+    :param sketch: Decoded sketch.
+    :param label: Box label.
+    :param whisker: Whisker reach as a multiple of the interquartile range.
+    :return: Dictionary with med, q1, q3, whislo, whishi, fliers, mean and label,
+    or None for an empty sketch.
+    """
+    if not sketch:
+        return None
+    q1, median, q3 = (sketch_quantile(sketch, q) for q in (0.25, 0.5, 0.75))
+    reach = whisker * (q3 - q1)
+    values = sorted(sketch)
+    inside = [key / SKETCH_SCALE for key in values if q1 - reach <= key / SKETCH_SCALE <= q3 + reach]
+    fliers = [key / SKETCH_SCALE for key in values for _ in range(sketch[key])
+              if not q1 - reach <= key / SKETCH_SCALE <= q3 + reach]
+    total = sum(sketch.values())
+    return {
+        "med": median, "q1": q1, "q3": q3,
+        "whislo": inside[0] if inside else q1, "whishi": inside[-1] if inside else q3,
+        "fliers": fliers,
+        "mean": sum(key * count for key, count in sketch.items()) / SKETCH_SCALE / total,
+        "label": label,
+    }
@@ -0,0 +1,105 @@
+"""Background scheduler that keeps the weather database up to date.
+Runs incremental syncs of every registered station on a fixed interval with
+random jitter, without any interactive prompts. Overlapping runs (from several
+daemons, cron jobs or the interactive menu's update) are prevented with the
+advisory UPDATE_LOCK row in the database, renewed for as long as a run lasts.
+
+Usage:
+    python scheduler.py                   # sync every hour (plus up to 5 minutes of jitter)
+    python scheduler.py --once            # run a single sync and exit
+    python scheduler.py --interval 21600 --jitter 900
+"""
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import metrics
+from db_operations import DBOperations, DB_PATH, UPDATE_LOCK
+from page_cache import PageCache
+from scrape_weather import WeatherScraper, BASE_URL
+from sync_engine import pipelined_sync
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+LOG_FILE = os.path.join(script_dir, "weather_process.log")
+PAGE_CACHE_DIR = os.path.join(script_dir, "page_cache")
+LOCK_NAME = UPDATE_LOCK
+
+
+def run_once(db, scraper, owner, lock_ttl=600, cancel=None):
+    """
+    Runs one incremental sync of every registered station while holding the update lock.
+    :param db: DBOperations instance.
+    :param scraper: WeatherScraper shared by all stations.
+    :param owner: Lock owner identifier.
+    :param lock_ttl: Seconds after which a lock left by a crashed run expires; the lock is renewed while
+    the sync runs, so this does not limit the length of a run.
+    :param cancel: Optional threading.Event that stops the sync after the month being written.
+    :return: Sync results per location, or None if another run holds the lock.
+    """
+    with db.hold_lock(LOCK_NAME, owner, lock_ttl) as acquired:
+        if not acquired:
+            logging.info("Skipping scheduled update: another update is running.")
+            return None
+        results = pipelined_sync(db, scraper, cancel=cancel)
+    for location, summary in results.items():
+        if isinstance(summary, Exception):
+            logging.error("Scheduled update of %s failed: %s", location, summary)
+        else:
+            logging.info("Scheduled update of %s: %s", location, summary)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run incremental weather data updates on a schedule.")
+    parser.add_argument("--interval", type=float, default=3600, help="Seconds between runs (default: 3600)")
+    parser.add_argument("--jitter", type=float, default=300, help="Maximum random delay added to each wait")
+    parser.add_argument("--once", action="store_true", help="Run a single update and exit")
+    parser.add_argument("--db", default=DB_PATH, help="Database file")
+    parser.add_argument("--base-url", default=BASE_URL, help="Daily data page of the climate site")
+    parser.add_argument("--lock-ttl", type=float, default=600,
+                        help="Seconds before the lock of a crashed run expires; held locks are renewed "
+                             "(default: 600)")
+    parser.add_argument("--metrics", default=None, help="JSON file rewritten with the metrics of every run")
+    parser.add_argument("--prometheus", default=None,
+                        help="Prometheus text file rewritten after every run (for node_exporter's textfile collector)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    db = DBOperations(args.db)
+    scraper = WeatherScraper(args.base_url, cache=PageCache(PAGE_CACHE_DIR))
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logging.info("Received signal %s, stopping after the month being written.", signum)
+        stop.set()
+        # A second signal terminates immediately
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    logging.info("Scheduler started (interval %ss, jitter %ss).", args.interval, args.jitter)
+    while not stop.is_set():
+        metrics.METRICS.reset()
+        try:
+            run_once(db, scraper, owner, args.lock_ttl, cancel=stop)
+        except Exception as error:
+            logging.error("Scheduled update failed: %s", error, exc_info=True)
+        if args.metrics:
+            metrics.METRICS.write_json(args.metrics)
+        if args.prometheus:
+            metrics.METRICS.write_prometheus(args.prometheus)
+        if args.once:
+            break
+        stop.wait(args.interval + random.uniform(0, args.jitter))
+    db.close()
+    logging.info("Scheduler stopped.")
+
+
+if __name__ == "__main__":
+    main()
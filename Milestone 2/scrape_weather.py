@@ -1,29 +1,117 @@
 import requests
-from html.parser import HTMLParser
+import threading
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urljoin, urlparse, parse_qs, urlencode
 from datetime import datetime
-class WeatherScraper(HTMLParser):
+from observations import ObservationBatch
+from table_parser import parse_month_page, find_prev_month_href
+import metrics
+BASE_URL = "https://climate.weather.gc.ca/climate_data/daily_data_e.html"
+STATION_ID = 27174  # Winnipeg Richardson Int'l A, the default station
+REQUESTS_PER_SECOND = 2  # Default request rate to the climate site
+def month_range(start_year, start_month, end_year, end_month):
+    """
+    Lists the months to scrape, walking backwards from the start month to the end month (inclusive).
+    :param start_year: Most recent year to scrape.
+    :param start_month: Most recent month to scrape.
+    :param end_year: Oldest year to scrape.
+    :param end_month: Oldest month to scrape.
+    :return: List of (year, month) tuples, newest first.
+    """
+    months = []
+    year, month = start_year, start_month
+    while (year, month) >= (end_year, end_month):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months
+def create_session(pool_size=10, retries=3, backoff_factor=0.5):
+    """
+    Creates a long-lived HTTP session shared by every request of a scraper.
+    Connections are pooled and kept alive, responses are negotiated as gzip/deflate,
+    and 429/5xx responses and connection errors are retried with exponential backoff
+    (honouring Retry-After).
+    :param pool_size: Number of pooled connections kept per host.
+    :param retries: Number of retries for a failed request.
+    :param backoff_factor: Base delay in seconds for the exponential backoff.
+    :return: A configured requests.Session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+class RateLimiter:
+    """
+    Thread-safe politeness limiter for a single host.
+    Caps the number of requests in flight and spaces out request start times.
+    """
+    def __init__(self, max_concurrent=4, requests_per_second=REQUESTS_PER_SECOND):
+        """
+        :param max_concurrent: Maximum number of simultaneous requests to the host.
+        :param requests_per_second: Maximum request rate (None for no rate limit, e.g. against the local stub server).
+        """
+        self.semaphore = threading.BoundedSemaphore(max_concurrent)
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+    def __enter__(self):
+        self.semaphore.acquire()
+        if self.min_interval:
+            with self.lock:
+                now = time.monotonic()
+                wait = self.next_slot - now
+                self.next_slot = max(now, self.next_slot) + self.min_interval
+            if wait > 0:
+                time.sleep(wait)
+        return self
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.semaphore.release()
+class WeatherScraper:
     """
     A web scraper to extract historical weather data from a given weather website.
-    This class parses HTML tables containing weather data and stores it in a dictionary.
+    Pages are parsed with the stateless engine in table_parser and the results are
+    collected in an ObservationBatch.
     """
-    def __init__(self, base_url):
+    def __init__(self, base_url, rate_limiter=None, session=None, timeout=10, cache=None, station_id=STATION_ID):
         """
         Initialize the WeatherScraper with the base URL.
+        Scrapers of different stations can share one rate limiter, session and cache,
+        which keeps a global request budget for the host however many stations run at once.
         :param base_url: The base URL of the weather website.
+        :param rate_limiter: Optional RateLimiter shared by all requests to the host.
+        :param session: Optional pooled session (see create_session); one is created if omitted.
+        :param timeout: Request timeout in seconds.
+        :param cache: Optional PageCache used to avoid downloading month pages again.
+        :param station_id: Climate station ID to scrape.
         """
-        super().__init__()
         self.base_url = base_url
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.cache = cache
+        self.station_id = station_id
         self.prev_month_url = None  # URL for navigating to the previous month's data
-        self.is_prev_link = False  # Flag to detect the previous month navigation link
-        self.weather_data = {}  # Dictionary to store extracted weather data
-        self.in_table = False  # Flag to detect when inside a table element
-        self.in_row = False  # Flag to detect when inside a row element
-        self.in_td = False  # Flag to detect when inside a table cell
-        self.current_data = []  # Temporary list to store row data
-        self.valid_row = False  # Flag to determine if row contains valid data
-        self.all_data = []  # List to store all extracted weather data
-        self.col_index = 0  # Column index tracker
+        self.weather_data = ObservationBatch()  # Days scraped by fetch_weather_data, newest month first
+    def for_station(self, station_id):
+        """
+        Creates a scraper for another station sharing this scraper's rate limiter, session and cache.
+        :param station_id: Climate station ID to scrape.
+        :return: A new WeatherScraper.
+        """
+        return WeatherScraper(self.base_url, self.rate_limiter, self.session, self.timeout, self.cache, station_id)
     def clean_url(self, base_url, href):
         """
         Cleans and constructs a URL by removing unnecessary query parameters.
@@ -38,94 +126,197 @@ class WeatherScraper(HTMLParser):
         cleaned_query = urlencode(query_params, doseq=True)
         cleaned_url = f"{parsed_url.scheme}://{parsed_url.netloc}{parsed_url.path}?{cleaned_query}"
         return cleaned_url
-    def handle_starttag(self, tag, attrs):
-        """
-        Handles the start of an HTML tag while parsing.
-        Detects table elements, rows, cells, and navigation links.
-        :param tag: The HTML tag being processed.
-        :param attrs: The attributes associated with the tag.
-        """
-        attrs_dict = dict(attrs)
-        if tag == 'li' and attrs_dict.get('id') == 'nav-prev1':
-            self.is_prev_link = True
-        if self.is_prev_link and tag == 'a' and 'href' in attrs_dict:
-            self.prev_month_url = self.clean_url(self.base_url, attrs_dict['href'])
-        if tag == "table":
-            self.in_table = True
-        elif self.in_table and tag == "tr":
-            self.in_row = True
-            self.col_index = 0
-            self.current_data = []
-            self.valid_row = False
-        elif self.in_row and tag == "td":
-            self.in_td = True
-    def handle_endtag(self, tag):
-        """
-        Handles the closing of an HTML tag.
-        :param tag: The HTML tag being closed.
-        """
-        if tag == "table":
-            self.in_table = False
-        elif tag == "tr":
-            if self.valid_row and len(self.current_data) >= 3:
-                self.all_data.append(self.current_data.copy())
-            self.in_row = False
-        elif tag == "td":
-            self.in_td = False
-        if tag == 'li' and self.is_prev_link:
-            self.is_prev_link = False
-    def handle_data(self, data):
-        """
-        Processes textual data inside table cells.
-        Extracts numerical values representing temperature data.
-        :param data: The data inside an HTML element.
-        """
-        if self.in_td:
-            data = data.strip()
-            if data.replace(".", "").replace("-", "").isdigit():
-                if self.col_index < 3:
-                    self.current_data.append(float(data))
-                    self.valid_row = True
-                self.col_index += 1
-    def fetch_weather_data(self, start_year, start_month, end_year=None, end_month=None):
+    def build_month_url(self, year, month):
+        """
+        Builds the daily data URL for a given month.
+        :param year: Year of the data.
+        :param month: Month of the data.
+        :return: The URL of the month page.
+        """
+        return (f"{self.base_url}?StationID={self.station_id}&timeframe=2&StartYear=1840"
+                f"&EndYear={datetime.today().year}&Year={year}&Month={month}")
+    def get_page(self, year, month):
+        """
+        Returns the HTML of a month page, going through the page cache when one is configured.
+        Pages downloaded after their month closed are served from disk; any other cached page is
+        revalidated with If-None-Match / If-Modified-Since and reused (and stored again, with a new
+        download time) when the server answers 304.
+        :param year: Year of the page.
+        :param month: Month of the page.
+        :return: The page HTML.
+        :raises requests.exceptions.RequestException: If the page cannot be downloaded.
+        """
+        cached = self.cache.get(self.base_url, self.station_id, year, month) if self.cache else None
+        if cached and self.cache.is_immutable(year, month, cached[1].get("fetched_at", 0)):
+            self.cache.record("hit")
+            return cached[0]
+        headers = {}
+        if cached:
+            if cached[1].get("etag"):
+                headers["If-None-Match"] = cached[1]["etag"]
+            if cached[1].get("last_modified"):
+                headers["If-Modified-Since"] = cached[1]["last_modified"]
+        with self.rate_limiter, metrics.span("http_get"):
+            response = self.session.get(self.build_month_url(year, month), timeout=self.timeout, headers=headers)
+        metrics.increment("bytes_downloaded", len(response.content))
+        if cached and response.status_code == 304:
+            self.cache.record("revalidated")
+            self.cache.put(self.base_url, self.station_id, year, month, cached[0],
+                           etag=response.headers.get("ETag") or cached[1].get("etag"),
+                           last_modified=response.headers.get("Last-Modified") or cached[1].get("last_modified"))
+            return cached[0]
+        response.raise_for_status()
+        if self.cache:
+            self.cache.record("miss")
+            # Empty and "No data available" pages are not kept: the month may still get data
+            if response.text and "No data available" not in response.text:
+                self.cache.put(self.base_url, self.station_id, year, month, response.text,
+                               etag=response.headers.get("ETag"),
+                               last_modified=response.headers.get("Last-Modified"))
+        return response.text
+    def parse_month(self, html, year, month):
+        """
+        Parses one month page. The parser is stateless, so pages can be parsed in parallel.
+        :param html: The page HTML.
+        :param year: Year of the page.
+        :param month: Month of the page.
+        :return: ObservationBatch of the month's days.
+        """
+        with metrics.span("parse"):
+            month_data = parse_month_page(html, year, month)
+        metrics.increment("rows_parsed", len(month_data))
+        return month_data
+    def fetch_month(self, year, month):
+        """
+        Downloads and parses a single month without touching the scraper's shared state.
+        :param year: Year of the data.
+        :param month: Month of the data.
+        :return: ObservationBatch of the month's days (empty when no data is available).
+        """
+        html = self.get_page(year, month)
+        if "No data available" in html:
+            return ObservationBatch()
+        return self.parse_month(html, year, month)
+    def fetch_months(self, months, max_workers=4):
+        """
+        Scrapes a list of months concurrently on a bounded thread pool, without touching weather_data.
+        Failed months are reported and left out of the result.
+        :param months: Iterable of (year, month) tuples.
+        :param max_workers: Number of worker threads.
+        :return: Dictionary mapping (year, month) to that month's ObservationBatch.
+        """
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(self.fetch_month, year, month): (year, month) for year, month in months}
+            for future in as_completed(futures):
+                year, month = futures[future]
+                try:
+                    results[(year, month)] = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"[ERROR] Request failed for {year}-{month:02d}: {e}")
+                except Exception as e:
+                    print(f"[ERROR] Failed to parse HTML for {year}-{month:02d}: {e}")
+        except KeyboardInterrupt:
+            print("\n[INFO] Scraping interrupted by user.")
+            executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            executor.shutdown()
+        return results
+    def iter_months(self, months, max_workers=4):
+        """
+        Scrapes months concurrently and yields them in the given order as soon as each is ready,
+        so a consumer can start storing early months while later ones are still downloading.
+        At most twice max_workers months are in flight or waiting, so memory stays bounded
+        however long the list is and however slow the consumer.
+        :param months: Iterable of (year, month) tuples.
+        :param max_workers: Number of worker threads.
+        :return: Generator of ((year, month), ObservationBatch) pairs; the batch is None for a failed month.
+        """
+        def fetch(key):
+            try:
+                return self.fetch_month(*key)
+            except requests.exceptions.RequestException as e:
+                print(f"[ERROR] Request failed for {key[0]}-{key[1]:02d}: {e}")
+            except Exception as e:
+                print(f"[ERROR] Failed to parse HTML for {key[0]}-{key[1]:02d}: {e}")
+            return None
+        months = iter(months)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque((key, executor.submit(fetch, key)) for key in islice(months, max_workers * 2))
+            while pending:
+                key, future = pending.popleft()
+                for next_key in months:
+                    pending.append((next_key, executor.submit(fetch, next_key)))
+                    break
+                yield key, future.result()
+    def fetch_weather_data_parallel(self, start_year, start_month, end_year, end_month, max_workers=4):
+        """
+        Scrapes a range of months concurrently on a bounded thread pool.
+        Month URLs are deterministic, so every month is requested up front and the
+        results are merged into weather_data in the same newest-first order as
+        fetch_weather_data. Failed months are reported and skipped.
+        :param start_year: Most recent year to scrape.
+        :param start_month: Most recent month to scrape.
+        :param end_year: Oldest year to scrape.
+        :param end_month: Oldest month to scrape.
+        :param max_workers: Number of worker threads.
+        :return: ObservationBatch of every scraped day (weather_data).
+        """
+        months = month_range(start_year, start_month, end_year, end_month)
+        results = self.fetch_months(months, max_workers)
+        for key in months:
+            if key in results:
+                self.weather_data.extend(results[key])
+        return self.weather_data
+    def fetch_weather_data(self, start_year, start_month, end_year=None, end_month=None, max_failures=3):
+        """
+        Scrapes month by month, newest first, until the end month, the first month without data,
+        or max_failures consecutive months whose request failed (so an outage cannot walk back forever).
+        :param start_year: Most recent year to scrape.
+        :param start_month: Most recent month to scrape.
+        :param end_year: Oldest year to scrape (None to go back until the data runs out).
+        :param end_month: Oldest month to scrape.
+        :param max_failures: Consecutive failed months after which the scrape stops.
+        :return: ObservationBatch of every scraped day (weather_data).
+        """
         year, month = start_year, start_month
+        failures = 0
         try:
             while True:
                 print(f"Scraping data for {year}-{month:02d}...")
-                self.all_data = []
-                url = f"{self.base_url}?StationID=27174&timeframe=2&StartYear=1840&EndYear=2025&Year={year}&Month={month}"
+                url = self.build_month_url(year, month)
                 
-                # Request weather data for the given year and month
+                # Request weather data for the given year and month.
+                # Transient errors (429/5xx, dropped connections) are retried by the session;
+                # a month that still fails is skipped instead of ending the whole run.
+                html = None
                 try:
-                    response = requests.get(url, timeout=10)
-                    response.raise_for_status()
+                    html = self.get_page(year, month)
+                    failures = 0
                 except requests.exceptions.RequestException as e:
-                    print(f"[ERROR] Request failed for {year}-{month:02d}: {e}")
-                    break
-
-                # Handle "No data available" case
-                if "No data available" in response.text:
-                    print(f"[INFO] No data available for {year}-{month:02d}.")
-                    break
+                    failures += 1
+                    if failures >= max_failures:
+                        print(f"[ERROR] Request failed for {year}-{month:02d}: {e}")
+                        print(f"[INFO] Stopping scrape after {failures} consecutive failed months.")
+                        break
+                    print(f"[ERROR] Request failed for {year}-{month:02d}, skipping month: {e}")
 
-                # Process the HTML content
-                try:
-                    self.feed(response.text)
-                except Exception as e:
-                    print(f"[ERROR] Failed to parse HTML for {year}-{month:02d}: {e}")
-                    break
+                if html is not None:
+                    # Handle "No data available" case
+                    if "No data available" in html:
+                        print(f"[INFO] No data available for {year}-{month:02d}.")
+                        break
 
-                # Store weather data
-                for i, data_row in enumerate(self.all_data[:-3]):  # Exclude last three rows (footer or non-data rows)
+                    # Process the HTML content and store weather data
                     try:
-                        date_str = f"{year}-{month:02d}-{i+1:02d}"
-                        self.weather_data[date_str] = {
-                            "Max": data_row[0],
-                            "Min": data_row[1],
-                            "Mean": data_row[2],
-                        }
-                    except (IndexError, ValueError) as e:
-                        print(f"[WARNING] Skipped malformed row on {year}-{month:02d}-{i+1:02d}: {e}")
+                        self.weather_data.extend(self.parse_month(html, year, month))
+                    except Exception as e:
+                        print(f"[ERROR] Failed to parse HTML for {year}-{month:02d}: {e}")
+                        break
+                    prev_href = find_prev_month_href(html)
+                    if prev_href:
+                        self.prev_month_url = self.clean_url(self.base_url, prev_href)
 
                 # Check if we've reached the end of the desired period
                 if end_year is not None and end_month is not None:
@@ -151,13 +342,12 @@ class WeatherScraper(HTMLParser):
         return self.weather_data
 
 def main():
-    url = "https://climate.weather.gc.ca/climate_data/daily_data_e.html"
-    scraper = WeatherScraper(url)
+    scraper = WeatherScraper(BASE_URL)
     current_date = datetime.today()
     current_year = current_date.year
     current_month = current_date.month
     data = scraper.fetch_weather_data(current_year, current_month, end_year=2020,end_month=1)
-    for date,values in data.items():
-        print(date,":", values)
+    for observation in data:
+        print(observation.sample_date, ":", observation)
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""Offline stand-in for climate.weather.gc.ca.
+Generates month pages shaped like the "Daily Data Report" and serves them from
+a local HTTP server so the scraper can be exercised and benchmarked without
+touching the real site. Pages recorded from the real site (see record_pages)
+are served instead of generated ones when a pages directory is given.
+
+Usage:
+    python stub_server.py                                   # serve generated pages
+    python stub_server.py --pages-dir fixtures              # serve recorded pages where available
+    python stub_server.py --record 2023-01 2024-12 --pages-dir fixtures
+"""
+import argparse
+import calendar
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+DAILY_DATA_PATH = "/climate_data/daily_data_e.html"
+
+
+def make_month_page(year, month, station_id=27174, missing_days=()):
+    """
+    Builds the HTML of a daily data page for one station and month.
+    Temperatures are pseudo-random but deterministic for a given month.
+    :param year: Year of the page.
+    :param month: Month of the page.
+    :param station_id: Station ID used in the navigation links.
+    :param missing_days: Days whose temperature cells are rendered as missing ("M").
+    :return: The page HTML as a string.
+    """
+    rng = random.Random(station_id * 1000000 + year * 100 + month)
+    days_in_month = calendar.monthrange(year, month)[1]
+    prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    month_name = calendar.month_name[month]
+    rows = []
+    for day in range(1, days_in_month + 1):
+        if day in missing_days:
+            temps = ['<td>M<abbr title="Missing">&nbsp;</abbr></td>'] * 3
+        else:
+            high = round(rng.uniform(-25.0, 30.0), 1)
+            low = round(high - rng.uniform(2.0, 15.0), 1)
+            temps = [f"<td>{high}</td>", f"<td>{low}</td>", f"<td>{round((high + low) / 2, 1)}</td>"]
+        rows.append(
+            "<tr>\n"
+            f'<th scope="row"><abbr title="{month_name} {day}, {year}">{day:02d}</abbr></th>\n'
+            + "\n".join(temps) + "\n"
+            f"<td>{round(rng.uniform(0, 30), 1)}</td>\n"
+            "<td>0.0</td>\n"
+            '<td>&nbsp;</td>\n'
+            '<td>&nbsp;</td>\n'
+            f"<td>{round(rng.uniform(0, 5), 1)}</td>\n"
+            "<td>&nbsp;</td>\n"
+            '<td>&nbsp;</td>\n'
+            '<td>&nbsp;</td>\n'
+            "</tr>"
+        )
+    footer = (
+        '<tr><th scope="row">Sum</th><td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td>'
+        "<td>512.4</td><td>0.0</td><td>&nbsp;</td><td>&nbsp;</td><td>12.8</td><td>&nbsp;</td></tr>\n"
+        '<tr><th scope="row">Avg</th><td>1.5</td><td>-8.2</td><td>-3.4</td>'
+        "<td>21.4</td><td>0.0</td><td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td></tr>\n"
+        '<tr><th scope="row">Xtrm</th><td>12.2</td><td>-26.1</td><td>&nbsp;</td>'
+        "<td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td><td>&nbsp;</td><td>4.9</td><td>&nbsp;</td></tr>"
+    )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Daily Data Report for {month_name} {year} - Climate</title></head>
+<body>
+<nav>
+<ul class="pager">
+<li id="nav-prev1"><a href="{DAILY_DATA_PATH}?StationID={station_id}&amp;timeframe=2&amp;StartYear=1840&amp;EndYear={year}&amp;Day=1&amp;Year={prev_year}&amp;Month={prev_month}#">Previous Month</a></li>
+<li id="nav-next1"><a href="{DAILY_DATA_PATH}?StationID={station_id}&amp;timeframe=2&amp;Year={year}&amp;Month={month}#">Next Month</a></li>
+</ul>
+</nav>
+<div class="table-responsive">
+<table class="data-table table-striped table-hover table-condensed">
+<caption>Daily Data Report for {month_name} {year}</caption>
+<thead>
+<tr>
+<th scope="col">DAY</th><th scope="col">Max Temp<br>&deg;C</th><th scope="col">Min Temp<br>&deg;C</th>
+<th scope="col">Mean Temp<br>&deg;C</th><th scope="col">Heat Deg Days</th><th scope="col">Cool Deg Days</th>
+<th scope="col">Total Rain mm</th><th scope="col">Total Snow cm</th><th scope="col">Total Precip mm</th>
+<th scope="col">Snow on Grnd cm</th><th scope="col">Dir of Max Gust</th>
+</tr>
+</thead>
+<tbody>
+{chr(10).join(rows)}
+{footer}
+</tbody>
+</table>
+</div>
+</body>
+</html>
+"""
+
+
+def recorded_page_path(pages_dir, station_id, year, month):
+    """
+    :return: Path of a recorded month page, e.g. "<pages_dir>/27174/2024-01.html".
+    """
+    return os.path.join(pages_dir, str(station_id), f"{year:04d}-{month:02d}.html")
+
+
+def load_page(year, month, station_id=27174, pages_dir=None):
+    """
+    Returns the recorded page of a month when pages_dir holds one, otherwise a generated page.
+    """
+    if pages_dir:
+        path = recorded_page_path(pages_dir, station_id, year, month)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as page_file:
+                return page_file.read()
+    return make_month_page(year, month, station_id)
+
+
+def record_pages(scraper, months, pages_dir):
+    """
+    Downloads month pages with a WeatherScraper and stores them as fixtures for StubServer.
+    :param scraper: WeatherScraper pointed at the real site (and station) to record.
+    :param months: Iterable of (year, month) tuples.
+    :param pages_dir: Directory the pages are written to.
+    :return: Number of pages written.
+    """
+    count = 0
+    for year, month in months:
+        path = recorded_page_path(pages_dir, scraper.station_id, year, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as page_file:
+            page_file.write(scraper.get_page(year, month))
+        count += 1
+    return count
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Serves recorded or generated month pages for any StationID/Year/Month query."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        try:
+            station_id = int(params.get("StationID", ["27174"])[0])
+            year = int(params["Year"][0])
+            month = int(params["Month"][0])
+        except (KeyError, ValueError):
+            self.send_error(400, "Year and Month are required")
+            return
+        with server.lock:
+            server.request_count += 1
+        if (year, month) < server.first_month:
+            body = "<html><body><p>No data available for this station.</p></body></html>"
+        else:
+            body = load_page(year, month, station_id, server.pages_dir)
+        payload = body.encode("utf-8")
+        etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Context manager running a local climate site stub on a background thread.
+    Use ``server.url`` as the scraper's base URL.
+    """
+
+    def __init__(self, latency=0.0, first_month=(1840, 1), port=0, pages_dir=None):
+        """
+        :param latency: Seconds to sleep before answering each request (simulated round trip).
+        :param first_month: (year, month) before which "No data available" is returned.
+        :param port: Port to listen on (0 picks a free port).
+        :param pages_dir: Optional directory of recorded pages (see record_pages).
+        """
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.first_month = first_month
+        self.httpd.pages_dir = pages_dir
+        self.httpd.request_count = 0
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{DAILY_DATA_PATH}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve (or record) climate site month pages locally.")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated round trip in seconds")
+    parser.add_argument("--pages-dir", default=None, help="Directory of recorded pages")
+    parser.add_argument("--record", nargs=2, metavar=("FIRST", "LAST"), default=None,
+                        help="Record the real site's pages from FIRST to LAST (YYYY-MM) into --pages-dir and exit")
+    parser.add_argument("--station", type=int, default=27174, help="Station to record (default: 27174)")
+    args = parser.parse_args(argv)
+    if args.record:
+        if not args.pages_dir:
+            parser.error("--record needs --pages-dir")
+        from scrape_weather import WeatherScraper, BASE_URL, month_range
+        (first_year, first_month), (last_year, last_month) = (map(int, value.split("-")) for value in args.record)
+        scraper = WeatherScraper(BASE_URL, station_id=args.station)
+        count = record_pages(scraper, month_range(last_year, last_month, first_year, first_month), args.pages_dir)
+        print(f"Recorded {count} pages into {args.pages_dir}")
+        return
+    with StubServer(args.latency, port=args.port, pages_dir=args.pages_dir) as server:
+        print(f"Serving stub climate pages at {server.url} (Ctrl+C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            print("\nStopping stub server.")
+
+
+if __name__ == "__main__":
+    main()
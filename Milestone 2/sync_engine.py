@@ -0,0 +1,178 @@
+"""Incremental synchronisation of the weather database with the climate site.
+Only the months that are missing from the database are scraped: the month
+holding the high-water mark through the current month, plus any empty months
+left as gaps in the middle of the stored history.
+"""
+import calendar
+import queue
+import threading
+from datetime import date
+from db_operations import iter_rows
+from scrape_weather import month_range
+
+
+def missing_months(month_counts, high_water_mark, today, include_partial=False):
+    """
+    Works out which months need to be scraped.
+    :param month_counts: Dictionary mapping (year, month) to the number of stored days.
+    :param high_water_mark: Latest stored date.
+    :param today: Current date; no month after it is requested.
+    :param include_partial: Also refetch closed months with fewer stored days than calendar days.
+    :return: List of (year, month) tuples, oldest first.
+    """
+    months = []
+    if month_counts:
+        first = min(month_counts)
+        for year, month in reversed(month_range(high_water_mark.year, high_water_mark.month, *first)):
+            count = month_counts.get((year, month), 0)
+            if count == 0 or (include_partial and count < calendar.monthrange(year, month)[1]):
+                months.append((year, month))
+    # The high-water-mark month may be incomplete; everything after it is new
+    tail = reversed(month_range(today.year, today.month, high_water_mark.year, high_water_mark.month))
+    months.extend(key for key in tail if key not in months)
+    return months
+
+
+class SyncEngine:
+    """
+    Brings a location's stored history up to date with as few requests as possible.
+    """
+
+    def __init__(self, db, scraper, max_workers=4):
+        """
+        :param db: DBOperations instance to read sync state from and upsert into.
+        :param scraper: WeatherScraper used to download month pages.
+        :param max_workers: Worker threads used when several months are missing.
+        """
+        self.db = db
+        self.scraper = scraper
+        self.max_workers = max_workers
+
+    def plan(self, location="Winnipeg", today=None, include_partial=False, backfill_from=None):
+        """
+        Lists the months a sync would scrape.
+        :param backfill_from: Date to start from when the location has no data yet.
+        :return: List of (year, month) tuples, or None if the location has no data yet
+        and no backfill_from date is given.
+        """
+        high_water_mark = self.db.get_high_water_mark(location)
+        if high_water_mark is None:
+            if backfill_from is None:
+                return None
+            return missing_months({}, backfill_from, today or date.today())
+        return missing_months(self.db.fetch_month_counts(location), date.fromisoformat(high_water_mark),
+                              today or date.today(), include_partial)
+
+    def sync(self, location="Winnipeg", today=None, include_partial=False, backfill_from=None):
+        """
+        Scrapes the missing months, upserts them and records the new sync state.
+        A routine daily update scrapes one month page and writes one small transaction.
+        :param location: Location to sync.
+        :param today: Current date (defaults to today).
+        :param include_partial: Also refetch closed months with missing days.
+        :param backfill_from: Date to start from when the location has no data yet.
+        :return: Summary dictionary from save_data plus the list of "months" scraped,
+        or None if the location has no data yet and no backfill_from date is given.
+        """
+        today = today or date.today()
+        months = self.plan(location, today, include_partial, backfill_from)
+        if months is None:
+            return None
+        pages = self.scraper.fetch_months(months, max(1, min(self.max_workers, len(months))))
+        rows = (row for key in months for row in iter_rows(pages.get(key, ()))
+                if row.sample_date <= today.isoformat())
+        summary = self.db.save_data(rows, location, on_conflict="update")
+        missed = [key for key in months if key not in pages]
+        status = "ok" if not missed else f"failed months: {', '.join(f'{y}-{m:02d}' for y, m in missed)}"
+        self.db.record_sync(location, status, summary["inserted"] + summary["updated"])
+        summary["months"] = months
+        return summary
+
+
+def pipelined_sync(db, scraper, locations=None, today=None, queue_size=8, max_workers=4, cancel=None):
+    """
+    Syncs registered stations with the network and database phases running as two pipelined stages.
+    This is the one sync entry point, shared by the scheduler and the interactive update.
+    A background fetch stage scrapes the missing months of each station and hands them over a
+    bounded queue; the calling thread is the single writer, upserting each month as it arrives
+    and recording each station's sync state once all of its months are stored. The network stays
+    busy while the database commits, and at most queue_size months are held in memory.
+    :param db: DBOperations instance holding the station registry.
+    :param scraper: WeatherScraper whose rate limiter, session and cache are shared by all stations.
+    :param locations: Locations to sync (defaults to every registered station).
+    :param today: Current date (defaults to today).
+    :param queue_size: Maximum number of scraped months waiting to be written.
+    :param max_workers: Worker threads fetching months of a station concurrently.
+    :param cancel: Optional threading.Event; once set, the sync stops after the month being written.
+    :return: Dictionary mapping location to its summary, None (no data and no first year)
+    or the exception raised while planning it.
+    """
+    today = today or date.today()
+    stations = [station for station in db.get_stations() if locations is None or station[1] in locations]
+    handoff = queue.Queue(maxsize=queue_size)
+    finished = object()
+    stop = threading.Event()  # Set when the writer stops early, so the fetch stage winds down
+
+    def fetch_stage():
+        try:
+            for station_id, location, _, first_year in stations:
+                if stop.is_set():
+                    break
+                try:
+                    engine = SyncEngine(db, scraper.for_station(station_id), max_workers)
+                    months = engine.plan(location, today, backfill_from=date(first_year, 1, 1) if first_year else None)
+                except Exception as error:
+                    handoff.put(("error", location, error))
+                    continue
+                if months is None:
+                    handoff.put(("skipped", location, None))
+                    continue
+                for key, month_data in engine.scraper.iter_months(months, max(1, min(max_workers, len(months)))):
+                    if stop.is_set():
+                        break
+                    handoff.put(("month", location, (key, month_data)))
+                else:
+                    handoff.put(("done", location, months))
+        finally:
+            handoff.put(finished)
+
+    fetcher = threading.Thread(target=fetch_stage, name="sync-fetch", daemon=True)
+    fetcher.start()
+    results = {}
+    failed = {}
+    cutoff = today.isoformat()
+    try:
+        while True:
+            item = handoff.get()
+            if item is finished or (cancel is not None and cancel.is_set()):
+                break
+            kind, location, payload = item
+            if kind == "month":
+                key, month_data = payload
+                summary = results.setdefault(location, {"inserted": 0, "updated": 0, "skipped": 0})
+                if month_data is None:
+                    failed.setdefault(location, []).append(key)
+                    continue
+                rows = (row for row in iter_rows(month_data) if row.sample_date <= cutoff)
+                for name, count in db.save_data(rows, location, on_conflict="update").items():
+                    summary[name] += count
+            elif kind == "done":
+                summary = results.setdefault(location, {"inserted": 0, "updated": 0, "skipped": 0})
+                summary["months"] = payload
+                missed = failed.get(location)
+                status = "ok" if not missed else f"failed months: {', '.join(f'{y}-{m:02d}' for y, m in missed)}"
+                db.record_sync(location, status, summary["inserted"] + summary["updated"])
+            elif kind == "error":
+                db.record_sync(location, f"error: {payload}")
+                results[location] = payload
+            else:
+                results[location] = None
+    finally:
+        stop.set()
+        while fetcher.is_alive():  # Unblock the fetch stage if the writer stopped early
+            try:
+                handoff.get(timeout=0.1)
+            except queue.Empty:
+                pass
+    fetcher.join()
+    return results
@@ -0,0 +1,83 @@
+"""Parsing engine for the climate site's "Daily Data Report" table.
+The parser is a handful of compiled regular expressions and module-level
+functions: it keeps no state between pages, so one import can parse pages
+from any number of threads or processes at once.
+"""
+import calendar
+import re
+from collections import namedtuple
+from observations import ObservationBatch, day_number
+
+DailyRow = namedtuple("DailyRow", ["day", "max_temp", "min_temp", "mean_temp"])
+
+_ROW_RE = re.compile(r"<tr\b[^>]*>(.*?)</tr>", re.S | re.I)
+_DAY_CELL_RE = re.compile(r"<th\b[^>]*\bscope=[\"']?row[^>]*>(.*?)</th>", re.S | re.I)
+_CELL_RE = re.compile(r"<td\b[^>]*>(.*?)</td>", re.S | re.I)
+_TAG_RE = re.compile(r"<[^>]*>")
+_DAY_RE = re.compile(r"\s*(\d{1,2})\s*$")
+_NUMBER_RE = re.compile(r"\s*(-?\d+(?:\.\d+)?)")
+_PREV_LINK_RE = re.compile(r"<li\b[^>]*\bid=[\"']nav-prev1[\"'][^>]*>.*?<a\b[^>]*\bhref=[\"']([^\"']*)[\"']",
+                           re.S | re.I)
+
+
+def _cell_value(cell):
+    """
+    Converts the inner HTML of a temperature cell to a float.
+    :param cell: Inner HTML of a <td> element.
+    :return: The temperature, or None for missing values ("M", blank cells).
+    """
+    match = _NUMBER_RE.match(_TAG_RE.sub("", cell))
+    return float(match.group(1)) if match else None
+
+
+def iter_daily_rows(html):
+    """
+    Streams the daily rows of a month page.
+    Rows are identified by their day-number header cell, so the Sum/Avg/Xtrm
+    footer rows are skipped and days with missing readings keep their real day number.
+    :param html: The page HTML.
+    :return: Generator of DailyRow tuples; missing temperatures are None.
+    """
+    for row_match in _ROW_RE.finditer(html):
+        row = row_match.group(1)
+        day_cell = _DAY_CELL_RE.search(row)
+        if day_cell is None:
+            continue
+        day = _DAY_RE.match(_TAG_RE.sub("", day_cell.group(1)))
+        if day is None:
+            continue
+        cells = _CELL_RE.findall(row, day_cell.end())
+        if len(cells) < 3:
+            continue
+        yield DailyRow(int(day.group(1)), _cell_value(cells[0]), _cell_value(cells[1]), _cell_value(cells[2]))
+
+
+def parse_month_page(html, year, month):
+    """
+    Parses a month page into an ObservationBatch.
+    Days without any temperature reading are left out, as are day numbers the month does not have.
+    :param html: The page HTML.
+    :param year: Year of the page.
+    :param month: Month of the page.
+    :return: ObservationBatch of the month's days in page order.
+    """
+    batch = ObservationBatch()
+    first_day = day_number(f"{year:04d}-{month:02d}-01")
+    days_in_month = calendar.monthrange(year, month)[1]
+    for row in iter_daily_rows(html):
+        if row.max_temp is None and row.min_temp is None and row.mean_temp is None:
+            continue
+        if not 1 <= row.day <= days_in_month:
+            continue
+        batch.append_day(first_day + row.day - 1, row.min_temp, row.max_temp, row.mean_temp)
+    return batch
+
+
+def find_prev_month_href(html):
+    """
+    Finds the "Previous Month" navigation link of a page.
+    :param html: The page HTML.
+    :return: The raw href attribute, or None if the page has no such link.
+    """
+    match = _PREV_LINK_RE.search(html)
+    return match.group(1).replace("&amp;", "&") if match else None
@@ -0,0 +1,16 @@
+"""Shared fixtures; the modules under test are flat files in the parent directory."""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_operations import DBOperations  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Fresh DBOperations on a temporary database file."""
+    operations = DBOperations(str(tmp_path / "weather.db"))
+    yield operations
+    operations.close()
@@ -0,0 +1,17 @@
+from archive_reader import ArchiveReader
+from weather_archive import export_archive
+
+
+def test_get_stations_orders_by_location_and_accepts_unregistered_locations(db, tmp_path):
+    db.register_station(27174, "Winnipeg", "MB", 1872)
+    db.register_station(10, "Brandon", "MB", 1890)
+    for location in ("Winnipeg", "Brandon", "Unregistered"):
+        db.save_data([("2020-01-01", -20.0, -10.0, -15.0)], location)
+    export_archive(db, str(tmp_path / "archive"))
+    reader = ArchiveReader(str(tmp_path / "archive"))
+    try:
+        stations = reader.get_stations()
+    finally:
+        reader.close()
+    assert [station[1] for station in stations] == ["Brandon", "Unregistered", "Winnipeg"]
+    assert stations[1] == (None, "Unregistered", None, None)
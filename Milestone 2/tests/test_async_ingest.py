@@ -0,0 +1,52 @@
+import threading
+from backfill import Backfill
+from stub_server import make_month_page
+
+
+class StubScraper:
+    """Serves generated month pages without a server and counts the downloads."""
+
+    def __init__(self, after_pages=None, cancel=None):
+        self.lock = threading.Lock()
+        self.requested = []
+        self.after_pages = after_pages
+        self.cancel = cancel
+
+    def get_page(self, year, month):
+        with self.lock:
+            self.requested.append((year, month))
+            if self.cancel is not None and len(self.requested) == self.after_pages:
+                self.cancel.set()
+        return make_month_page(year, month)
+
+
+def test_cancelled_before_start_downloads_nothing_and_reports_interrupted(db):
+    cancel = threading.Event()
+    cancel.set()
+    scraper = StubScraper()
+    summary = Backfill(db, scraper).run(2012, 4, 2012, 1, cancel=cancel, pipeline="async")
+    assert scraper.requested == []
+    assert summary["done"] == 0
+    assert summary["remaining"] == 4
+    assert summary["interrupted"]
+    assert db.fetch_backfill_status("Winnipeg") == {}
+    assert not db.fetch_data("Winnipeg")
+
+
+def test_cancel_mid_run_stores_every_downloaded_month_and_keeps_the_rest_pending(db):
+    cancel = threading.Event()
+    scraper = StubScraper(after_pages=3, cancel=cancel)
+    job = Backfill(db, scraper, max_workers=2)
+    summary = job.run(2011, 12, 2002, 1, cancel=cancel, pipeline="async")
+    assert summary["interrupted"]
+    assert summary["done"] == len(scraper.requested)
+    assert summary["done"] + summary["remaining"] == 120
+    assert 0 < summary["remaining"]
+    assert set(db.fetch_backfill_status("Winnipeg")) == set(scraper.requested)
+    assert len(job.plan(2011, 12, 2002, 1)) == summary["remaining"]
+
+
+def test_uninterrupted_run_stores_every_month(db):
+    summary = Backfill(db, StubScraper()).run(2012, 4, 2012, 1, pipeline="async")
+    assert (summary["done"], summary["remaining"], summary["interrupted"]) == (4, 0, False)
+    assert len(db.fetch_data("Winnipeg")) == 31 + 29 + 31 + 30
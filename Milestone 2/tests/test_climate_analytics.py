@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import climate_analytics
+from weather_series import WeatherSeries
+
+
+def make_series():
+    dates = np.arange(np.datetime64("2019-01-01"), np.datetime64("2021-01-01"))
+    rng = np.random.default_rng(7)
+    mean = rng.uniform(-20.0, 25.0, len(dates)).round(1)
+    mean[10] = np.nan
+    return WeatherSeries(dates, mean - 5, mean + 5, mean, "Winnipeg")
+
+
+def test_day_slots_give_february_29_its_own_slot():
+    dates = np.array(["2020-01-01", "2020-02-29", "2021-03-01", "2020-12-31"], dtype="datetime64[D]")
+    assert climate_analytics.day_slots(dates).tolist() == [0, 59, 62, 371]
+
+
+def test_normals_and_anomalies_match_a_plain_loop():
+    series = make_series()
+    normals = climate_analytics.daily_normals(series, 2019, 2020)
+    values = {}
+    for day, value in zip(series.dates.tolist(), series.mean_temp.tolist()):
+        if not np.isnan(value):
+            values.setdefault((day.month, day.day), []).append(value)
+    for (month, day), readings in values.items():
+        assert normals.values[(month - 1) * 31 + day - 1] == pytest.approx(np.mean(readings), abs=1e-4)
+    anomalies = climate_analytics.anomalies(series, normals)
+    assert np.isnan(anomalies[10])
+    # Days seen once (February 29) equal their normal
+    assert anomalies[series.dates == np.datetime64("2020-02-29")][0] == 0
+
+
+def test_rolling_mean_skips_missing_days():
+    series = make_series()
+    rolling = climate_analytics.rolling_mean(series, 7)
+    window = series.mean_temp[4:11]
+    assert rolling[10] == pytest.approx(np.nanmean(window), abs=1e-4)
+    assert np.isnan(rolling[1])  # Fewer than half the window available
+
+
+def test_records_and_degree_days():
+    series = make_series()
+    records = climate_analytics.daily_records(series)
+    first = (records.months == 1) & (records.days == 1)
+    highs = series.max_temp[[0, 365]]
+    assert records.high[first][0] == highs.max()
+    assert records.high_year[first][0] == (2019 if highs[0] >= highs[1] else 2020)
+    years, heating, cooling = climate_analytics.degree_days(series, 18.0)
+    mean = series.mean_temp[:365].astype(np.float64)
+    assert heating[0] == pytest.approx(np.nansum(np.maximum(18.0 - mean, 0)))
+    assert cooling[0] == pytest.approx(np.nansum(np.maximum(mean - 18.0, 0)))
+    report = climate_analytics.yearly_report(series, 2019, 2020)
+    assert [row[0] for row in report] == [2019, 2020]
+    assert sum(row[5] for row in report) == len(records.high)
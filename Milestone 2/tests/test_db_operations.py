@@ -0,0 +1,49 @@
+import pytest
+
+ROWS = [("2020-01-01", -20.0, -10.0, -15.0), ("2020-01-02", -18.0, -8.0, -13.0)]
+
+
+def test_data_version_changes_when_revisions_cancel_out(db):
+    db.save_data(ROWS, "Winnipeg")
+    before = db.data_version("Winnipeg")
+    # One day one degree warmer, the other one degree colder: every sum stays the same
+    db.save_data([("2020-01-01", -19.0, -9.0, -14.0), ("2020-01-02", -19.0, -9.0, -14.0)], "Winnipeg")
+    assert db.data_version("Winnipeg") != before
+
+
+def test_data_version_is_stable_for_unchanged_rows_and_other_ranges(db):
+    db.save_data(ROWS, "Winnipeg")
+    before = db.data_version("Winnipeg")
+    january_first = db.data_version("Winnipeg", "2020-01-01", "2020-01-01")
+    db.save_data(ROWS, "Winnipeg")
+    assert db.data_version("Winnipeg") == before
+    db.save_data([("2020-01-02", -30.0, -20.0, -25.0)], "Winnipeg")
+    assert db.data_version("Winnipeg", "2020-01-01", "2020-01-01") == january_first
+    assert db.data_version("Winnipeg") != before
+
+
+def test_save_data_reports_inserted_updated_and_skipped_rows(db):
+    assert db.save_data(ROWS) == {"inserted": 2, "updated": 0, "skipped": 0}
+    changed = [ROWS[0], ("2020-01-02", -18.0, -8.0, -12.0), ("2020-01-03", -5.0, 0.0, -2.5)]
+    assert db.save_data(changed, chunk_size=2) == {"inserted": 1, "updated": 1, "skipped": 1}
+    assert db.fetch_data()[1].avg_temp == -12.0
+
+
+def test_save_data_ignore_keeps_stored_rows(db):
+    db.save_data(ROWS)
+    assert db.save_data([("2020-01-01", 0.0, 0.0, 0.0)], on_conflict="ignore") == {
+        "inserted": 0, "updated": 0, "skipped": 1}
+    assert db.fetch_data()[0].avg_temp == -15.0
+    with pytest.raises(ValueError):
+        db.save_data(ROWS, on_conflict="replace")
+
+
+def test_save_data_streams_generators_and_dicts(db):
+    assert db.save_data(row for row in ROWS)["inserted"] == 2
+    legacy = {"2020-01-03": {"Min": -5.0, "Max": 0.0, "Mean": -2.5}}
+    assert db.save_data(legacy)["inserted"] == 1
+    # A date repeated within a chunk is stored once, with its last values
+    assert db.save_data([("2020-01-04", 1.0, 2.0, 1.5), ("2020-01-04", 1.0, 3.0, 2.0)])["inserted"] == 1
+    assert [record.sample_date for record in db.fetch_data()] == ["2020-01-01", "2020-01-02", "2020-01-03",
+                                                                  "2020-01-04"]
+    assert db.fetch_data()[-1].max_temp == 3.0
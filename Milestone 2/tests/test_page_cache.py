@@ -0,0 +1,48 @@
+import types
+from datetime import datetime
+import page_cache
+from page_cache import PageCache
+from scrape_weather import WeatherScraper
+from stub_server import StubServer
+
+
+def test_page_saved_before_its_month_closed_is_fetched_again(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / "page_cache"))
+    with StubServer() as server:
+        scraper = WeatherScraper(server.url, cache=cache)
+        monkeypatch.setattr(page_cache, "time", types.SimpleNamespace(time=datetime(2024, 3, 30).timestamp))
+        scraper.get_page(2024, 3)
+        monkeypatch.undo()
+        scraper.get_page(2024, 3)
+        assert server.request_count == 2
+        assert cache.stats()["hits"] == 0
+        # The revalidated entry was downloaded after the month closed, so it is final now
+        scraper.get_page(2024, 3)
+        assert server.request_count == 2
+        assert cache.stats()["hits"] == 1
+
+
+def test_is_immutable_waits_for_the_grace_period():
+    assert not PageCache.is_immutable(2024, 3, datetime(2024, 3, 30).timestamp())
+    assert not PageCache.is_immutable(2024, 3, datetime(2024, 4, 2).timestamp())
+    assert PageCache.is_immutable(2024, 3, datetime(2024, 4, 5).timestamp())
+    assert PageCache.is_immutable(2023, 12, datetime(2024, 1, 4).timestamp())
+
+
+def test_pages_of_another_site_are_not_shared(tmp_path):
+    cache = PageCache(str(tmp_path / "page_cache"))
+    with StubServer() as first, StubServer() as second:
+        WeatherScraper(first.url, cache=cache).get_page(2020, 1)
+        WeatherScraper(second.url, cache=cache).get_page(2020, 1)
+        assert (first.request_count, second.request_count) == (1, 1)
+        assert cache.get(first.url, 27174, 2020, 1)[1]["source"] == first.url
+
+
+def test_no_data_pages_are_not_cached(tmp_path):
+    cache = PageCache(str(tmp_path / "page_cache"))
+    with StubServer(first_month=(2000, 1)) as server:
+        scraper = WeatherScraper(server.url, cache=cache)
+        assert "No data available" in scraper.get_page(1999, 12)
+        assert cache.get(server.url, 27174, 1999, 12) is None
+        scraper.get_page(1999, 12)
+        assert server.request_count == 2
@@ -0,0 +1,33 @@
+from backfill import Backfill
+from parse_pool import create_parse_pool, parse_all, parse_pages
+from stub_server import make_month_page
+from table_parser import parse_month_page
+
+PAGES = [(make_month_page(2020, month), 2020, month) for month in range(1, 7)]
+
+
+class PageScraper:
+    """Serves generated month pages without a server."""
+
+    def get_page(self, year, month):
+        return make_month_page(year, month)
+
+
+def test_parse_pages_returns_batches_and_errors_in_page_order():
+    results = parse_pages([PAGES[0], ("<p>No data available</p>", 2020, 2), (PAGES[0][0], 2020, 13)])
+    assert list(results[0]) == list(parse_month_page(*PAGES[0]))
+    assert len(results[1]) == 0
+    assert isinstance(results[2], Exception)
+
+
+def test_parse_all_on_a_process_pool_matches_serial_parsing():
+    with create_parse_pool(2) as pool:
+        results = list(parse_all(PAGES, pool, pages_per_task=4))
+    assert [list(batch) for batch in results] == [list(parse_month_page(*page)) for page in PAGES]
+
+
+def test_backfill_parsing_on_worker_processes_stores_every_month(db):
+    summary = Backfill(db, PageScraper(), parse_processes=2).run(2020, 6, 2020, 1, pipeline="async")
+    assert summary["done"] == 6
+    assert db.fetch_month_counts() == {(2020, month): days for month, days
+                                       in zip(range(1, 7), (31, 29, 31, 30, 31, 30))}
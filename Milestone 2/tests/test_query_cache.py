@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+from db_operations import DBOperations
+
+ROW = ("2020-01-01", -20.0, -10.0, -15.0)
+
+
+def test_equivalent_calls_share_one_entry(db):
+    db.save_data([ROW], "Winnipeg")
+    first = db.fetch_data()
+    assert db.fetch_data("Winnipeg") is first
+    assert db.fetch_data(location="Winnipeg") is first
+    assert db.query_cache.stats()["entries"] == 1
+
+
+def test_save_data_and_purge_data_invalidate(db):
+    db.save_data([ROW], "Winnipeg")
+    assert len(db.fetch_data("Winnipeg")) == 1
+    db.save_data([("2020-01-02", -18.0, -8.0, -13.0)], "Winnipeg")
+    assert len(db.fetch_data("Winnipeg")) == 2
+    db.purge_data()
+    assert db.fetch_data("Winnipeg") == []
+
+
+def test_write_from_another_thread_invalidates(db):
+    assert db.fetch_data("Winnipeg") == []
+    writer = threading.Thread(target=db.save_data, args=([ROW], "Winnipeg"))
+    writer.start()
+    writer.join()
+    assert len(db.fetch_data("Winnipeg")) == 1
+
+
+def test_commit_from_an_external_connection_invalidates(db):
+    assert db.fetch_data("Winnipeg") == []
+    with sqlite3.connect(db.db_name) as conn:
+        conn.execute("INSERT INTO weather_data (sample_date, location, min_temp, max_temp, avg_temp) "
+                     "VALUES (?, 'Winnipeg', ?, ?, ?)", ROW)
+    assert len(db.fetch_data("Winnipeg")) == 1
+
+
+def test_threads_share_cached_results(db):
+    db.save_data([ROW], "Winnipeg")
+    first = db.fetch_data("Winnipeg")
+    assert db.fetch_data("Winnipeg") is first
+    results = []
+    for _ in range(2):
+        reader = threading.Thread(target=lambda: results.append(db.fetch_data("Winnipeg")))
+        reader.start()
+        reader.join()
+    assert results[1] is results[0]
+    assert db.fetch_data("Winnipeg") is results[0]
+    assert db.query_cache.stats()["entries"] == 1
+
+
+def test_write_through_another_instance_invalidates_every_thread(db):
+    assert db.fetch_data("Winnipeg") == []
+    assert db.get_station("Brandon") is None
+    other = DBOperations(db.db_name)
+    try:
+        other.save_data([ROW], "Winnipeg")
+        other.register_station(10, "Brandon")
+    finally:
+        other.close()
+    results = []
+    reader = threading.Thread(target=lambda: results.append((db.fetch_data("Winnipeg"), db.get_station("Brandon"))))
+    reader.start()
+    reader.join()
+    assert len(results[0][0]) == 1 and results[0][1][0] == 10
@@ -0,0 +1,34 @@
+import os
+import pytest
+from render_pipeline import RenderJob, decade_boxplot_jobs, lineplot_jobs, render_batch
+
+ROWS = [("2020-01-01", -20.0, -10.0, -15.0), ("2020-01-02", -18.0, -8.0, -13.0),
+        ("2020-02-01", -12.0, -2.0, -7.0)]
+
+
+def test_job_builders():
+    assert len(lineplot_jobs("Winnipeg", 2020, 2021)) == 24
+    assert [job.params for job in decade_boxplot_jobs("Winnipeg", 1996, 2024)] == [
+        (1996, 1999), (2000, 2009), (2010, 2019), (2020, 2024)]
+
+
+def test_unchanged_plots_are_not_rendered_twice(db, tmp_path):
+    db.save_data(ROWS)
+    out_dir = str(tmp_path / "plots")
+    jobs = [RenderJob("lineplot", "Winnipeg", (2020, 1)), RenderJob("lineplot", "Winnipeg", (2020, 2)),
+            RenderJob("lineplot", "Winnipeg", (2020, 3)), RenderJob("boxplot", "Winnipeg", (2020, 2020))]
+    first = render_batch(jobs, out_dir, workers=1, db_name=db.db_name)
+    assert (first["rendered"], first["cached"], first["empty"]) == (3, 0, 1)
+    second = render_batch(jobs, out_dir, workers=1, db_name=db.db_name)
+    assert (second["rendered"], second["cached"]) == (0, 3)
+    assert sorted(second["files"]) == sorted(first["files"])
+    # Revising February only re-renders the plots that show it, replacing their old files
+    db.save_data([("2020-02-01", -12.0, -2.0, -5.0)])
+    third = render_batch(jobs, out_dir, workers=1, db_name=db.db_name)
+    assert (third["rendered"], third["cached"]) == (2, 1)
+    assert len(os.listdir(out_dir)) == 3
+
+
+def test_render_batch_rejects_unknown_formats(db, tmp_path):
+    with pytest.raises(ValueError):
+        render_batch([], str(tmp_path), fmt="gif", db_name=db.db_name)
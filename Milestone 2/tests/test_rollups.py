@@ -0,0 +1,52 @@
+import random
+import numpy as np
+import pytest
+from rollups import SKETCH_SCALE, box_stats, merge_sketches, sketch_quantile
+from weather_processor import WeatherProcessor
+
+
+def make_sketch(values):
+    sketch = {}
+    for value in values:
+        key = round(value * SKETCH_SCALE)
+        sketch[key] = sketch.get(key, 0) + 1
+    return sketch
+
+
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0])
+def test_sketch_quantiles_match_numpy(q):
+    rng = random.Random(q)
+    values = [round(rng.uniform(-30.0, 30.0), 1) for _ in range(365)]
+    assert sketch_quantile(make_sketch(values), q) == pytest.approx(np.quantile(values, q))
+
+
+def test_merged_sketches_give_the_box_of_all_values():
+    first, second = [-10.0, -5.5, 0.0, 2.3], [4.1, 8.8, 30.0]
+    stats = box_stats(merge_sketches([make_sketch(first), make_sketch(second)]))
+    values = first + second
+    assert stats["med"] == pytest.approx(np.median(values))
+    assert stats["mean"] == pytest.approx(np.mean(values))
+    assert stats["fliers"] == [30.0]
+
+
+def test_save_data_keeps_the_rollups_in_step(db):
+    db.save_data([("2020-01-01", -20.0, -10.0, -15.0), ("2020-01-02", -12.0, -2.0, -7.0),
+                  ("2020-02-01", -8.0, 0.0, None)])
+    assert db.fetch_monthly_summary("Winnipeg", 2020, 2020) == [
+        (2020, 1, 2, -11.0, 4.0, -15.0, -7.0, -20.0, -2.0),
+        (2020, 2, 1, None, None, None, None, -8.0, 0.0),
+    ]
+    db.save_data([("2020-01-02", -12.0, -2.0, -3.0)])
+    assert db.fetch_yearly_summary("Winnipeg", 2020, 2020) == [(2020, 3, -9.0, 6.0, -15.0, -3.0, -20.0, 0.0)]
+
+
+def test_summary_command_prints_the_rollups(db, capsys):
+    db.save_data([("2019-07-01", 12.0, 24.0, 18.0), ("2020-07-01", 10.0, 20.0, 15.0)])
+    processor = WeatherProcessor(db.db_name)
+    try:
+        assert processor.summarize_weather_data(start_year=2020)
+        assert not processor.summarize_weather_data(start_year=2021)
+    finally:
+        processor.close()
+    output = capsys.readouterr().out
+    assert "15.0" in output and "18.0" not in output
@@ -0,0 +1,47 @@
+import time
+import requests
+from scrape_weather import REQUESTS_PER_SECOND, RateLimiter, WeatherScraper
+from stub_server import make_month_page
+
+
+class FailingScraper(WeatherScraper):
+    """Fails the months in failing (all months when failing is None) and serves the others."""
+
+    def __init__(self, failing=None):
+        super().__init__("http://127.0.0.1:9")
+        self.failing = failing
+        self.requested = []
+
+    def get_page(self, year, month):
+        self.requested.append((year, month))
+        if self.failing is None or (year, month) in self.failing:
+            raise requests.exceptions.ConnectionError("unreachable")
+        return make_month_page(year, month)
+
+
+def test_persistent_failures_stop_a_scrape_without_an_end_month():
+    scraper = FailingScraper()
+    assert len(scraper.fetch_weather_data(2020, 3)) == 0
+    assert scraper.requested == [(2020, 3), (2020, 2), (2020, 1)]
+
+
+def test_an_isolated_failure_is_skipped():
+    scraper = FailingScraper(failing={(2020, 2)})
+    data = scraper.fetch_weather_data(2020, 3, 2020, 1)
+    assert scraper.requested == [(2020, 3), (2020, 2), (2020, 1)]
+    assert len(data) == 31 + 31
+
+
+def test_default_rate_limiter_spaces_out_requests():
+    limiter = WeatherScraper("http://127.0.0.1:9").rate_limiter
+    started = time.monotonic()
+    for _ in range(3):
+        with limiter:
+            pass
+    assert time.monotonic() - started >= 2 / REQUESTS_PER_SECOND * 0.9
+    unlimited = RateLimiter(requests_per_second=None)
+    started = time.monotonic()
+    for _ in range(3):
+        with unlimited:
+            pass
+    assert time.monotonic() - started < 0.1
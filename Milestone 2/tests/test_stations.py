@@ -0,0 +1,55 @@
+import sqlite3
+from datetime import date
+import weather_processor
+from db_operations import DBOperations
+from stub_server import StubServer
+from weather_processor import WeatherProcessor
+
+ROW = ("2020-01-01", -20.0, -10.0, -15.0)
+
+
+def station_ids(db, location):
+    with sqlite3.connect(db.db_name) as conn:
+        return {row[0] for row in conn.execute("SELECT station_id FROM weather_data WHERE location = ?", (location,))}
+
+
+def test_saved_rows_carry_the_registered_station(db):
+    db.register_station(10, "Brandon", "MB", 1890)
+    db.save_data([ROW], "Brandon")
+    db.save_data([ROW], "Unregistered")
+    assert station_ids(db, "Brandon") == {10}
+    assert station_ids(db, "Unregistered") == {None}
+    db.register_station(11, "Unregistered")
+    assert station_ids(db, "Unregistered") == {11}
+
+
+def test_existing_rows_are_linked_when_the_column_is_added(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""CREATE TABLE weather_data (id INTEGER PRIMARY KEY AUTOINCREMENT, sample_date TEXT NOT NULL,
+                        location TEXT NOT NULL, min_temp REAL, max_temp REAL, avg_temp REAL,
+                        UNIQUE(sample_date, location))""")
+        conn.executemany("INSERT INTO weather_data (sample_date, location, min_temp, max_temp, avg_temp) "
+                         "VALUES (?, ?, ?, ?, ?)", [(*ROW[:1], "Winnipeg", *ROW[1:]), (*ROW[:1], "Elsewhere", *ROW[1:])])
+    db = DBOperations(path)
+    try:
+        assert station_ids(db, "Winnipeg") == {27174}
+        assert station_ids(db, "Elsewhere") == {None}
+    finally:
+        db.close()
+
+
+def test_download_registers_and_fills_another_station(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(weather_processor, "PAGE_CACHE_DIR", str(tmp_path / "page_cache"))
+    today = date.today()
+    with StubServer() as server:
+        processor = WeatherProcessor(db.db_name, base_url=server.url)
+        try:
+            assert processor.download_full_weather_data(today.year, today.month, location="Brandon", station_id=10)
+            assert not processor.download_full_weather_data(today.year, today.month, location="Nowhere")
+        finally:
+            processor.close()
+    assert db.get_station("Brandon")[0] == 10
+    assert len(db.fetch_data("Brandon")) == today.day
+    assert station_ids(db, "Brandon") == {10}
+    assert db.fetch_data("Winnipeg") == []
@@ -0,0 +1,33 @@
+from datetime import date
+from scrape_weather import RateLimiter, WeatherScraper
+from stub_server import StubServer
+from sync_engine import SyncEngine, missing_months
+
+
+def test_missing_months_covers_gaps_and_the_months_after_the_high_water_mark():
+    counts = {(2020, 1): 31, (2020, 3): 31}
+    assert missing_months(counts, date(2020, 3, 31), date(2020, 5, 10)) == [(2020, 2), (2020, 3), (2020, 4), (2020, 5)]
+
+
+def test_missing_months_refetches_partial_months_on_request():
+    counts = {(2020, 1): 20, (2020, 2): 29}
+    assert missing_months(counts, date(2020, 2, 29), date(2020, 2, 29)) == [(2020, 2)]
+    assert missing_months(counts, date(2020, 2, 29), date(2020, 2, 29), include_partial=True) == [(2020, 1), (2020, 2)]
+
+
+def test_high_water_mark_follows_rows_saved_outside_a_sync(db):
+    db.save_data([("2020-01-31", -20.0, -10.0, -15.0)])
+    db.record_sync("Winnipeg", "ok")
+    db.save_data([("2020-03-15", -5.0, 5.0, 0.0)])
+    assert db.get_high_water_mark() == "2020-03-15"
+    assert db.get_high_water_mark("Elsewhere") is None
+
+
+def test_sync_fills_the_gap_and_records_its_state(db):
+    db.save_data([("2020-01-31", -20.0, -10.0, -15.0), ("2020-03-31", -5.0, 5.0, 0.0)])
+    with StubServer() as server:
+        engine = SyncEngine(db, WeatherScraper(server.url, RateLimiter(requests_per_second=None)))
+        summary = engine.sync(today=date(2020, 4, 10))
+    assert summary["months"] == [(2020, 2), (2020, 3), (2020, 4)]
+    assert db.fetch_month_counts() == {(2020, 1): 1, (2020, 2): 29, (2020, 3): 31, (2020, 4): 10}
+    assert db.get_high_water_mark() == "2020-04-10"
@@ -0,0 +1,31 @@
+from stub_server import make_month_page
+from table_parser import find_prev_month_href, iter_daily_rows, parse_month_page
+
+
+def test_rows_are_keyed_by_day_and_footer_rows_are_skipped():
+    rows = list(iter_daily_rows(make_month_page(2020, 2)))
+    assert [row.day for row in rows] == list(range(1, 30))
+    high, low, mean = rows[0].max_temp, rows[0].min_temp, rows[0].mean_temp
+    assert low < high and mean == round((high + low) / 2, 1)
+
+
+def test_days_without_readings_keep_the_real_day_numbers():
+    batch = parse_month_page(make_month_page(2021, 4, missing_days=(1, 15)), 2021, 4)
+    dates = [observation.sample_date for observation in batch]
+    assert len(dates) == 28
+    assert dates[0] == "2021-04-02"
+    assert "2021-04-15" not in dates and "2021-04-16" in dates
+    assert dates[-1] == "2021-04-30"
+
+
+def test_parsing_is_stateless_across_pages():
+    january = make_month_page(2020, 1)
+    first = list(parse_month_page(january, 2020, 1))
+    parse_month_page(make_month_page(2020, 2), 2020, 2)
+    assert list(parse_month_page(january, 2020, 1)) == first
+
+
+def test_previous_month_link():
+    href = find_prev_month_href(make_month_page(2020, 1))
+    assert "Year=2019" in href and "Month=12" in href and "&amp;" not in href
+    assert find_prev_month_href("<html></html>") is None
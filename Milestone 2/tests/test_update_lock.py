@@ -0,0 +1,55 @@
+import time
+from datetime import date
+import sync_engine
+import weather_processor
+from db_operations import DB_PATH, UPDATE_LOCK
+from stub_server import StubServer
+from sync_engine import pipelined_sync
+from weather_processor import WeatherProcessor, build_parser
+
+
+def test_hold_lock_renews_a_lock_held_longer_than_its_ttl(db):
+    with db.hold_lock(UPDATE_LOCK, "first", ttl=0.3) as acquired:
+        assert acquired
+        time.sleep(0.8)
+        assert not db.acquire_lock(UPDATE_LOCK, "second", ttl=60)
+    assert db.acquire_lock(UPDATE_LOCK, "second", ttl=60)
+
+
+def test_hold_lock_yields_false_while_another_owner_holds_it(db):
+    assert db.acquire_lock(UPDATE_LOCK, "scheduler", ttl=60)
+    with db.hold_lock(UPDATE_LOCK, "menu") as acquired:
+        assert not acquired
+    # The failed attempt leaves the other owner's lock in place
+    assert not db.acquire_lock(UPDATE_LOCK, "menu", ttl=60)
+
+
+def test_update_does_not_run_while_the_scheduler_holds_the_lock(db, tmp_path):
+    assert db.acquire_lock(UPDATE_LOCK, "scheduler", ttl=60)
+    processor = WeatherProcessor(db.db_name, base_url="http://127.0.0.1:9")
+    try:
+        assert processor.update_weather_data(2000, 1) is False
+    finally:
+        processor.close()
+
+
+def test_cli_and_scheduler_share_the_database():
+    assert WeatherProcessor().db_name == DB_PATH
+    assert build_parser().parse_args(["update"]).db == DB_PATH
+
+
+def test_update_syncs_every_station_through_the_shared_pipeline(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(weather_processor, "PAGE_CACHE_DIR", str(tmp_path / "page_cache"))
+    calls = []
+    monkeypatch.setattr(sync_engine, "pipelined_sync",
+                        lambda *args, **kwargs: calls.append(args) or pipelined_sync(*args, **kwargs))
+    today = date.today()
+    db.save_data([(today.replace(day=1).isoformat(), -20.0, -10.0, -15.0)])
+    with StubServer() as server:
+        processor = WeatherProcessor(db.db_name, base_url=server.url)
+        try:
+            assert processor.update_weather_data()
+        finally:
+            processor.close()
+    assert len(calls) == 1
+    assert db.get_high_water_mark() == today.isoformat()
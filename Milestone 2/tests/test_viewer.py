@@ -0,0 +1,17 @@
+import builtins
+from weather_processor import WeatherProcessor
+
+
+def test_invalid_jump_date_reprompts_instead_of_closing_the_viewer(db, monkeypatch, capsys):
+    db.save_data([(f"2020-01-{day:02d}", -20.0, -10.0, -15.0) for day in range(1, 32)], "Winnipeg")
+    answers = iter(["Winnipeg", "j", "2020-13-45", "2020-01-20", "q"])
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(answers))
+    processor = WeatherProcessor(db.db_name)
+    try:
+        processor.view_weather_data()
+    finally:
+        processor.close()
+    output = capsys.readouterr().out
+    assert "Invalid date: 2020-13-45" in output
+    assert "2020-01-20" in output.split("Invalid date")[1]
+    assert next(answers, None) is None
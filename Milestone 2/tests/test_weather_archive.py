@@ -0,0 +1,67 @@
+import sqlite3
+import pytest
+import weather_archive
+from db_operations import DBOperations
+from weather_archive import build_manifest, export_archive, import_archive, load_archive
+
+ROWS = [("2020-01-01", -20.5, -10.1, -15.3), ("2020-01-02", None, -8.0, None), ("2020-01-05", -30.0, -21.2, -25.6),
+        ("2021-06-30", 12.3, 28.9, 20.6)]
+
+
+def stored(db, location):
+    return [record[1:2] + record[3:] for record in db.fetch_data(location)]
+
+
+@pytest.mark.parametrize("name", ["archive", "archive.npz"])
+def test_export_import_round_trip(db, tmp_path, name):
+    db.register_station(10, "Brandon", "MB", 1890)
+    db.save_data(ROWS, "Brandon")
+    db.save_data(ROWS[:1], "Winnipeg")
+    path = str(tmp_path / name)
+    manifest = export_archive(db, path, ["Brandon", "Winnipeg", "Empty"])
+    assert [entry["rows"] for entry in manifest["stations"]] == [4, 1, 0]
+
+    restored = DBOperations(str(tmp_path / "restored.db"))
+    try:
+        results = import_archive(restored, path)
+        assert results["Empty"] == {"inserted": 0, "updated": 0, "skipped": 0}
+        for location in ("Brandon", "Winnipeg"):
+            assert stored(restored, location) == stored(db, location)
+        assert restored.get_station("Brandon") == (10, "Brandon", "MB", 1890)
+        assert stored(restored, "Empty") == []
+    finally:
+        restored.close()
+
+
+@pytest.mark.parametrize("name", ["archive", "archive.npz"])
+def test_zero_row_location_loads_as_empty_columns(db, tmp_path, name):
+    path = str(tmp_path / name)
+    export_archive(db, path, ["Empty"])
+    _, stations = load_archive(path)
+    assert {column: len(values) for column, values in stations["Empty"].items()} == \
+        {"day": 0, "min": 0, "max": 0, "mean": 0}
+
+
+@pytest.mark.parametrize("name", ["archive", "archive.npz"])
+def test_rows_deleted_during_export_are_left_out(db, tmp_path, monkeypatch, name):
+    db.save_data(ROWS, "Brandon")
+    db.save_data(ROWS, "Winnipeg")
+
+    def build_then_delete(db, locations=None):
+        manifest = build_manifest(db, locations)
+        with sqlite3.connect(db.db_name) as conn:
+            conn.execute("DELETE FROM weather_data WHERE location = 'Brandon' AND sample_date > '2020-01-02'")
+            conn.execute("DELETE FROM weather_data WHERE location = 'Winnipeg'")
+        return manifest
+
+    monkeypatch.setattr(weather_archive, "build_manifest", build_then_delete)
+    path = str(tmp_path / name)
+    manifest = export_archive(db, path, ["Brandon", "Winnipeg"])
+    assert [(entry["rows"], entry["last_date"]) for entry in manifest["stations"]] == [(2, "2020-01-02"), (0, None)]
+    restored = DBOperations(str(tmp_path / "restored.db"))
+    try:
+        import_archive(restored, path)
+        assert stored(restored, "Brandon") == stored(db, "Brandon")
+        assert stored(restored, "Winnipeg") == []
+    finally:
+        restored.close()
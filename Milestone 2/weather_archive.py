@@ -0,0 +1,311 @@
+"""Compact columnar export and import of the weather database.
+Every location's history is written as four columns (day, min, max, mean) in
+one of three formats, chosen by the path:
+
+archive/ (a directory; memory-mappable)
+    manifest.json        {"format": "weather-archive", "version": 1, "stations": [...]}
+                         with one entry per location: location, dir, rows, first_date,
+                         last_date and, for registered stations, station_id, province, first_year
+    <dir>/day.npy        int32, days since 1970-01-01, strictly increasing
+    <dir>/min.npy        float32 minimum temperatures, NaN where missing
+    <dir>/max.npy        float32 maximum temperatures, NaN where missing
+    <dir>/mean.npy       float32 mean temperatures, NaN where missing
+    Plain .npy files, so np.load(..., mmap_mode="r") maps them without reading or copying.
+
+archive.npz (a single compressed file for moving data between machines)
+    manifest             0-d string array holding the manifest JSON
+    s<i>_day0            int64 first day of location i (days since 1970-01-01)
+    s<i>_gaps            int32 day deltas between consecutive rows (delta-encoded dates)
+    s<i>_min, s<i>_max, s<i>_mean    float32 columns as above
+
+archive.parquet (when pyarrow is installed)
+    Columns location, date (date32), min_temp, max_temp, avg_temp (float32, null where
+    missing); the manifest is stored in the schema metadata under b"weather_archive".
+
+Temperatures are published with one decimal. float32 keeps about seven significant
+digits, so on import every value is rounded back to four decimals, which restores
+the stored temperatures exactly.
+"""
+import json
+import os
+import re
+import zipfile
+import numpy as np
+import metrics
+
+FORMAT_NAME = "weather-archive"
+FORMAT_VERSION = 1
+COLUMNS = ("min", "max", "mean")
+
+
+def archive_kind(path):
+    """
+    :return: "npz", "parquet" or "dir", from the path's extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return {".npz": "npz", ".parquet": "parquet"}.get(extension, "dir")
+
+
+def station_dir(location):
+    """
+    :return: File system friendly directory name for a location, e.g. "Winnipeg" or "Thunder_Bay".
+    """
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", location).strip("_") or "location"
+
+
+def _batch_columns(records):
+    """
+    Converts a batch of fetch_data records into (day, min, max, mean) arrays.
+    """
+    _, dates, _, min_temp, max_temp, mean_temp = zip(*records)
+    days = np.array(dates, dtype="datetime64[D]").astype(np.int32)
+    return (days, *(np.array(values, dtype=np.float64).astype(np.float32)
+                    for values in (min_temp, max_temp, mean_temp)))
+
+
+def iter_station_batches(db, location, batch_size=10000):
+    """
+    Streams a location's history as column batches, without loading it whole.
+    :return: Generator of (day, min, max, mean) array tuples.
+    """
+    batch = []
+    for record in db.iter_records(location, batch_size):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield _batch_columns(batch)
+            batch = []
+    if batch:
+        yield _batch_columns(batch)
+
+
+def build_manifest(db, locations=None):
+    """
+    Describes the archive of some locations before any data is written.
+    :param locations: Locations to include (defaults to every location with data).
+    :return: Manifest dictionary.
+    """
+    extents = {location: (rows, first, last) for location, rows, first, last in db.fetch_location_extents()}
+    stations = []
+    for index, location in enumerate(extents if locations is None else locations):
+        rows, first_date, last_date = extents.get(location, (0, None, None))
+        entry = {"location": location, "dir": f"{index:03d}_{station_dir(location)}",
+                 "rows": rows, "first_date": first_date, "last_date": last_date}
+        station = db.get_station(location)
+        if station:
+            entry.update(station_id=station[0], province=station[2], first_year=station[3])
+        stations.append(entry)
+    return {"format": FORMAT_NAME, "version": FORMAT_VERSION, "stations": stations}
+
+
+@metrics.timed("archive_export")
+def export_archive(db, path, locations=None, batch_size=10000):
+    """
+    Exports locations' histories to an archive; the format follows the path (see the module docstring).
+    Directory and Parquet archives are written one batch of records at a time, so their memory use does
+    not grow with the archive; a .npz archive holds one location's columns (about 1.5 MB per century
+    of daily rows) in memory at a time.
+    :param db: DBOperations instance to read from.
+    :param path: Archive directory, .npz file or .parquet file.
+    :param locations: Locations to export (defaults to every location with data).
+    :param batch_size: Records read per query.
+    :return: The manifest dictionary.
+    """
+    writer = {"dir": _export_dir, "npz": _export_npz, "parquet": _export_parquet}[archive_kind(path)]
+    manifest = build_manifest(db, locations)
+    writer(db, path, manifest, batch_size)
+    return manifest
+
+
+def _export_dir(db, path, manifest, batch_size):
+    os.makedirs(path, exist_ok=True)
+    for entry in manifest["stations"]:
+        rows = entry["rows"]
+        folder = os.path.join(path, entry["dir"])
+        os.makedirs(folder, exist_ok=True)
+        files = {name: np.lib.format.open_memmap(os.path.join(folder, f"{name}.npy"), "w+", dtype, (rows,))
+                 for name, dtype in (("day", np.int32), *((column, np.float32) for column in COLUMNS))}
+        offset = 0
+        for batch in iter_station_batches(db, entry["location"], batch_size):
+            # Rows stored after the manifest was built are left for the next export
+            count = min(len(batch[0]), rows - offset)
+            for name, values in zip(("day", *COLUMNS), batch):
+                files[name][offset:offset + count] = values[:count]
+            offset += count
+        for name, array in files.items():
+            array.flush()
+            if offset < rows:
+                # Rows deleted since the manifest was built: drop the unwritten tail rather than
+                # leave zero-filled rows, which would import as 1970-01-01 records
+                files[name] = _truncate_npy(os.path.join(folder, f"{name}.npy"), array, offset)
+        _record_extent(entry, files["day"])
+    # Written last, so an interrupted export is never mistaken for a complete archive
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+
+def _truncate_npy(file_path, array, rows):
+    """
+    Replaces a memory-mapped .npy file with its first rows, copying through the mapping.
+    :return: The truncated array (memory-mapped).
+    """
+    tmp_path = f"{file_path}.tmp"
+    truncated = np.lib.format.open_memmap(tmp_path, "w+", array.dtype, (rows,))
+    truncated[:] = array[:rows]
+    truncated.flush()
+    os.replace(tmp_path, file_path)
+    return truncated
+
+
+def _record_extent(entry, days):
+    """
+    Sets a manifest entry's rows and dates to the rows actually written.
+    """
+    entry["rows"] = len(days)
+    if len(days):
+        entry["first_date"], entry["last_date"] = (str(np.datetime64(int(day), "D")) for day in (days[0], days[-1]))
+    else:
+        entry["first_date"] = entry["last_date"] = None
+
+
+def _collect(db, location, batch_size, rows):
+    batches = list(iter_station_batches(db, location, batch_size))
+    if not batches:
+        return np.array([], dtype=np.int32), *(np.array([], dtype=np.float32) for _ in COLUMNS)
+    # Rows stored after the manifest was built are left for the next export, as in _export_dir
+    return tuple(np.concatenate(parts)[:rows] for parts in zip(*batches))
+
+
+def _export_npz(db, path, manifest, batch_size):
+    # The members np.savez_compressed would write, added one location at a time, so memory
+    # holds a single location's columns rather than the arrays of every location
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+        for index, entry in enumerate(manifest["stations"]):
+            days, min_temp, max_temp, mean_temp = _collect(db, entry["location"], batch_size, entry["rows"])
+            _record_extent(entry, days)
+            members = {"day0": np.int64(days[0] if len(days) else 0), "gaps": np.diff(days).astype(np.int32),
+                       "min": min_temp, "max": max_temp, "mean": mean_temp}
+            for name, values in members.items():
+                _write_member(archive, f"s{index}_{name}", values)
+        _write_member(archive, "manifest", np.array(json.dumps(manifest)))
+
+
+def _write_member(archive, name, values):
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+        np.lib.format.write_array(member, np.asanyarray(values), allow_pickle=False)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Parquet archives need pyarrow; use a .npz file or a directory instead") from error
+    return pyarrow
+
+
+def _export_parquet(db, path, manifest, batch_size):
+    pa = _require_pyarrow()
+    schema = pa.schema([("location", pa.string()), ("date", pa.date32()), ("min_temp", pa.float32()),
+                        ("max_temp", pa.float32()), ("avg_temp", pa.float32())],
+                       metadata={b"weather_archive": json.dumps(manifest).encode("utf-8")})
+    with pa.parquet.ParquetWriter(path, schema, compression="zstd") as writer:
+        for entry in manifest["stations"]:
+            for days, *temperatures in iter_station_batches(db, entry["location"], batch_size):
+                columns = [pa.array([entry["location"]] * len(days), pa.string()),
+                           pa.array(days, pa.int32()).cast(pa.date32())]
+                columns += [pa.array(values, pa.float32(), mask=np.isnan(values)) for values in temperatures]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+
+def load_archive(path, mmap=True):
+    """
+    Opens an archive and returns its columns.
+    Directory archives are memory-mapped (read-only) unless mmap is False, so loading costs
+    a few system calls whatever the archive size; .npz and .parquet archives are decompressed.
+    :param path: Archive directory, .npz file or .parquet file.
+    :return: (manifest, dictionary mapping location to a dict of "day", "min", "max" and "mean" arrays).
+    :raises ValueError: If the path is not a weather archive of a supported version.
+    """
+    kind = archive_kind(path)
+    if kind == "dir":
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        _check_manifest(manifest)
+        mode = "r" if mmap else None
+        return manifest, {
+            entry["location"]: {name: np.load(os.path.join(path, entry["dir"], f"{name}.npy"), mmap_mode=mode)
+                                for name in ("day", *COLUMNS)}
+            for entry in manifest["stations"]
+        }
+    if kind == "npz":
+        with np.load(path) as archive:
+            manifest = json.loads(str(archive["manifest"]))
+            _check_manifest(manifest)
+            stations = {}
+            for index, entry in enumerate(manifest["stations"]):
+                gaps = archive[f"s{index}_gaps"]
+                days = np.empty(len(gaps) + 1 if entry["rows"] else 0, dtype=np.int32)
+                if entry["rows"]:
+                    days[0] = archive[f"s{index}_day0"]
+                    np.cumsum(gaps, out=days[1:])
+                    days[1:] += days[0]
+                stations[entry["location"]] = {"day": days, **{name: archive[f"s{index}_{name}"] for name in COLUMNS}}
+        return manifest, stations
+    pa = _require_pyarrow()
+    table = pa.parquet.read_table(path)
+    manifest = json.loads(table.schema.metadata[b"weather_archive"])
+    _check_manifest(manifest)
+    locations = table.column("location").to_numpy(zero_copy_only=False)
+    days = table.column("date").cast(pa.int32()).to_numpy()
+    temperatures = {name: table.column(column).to_numpy(zero_copy_only=False).astype(np.float32)
+                    for name, column in zip(COLUMNS, ("min_temp", "max_temp", "avg_temp"))}
+    stations = {}
+    for entry in manifest["stations"]:
+        mask = locations == entry["location"]
+        stations[entry["location"]] = {"day": days[mask], **{name: values[mask] for name, values in temperatures.items()}}
+    return manifest, stations
+
+
+def _check_manifest(manifest):
+    if manifest.get("format") != FORMAT_NAME or manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Not a supported weather archive (format {manifest.get('format')!r}, "
+                         f"version {manifest.get('version')!r})")
+
+
+def restore_column(values):
+    """
+    Converts a float32 column into Python floats (None where missing) as they were stored.
+    """
+    restored = np.round(values.astype(np.float64), 4).astype(object)
+    restored[np.isnan(values)] = None
+    return restored.tolist()
+
+
+def iter_archive_rows(columns):
+    """
+    Converts one location's archive columns into save_data rows with whole-column operations.
+    :param columns: Dict of "day", "min", "max" and "mean" arrays.
+    :return: Iterator of (sample_date, min_temp, max_temp, avg_temp) tuples.
+    """
+    dates = np.datetime_as_string(np.asarray(columns["day"]).astype("datetime64[D]")).tolist()
+    return zip(dates, *(restore_column(np.asarray(columns[name])) for name in COLUMNS))
+
+
+@metrics.timed("archive_import")
+def import_archive(db, path, on_conflict="update", chunk_size=5000):
+    """
+    Bulk-loads an archive into a database and registers its stations.
+    :param db: DBOperations instance to write to.
+    :param path: Archive directory, .npz file or .parquet file.
+    :param on_conflict: "update" to overwrite differing stored rows, "ignore" to keep them.
+    :param chunk_size: Rows written per transaction.
+    :return: Dictionary mapping location to its save_data summary.
+    """
+    manifest, stations = load_archive(path)
+    results = {}
+    for entry in manifest["stations"]:
+        if entry.get("station_id") is not None:
+            db.register_station(entry["station_id"], entry["location"], entry.get("province"), entry.get("first_year"))
+        results[entry["location"]] = db.save_data(iter_archive_rows(stations[entry["location"]]), entry["location"],
+                                                  on_conflict=on_conflict, chunk_size=chunk_size)
+    return results
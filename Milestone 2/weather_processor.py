@@ -8,162 +8,444 @@ Samson Fakiye
 This script fetches, stores, updates, and visualizes weather data for Winnipeg.
 It interacts with a database and provides functionality for downloading historical 
 data, updating records, and generating visualizations.
+
+Run without arguments for the interactive menu, or with a subcommand for scripted use:
+    python weather_processor.py download --end-year 1996 --end-month 1
+    python weather_processor.py update
+    python weather_processor.py view --location Winnipeg --from 2024-01-01 --pages 2
+    python weather_processor.py boxplot --start-year 1996 --end-year 2024 --output box.png
+    python weather_processor.py lineplot --year 2024 --month 1 --output line.png
+    python weather_processor.py analyze --start-year 2015 --base-start 1997 --base-end 2020 --output anomalies.png
+    python weather_processor.py summary --start-year 2000 --monthly
+    python weather_processor.py export archive.npz   # or a directory, or a .parquet file
+    python weather_processor.py import archive.npz
+
+Only the standard library and the database layer are imported at startup; the
+scraper (requests), NumPy, Matplotlib and tabulate are imported by the commands
+that use them, so e.g. "update" never pays for loading Matplotlib.
 """
-from datetime import datetime,date,timedelta
+import argparse
+from datetime import datetime
 import logging
 import os
-from tabulate import tabulate  # For tabular data display
-from db_operations import DBOperations
-from scrape_weather import WeatherScraper
-from plot_operations import PlotOperations
+import sys
+import metrics
+from db_operations import DBOperations, DB_PATH, UPDATE_LOCK
 
-# Set up logging configuration in the current directory
 # Set up logging configuration in the script's directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(script_dir, "weather_process.log")
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+PAGE_CACHE_DIR = os.path.join(script_dir, "page_cache")
+
+
+def configure_logging(log_file=LOG_FILE):
+    """Sends log records to the log file; called by main() rather than at import time."""
+    logging.basicConfig(filename=log_file, level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
 
 class WeatherProcessor:
     """Handles fetching, storing, updating, and visualizing weather data."""
-    def __init__(self):
-        """Initializes WeatherProcessor with database, scraper, and plotter."""
-        url = "https://climate.weather.gc.ca/climate_data/daily_data_e.html"
-        self.db = DBOperations("weather.db")
-        self.scraper = WeatherScraper(base_url=url)
-        self.plotter = PlotOperations()
-
-    def download_full_weather_data(self):
-        """Downloads and stores historical weather data from 1997 onwards."""
+    def __init__(self, db_name=DB_PATH, base_url=None, archive=None):
+        """
+        Initializes WeatherProcessor; the database, scraper and plotter are opened on first use.
+        :param db_name: Database file (defaults to weather.db next to the scripts, shared with the scheduler).
+        :param base_url: Daily data page of the climate site (defaults to scrape_weather.BASE_URL).
+        :param archive: Optional directory archive (weather_archive) the viewer and plots read from
+        instead of the database, through a read-only memory mapping.
+        """
+        self.db_name = db_name
+        self._db = None
+        self.archive = archive
+        self._source = None
+        self.base_url = base_url
+        self._scraper = None
+        self._plotter = None
+        self.series = {}  # Loaded WeatherSeries per location, dropped whenever the data changes
+
+    @property
+    def db(self):
+        """DBOperations instance, opened on first use."""
+        if self._db is None:
+            self._db = DBOperations(self.db_name)
+        return self._db
+
+    @property
+    def source(self):
+        """Where the viewer and plots read from: the archive reader when an archive is given, else the database."""
+        if self._source is None:
+            if self.archive:
+                from archive_reader import ArchiveReader
+                self._source = ArchiveReader(self.archive)
+            else:
+                self._source = self.db
+        return self._source
+
+    def close(self):
+        """Closes the database connections and archive mappings that were opened."""
+        if self._db is not None:
+            self._db.close()
+        if self._source is not None and self._source is not self._db:
+            self._source.close()
+
+    @property
+    def scraper(self):
+        """WeatherScraper with the on-disk page cache, imported and created on first use."""
+        if self._scraper is None:
+            from page_cache import PageCache
+            from scrape_weather import WeatherScraper, BASE_URL
+            self._scraper = WeatherScraper(base_url=self.base_url or BASE_URL, cache=PageCache(PAGE_CACHE_DIR))
+        return self._scraper
+
+    @property
+    def plotter(self):
+        """PlotOperations instance; importing it loads Matplotlib, so it is created on first use."""
+        if self._plotter is None:
+            from plot_operations import PlotOperations
+            self._plotter = PlotOperations()
+        return self._plotter
+
+    def get_series(self, location):
+        """Returns the location's history as a WeatherSeries, loading it from the database once per session."""
+        if location not in self.series:
+            from weather_series import WeatherSeries
+            self.series[location] = WeatherSeries.from_db(self.source, location)
+        return self.series[location]
+
+    def prompt_location(self):
+        """Asks for a location, listing the registered stations."""
+        locations = [station[1] for station in self.source.get_stations()]
+        return input(f"Enter the location ({', '.join(locations)}; default: Winnipeg): ") or "Winnipeg"
+
+    def download_full_weather_data(self, end_year=None, end_month=None, restart=False, pipeline="threads",
+                                   parse_processes=None, location="Winnipeg", station_id=None):
+        """
+        Downloads and stores historical weather data from the current month back to an end month.
+        Every month is stored and checkpointed as it arrives; an interrupted download resumes
+        where it stopped the next time it is run, retrying only the months that failed.
+        :param end_year: Oldest year to download (prompted for when None).
+        :param end_month: Oldest month of end_year to download (prompted for when None).
+        :param restart: Ignore the checkpoints of earlier downloads and fetch every month again.
+        :param pipeline: "threads" or "async" (see Backfill.run).
+        :param parse_processes: Worker processes parsing pages in the async pipeline (None parses on threads).
+        :param location: Location to download; its station is taken from the station registry.
+        :param station_id: Climate station ID to register for the location first (needed for a new location).
+        :return: True if every month was stored, False otherwise.
+        """
         try:
             print("Downloading data...")
             current_date = datetime.today()
             current_year = current_date.year
             current_month = current_date.month
-            end_year= int(input( 'Enter weather data end year: '))
-            end_month= int(input( 'Enter weather data end month: '))
-            weather_data = self.scraper.fetch_weather_data(current_year, current_month, end_year=end_year,end_month=end_month)
-            self.db.save_data(weather_data)
-            print("Weather data successfully downloaded and stored.")
+            if end_year is None:
+                end_year= int(input( 'Enter weather data end year: '))
+            if end_month is None:
+                end_month= int(input( 'Enter weather data end month: '))
+            from backfill import Backfill
+            station = self.db.get_station(location)
+            if station_id is not None and (station is None or station[0] != station_id):
+                self.db.register_station(station_id, location)
+                station = self.db.get_station(location)
+            if station is None:
+                print(f"No station is registered for {location}; give its climate station ID to register it.")
+                return False
+            scraper = self.scraper.for_station(station[0])
+            if restart:
+                self.db.clear_backfill(location)
+            job = Backfill(self.db, scraper, location, parse_processes=parse_processes)
+            pending = len(job.plan(current_year, current_month, end_year, end_month))
+            print(f"{pending} months to download (completed months of earlier runs are skipped).")
+
+            # The async pipeline upserts months in batches, so it reports rows stored per month
+            unit = "rows stored" if pipeline == "async" else "new or revised rows"
+
+            def report(key, saved):
+                status = "failed, will be retried next run" if saved is None else f"{saved} {unit}"
+                print(f"  {key[0]}-{key[1]:02d}: {status}")
+
+            summary = job.run(current_year, current_month, end_year, end_month, progress=report, pipeline=pipeline)
+            self.series.clear()
+            logging.info("Full download of %s: %s; page cache stats: %s", location, summary,
+                         self.scraper.cache.stats())
+            print(f"Stored {summary['done']} months ({summary['inserted']} inserted, {summary['updated']} updated, "
+                  f"{summary['skipped']} unchanged).")
+            if summary["interrupted"] or summary["failed"]:
+                print(f"{summary['remaining']} months are still missing; run the download again to resume.")
+                return False
+            return True
         except Exception as error:
             logging.error("Error downloading full weather data: %s", error)
-            
+            return False
+
     def get_latest_date_from_db(self):
+        """Returns the latest stored date (the sync high-water mark), or None if the database is empty."""
         try:
-            data = self.db.fetch_data()
-            logging.info("Fetched %d records from DB.", len(data))
-            if not data:
+            latest_date = self.db.get_high_water_mark()
+            if latest_date is None:
                 return None
-            latest_date = max(record[1] for record in data if record[1])
             return datetime.strptime(latest_date, "%Y-%m-%d").date()
         except Exception as error:
             logging.error("Error retrieving latest date from database: %s", error, exc_info=True)
             return None
-        
-    def update_weather_data(self):
-        """Updates the weather data in the database if new data is available."""
+
+    def update_weather_data(self, end_year=None, end_month=None):
+        """
+        Scrapes only the months missing since the last sync of every registered station and upserts them.
+        Holds the update lock while it runs, so it never overlaps a scheduler run or another session's update.
+        :param end_year: End year passed on to a full download when the database is empty.
+        :param end_month: End month passed on to a full download when the database is empty.
+        :return: True if every station was updated, False otherwise (also when another update is running).
+        """
+        with self.db.hold_lock(UPDATE_LOCK) as acquired:
+            if not acquired:
+                print("Another update (the scheduler or another session) is running; try again later.")
+                logging.info("Update skipped: another update holds the lock.")
+                return False
+            return self._update_weather_data(end_year, end_month)
+
+    def _update_weather_data(self, end_year, end_month):
+        """Runs update_weather_data once the update lock is held."""
         try:
-            today = datetime.today().date()
             latest_date = self.get_latest_date_from_db()
-            print (today)
-            print(latest_date)
-
             if latest_date is None:
                 print("No data found in database. Downloading full dataset...")
-                self.download_full_weather_data()
-                return
-
-            if latest_date >= today:
-                print("Database is already up to date.")
-                return
+                return self.download_full_weather_data(end_year, end_month)
 
-            print(f"Updating data from {latest_date + timedelta(days=1)} to {today}...")
-
-            start = latest_date + timedelta(days=1)
-            end = today
-
-            all_new_data = []
-
-            current = start.replace(day=1)
-            last = end.replace(day=1)
-
-            while current <= last:
-                year, month = current.year, current.month
-                print(f"Fetching data for {year}-{month:02d}...")
-                monthly_data = self.scraper.fetch_weather_data(year, month, end_year=year,end_month=month)
-
-                # Filter only needed dates
-                filtered = [
-                    row for row in monthly_data
-                    if start <= datetime.strptime(row[1], "%Y-%m-%d").date() <= end
-                ]
-                all_new_data.extend(filtered)
-
-                # Move to next month
-                next_month = current.replace(day=28) + timedelta(days=4)
-                current = next_month.replace(day=1)
-
-            if all_new_data:
-                self.db.save_data(all_new_data)
-                print(f"Database updated with {len(all_new_data)} new records!")
-            else:
-                print("No new records found.")
+            from sync_engine import pipelined_sync
+            print(f"Latest stored date: {latest_date}. Checking for new data...")
+            results = pipelined_sync(self.db, self.scraper)
+            self.series.clear()
+            succeeded = True
+            for location, summary in results.items():
+                if summary is None:
+                    print(f"{location}: no data yet and no first year registered, skipped.")
+                    continue
+                if isinstance(summary, Exception):
+                    print(f"{location}: update failed: {summary}")
+                    logging.error("Error updating %s: %s", location, summary)
+                    succeeded = False
+                    continue
+                months = ", ".join(f"{year}-{month:02d}" for year, month in summary["months"])
+                logging.info("Incremental update of %s (%s): %s", location, months, summary)
+                if summary["inserted"] or summary["updated"]:
+                    print(f"{location}: {summary['inserted']} new and {summary['updated']} revised records "
+                          f"from {months}.")
+                else:
+                    print(f"{location}: already up to date.")
+            return succeeded
 
         except Exception as error:
             logging.error("Error updating weather data: %s", error, exc_info=True)
+            return False
 
     def view_weather_data(self):
-        """Displays stored weather data in tabular format."""
+        """Displays stored weather data one page at a time, with navigation and CSV export."""
         try:
-            location = input("Enter location (default: Winnipeg): ") or "Winnipeg"
-            records = self.db.fetch_data(location)
-            if not records:
+            from data_viewer import WeatherPager, export_csv
+            location = self.prompt_location()
+            pager = WeatherPager(self.source, location)
+            if not pager.first():
                 print("No weather data available.")
                 return
-            headers = ["ID", "Date", "Location", "Max Temp", "Min Temp", "Mean Temp"]
-            print(tabulate(records, headers=headers, tablefmt="grid"))
+            while True:
+                print(pager.render())
+                command = input("[n]ext, [p]revious, [j]ump to date, [e]xport CSV, [q]uit: ").strip().lower()
+                if command in ("n", ""):
+                    pager.next()
+                elif command == "p":
+                    pager.previous()
+                elif command == "j":
+                    while True:
+                        target = input("Enter the date (YYYY-MM-DD, empty to cancel): ").strip()
+                        if not target:
+                            break
+                        try:
+                            pager.jump_to(target)
+                            break
+                        except ValueError:
+                            print(f"Invalid date: {target}. Please use the YYYY-MM-DD format.")
+                elif command == "e":
+                    path = input("Enter the CSV file name: ").strip() or f"{location}.csv"
+                    print(f"Exported {export_csv(self.source, path, location)} records to {path}.")
+                elif command == "q":
+                    break
         except Exception as error:
             logging.error("Error displaying weather data: %s", error)
-            
-    def generate_boxplot(self):
-        """Generates a box plot of weather trends over selected years."""
+
+    def print_weather_data(self, location="Winnipeg", start_date=None, pages=1, page_size=30):
+        """
+        Prints pages of stored weather data without prompting.
+        :param location: Location to show.
+        :param start_date: First date to show ("YYYY-MM-DD"); defaults to the start of the history.
+        :param pages: Number of consecutive pages to print.
+        :param page_size: Number of records per page.
+        :return: True if any data was printed.
+        """
+        from data_viewer import WeatherPager
+        pager = WeatherPager(self.source, location, page_size)
+        page = pager.jump_to(start_date) if start_date else pager.first()
+        if not page:
+            print("No weather data available.")
+            return False
+        print(pager.render())
+        for _ in range(pages - 1):
+            last_date = pager.page[-1].sample_date
+            if pager.next()[-1].sample_date == last_date:
+                break
+            print(pager.render())
+        return True
+
+    def export_weather_data(self, path, location="Winnipeg"):
+        """
+        Writes a location's records to a CSV file.
+        :return: Number of records written.
+        """
+        from data_viewer import export_csv
+        count = export_csv(self.source, path, location)
+        print(f"Exported {count} records to {path}.")
+        return count
+
+    def export_archive(self, path, locations=None):
+        """
+        Exports stored data to a columnar archive (see weather_archive).
+        :return: True on success, False if the export failed.
+        """
+        try:
+            from weather_archive import export_archive
+            manifest = export_archive(self.db, path, locations)
+            rows = sum(entry["rows"] for entry in manifest["stations"])
+            print(f"Exported {rows} records of {len(manifest['stations'])} location(s) to {path}.")
+            return True
+        except Exception as error:
+            logging.error("Error exporting archive %s: %s", path, error, exc_info=True)
+            return False
+
+    def import_archive(self, path, on_conflict="update"):
+        """
+        Bulk-loads a columnar archive written by export_archive.
+        :return: True on success, False if the import failed.
+        """
+        try:
+            from weather_archive import import_archive
+            for location, summary in import_archive(self.db, path, on_conflict).items():
+                print(f"{location}: {summary['inserted']} inserted, {summary['updated']} updated, "
+                      f"{summary['skipped']} unchanged.")
+            self.series.clear()
+            return True
+        except Exception as error:
+            logging.error("Error importing archive %s: %s", path, error, exc_info=True)
+            return False
+
+    def generate_boxplot(self, start_year=None, end_year=None, location=None, output=None):
+        """
+        Generates a box plot of weather trends over selected years.
+        Parameters left as None are prompted for.
+        :param output: Optional file to save the plot to instead of showing it.
+        :return: True if the plot was drawn, False otherwise.
+        """
         try:
-            start_year = int(input("Enter the start year for box plot: "))
-            end_year = int(input("Enter the end year for box plot: "))
-            location = input("Enter the location (default: Winnipeg): ") or "Winnipeg"
-            weather_data = {month: [] for month in range(1, 13)}
-            records = self.db.fetch_data(location)
-            for record in records:
-                date = record[1]
-                mean_temp = record[5]
-                year, month, _ = map(int, date.split('-'))
-                if start_year <= year <= end_year:
-                    weather_data[month].append(mean_temp)
-            self.plotter.plot_boxplot(weather_data)
+            if start_year is None:
+                start_year = int(input("Enter the start year for box plot: "))
+            if end_year is None:
+                end_year = int(input("Enter the end year for box plot: "))
+            location = location or self.prompt_location()
+            month_sketches = self.source.fetch_month_distributions(location, start_year, end_year)
+            if not any(month_sketches.values()):
+                print("No data available for the selected years.")
+                return False
+            self.plotter.plot_boxplot_summary(month_sketches, output=output)
+            return True
         except Exception as error:
             logging.error("Error generating box plot: %s", error)
+            return False
 
-    def generate_lineplot(self):
-        """Generates a line plot for daily temperatures of a selected month."""
+    def generate_lineplot(self, year=None, month=None, location=None, output=None):
+        """
+        Generates a line plot for daily temperatures of a selected month.
+        Parameters left as None are prompted for.
+        :param output: Optional file to save the plot to instead of showing it.
+        :return: True if the plot was drawn, False otherwise.
+        """
         try:
-            year = int(input("Enter the year for the line plot: "))
-            month = int(input("Enter the month (1-12) for the line plot: "))
-            location = input("Enter the location (default: Winnipeg): ") or "Winnipeg"
-            days, temperatures = [], []
-            records = self.db.fetch_data(location)
-            for record in records:
-                date = record[1]
-                mean_temp = record[5]
-                rec_year, rec_month, day = map(int, date.split('-'))
-                if rec_year == year and rec_month == month:
-                    days.append(day)
-                    temperatures.append(mean_temp)
-            if days and temperatures:
-                self.plotter.plot_lineplot(days, temperatures, month, year)
-            else:
-                print("No data available for the selected month and year.")
+            import numpy as np
+            if year is None:
+                year = int(input("Enter the year for the line plot: "))
+            if month is None:
+                month = int(input("Enter the month (1-12) for the line plot: "))
+            location = location or self.prompt_location()
+            month_series = self.get_series(location).month(year, month)
+            present = ~np.isnan(month_series.mean_temp)
+            days, temperatures = month_series.days[present], month_series.mean_temp[present]
+            if len(days):
+                self.plotter.plot_lineplot(days, temperatures, month, year, output=output)
+                return True
+            print("No data available for the selected month and year.")
         except Exception as error:
             logging.error("Error generating line plot: %s", error)
+        return False
+
+    def analyze_weather_data(self, location=None, start_year=None, end_year=None, base_start=1991, base_end=2020,
+                             base_temp=18.0, output=None):
+        """
+        Prints a yearly climate report (mean, anomaly against the daily normals, heating and
+        cooling degree days, calendar-day records held) and optionally plots the anomalies.
+        Normals and records are computed over the full history; start_year and end_year only
+        limit the years shown.
+        :param base_start: First year of the normals' base period.
+        :param base_end: Last year of the normals' base period.
+        :param base_temp: Base temperature of the degree days in °C.
+        :param output: Optional file to save an anomaly plot to (with a 365-day rolling mean).
+        :return: True if a report was printed, False otherwise.
+        """
+        try:
+            import climate_analytics
+            from tabulate import tabulate
+            location = location or self.prompt_location()
+            series = self.get_series(location)
+            rows = [row for row in climate_analytics.yearly_report(series, base_start, base_end, base_temp)
+                    if (start_year is None or row[0] >= start_year) and (end_year is None or row[0] <= end_year)]
+            if not rows:
+                print("No data available for the selected years.")
+                return False
+            print(f"{location}: anomalies against the {base_start}-{base_end} daily normals, "
+                  f"degree days against {base_temp:g} °C")
+            print(tabulate(rows, headers=["Year", "Mean (°C)", "Anomaly (°C)", "HDD", "CDD",
+                                          "Record highs", "Record lows"], tablefmt="grid"))
+            if output:
+                selection = series.year_range(rows[0][0], rows[-1][0])
+                daily = climate_analytics.anomalies(selection, climate_analytics.daily_normals(series, base_start, base_end))
+                periods, monthly = climate_analytics.period_means(selection.dates, daily, "M")
+                rolling = climate_analytics.rolling_mean(selection, 365, values=daily)
+                self.plotter.plot_anomalies(periods, monthly, selection.dates, rolling, output=output,
+                                            title=f"{location} Temperature Anomaly ({base_start}-{base_end} normals)")
+            return True
+        except Exception as error:
+            logging.error("Error analyzing weather data: %s", error)
+            return False
+
+    def summarize_weather_data(self, location="Winnipeg", start_year=None, end_year=None, monthly=False):
+        """
+        Prints yearly (or monthly) temperature statistics read from the rollup tables,
+        a few hundred rows however long the history is. Always reads the database.
+        :param start_year: First year to show (default: all).
+        :param end_year: Last year to show (default: all).
+        :param monthly: Show one row per month instead of per year.
+        :return: True if any statistics were printed.
+        """
+        from tabulate import tabulate
+        first, last = start_year or 0, end_year or 9999
+        if monthly:
+            rows = self.db.fetch_monthly_summary(location, first, last)
+            headers = ["Year", "Month"]
+        else:
+            rows = self.db.fetch_yearly_summary(location, first, last)
+            headers = ["Year"]
+        if not rows:
+            print("No data available for the selected years.")
+            return False
+        print(tabulate(rows, headers=[*headers, "Days", "Mean (°C)", "Std dev", "Lowest mean", "Highest mean",
+                                      "Lowest min", "Highest max"], tablefmt="grid", floatfmt=".1f"))
+        return True
 
     def menu(self):
         """Displays the main menu and handles user input."""
@@ -174,10 +456,11 @@ class WeatherProcessor:
             print("3. View weather data")
             print("4. Generate box plot (Yearly trends)")
             print("5. Generate line plot (Daily temperatures)")
-            print("6. Exit")
+            print("6. Climate report (Anomalies, degree days, records)")
+            print("7. Exit")
             choice = input("Enter your choice: ")
             if choice == "1":
-                self.download_full_weather_data()
+                self.download_full_weather_data(location=self.prompt_location())
             elif choice == "2":
                 self.update_weather_data()
             elif choice == "3":
@@ -187,11 +470,156 @@ class WeatherProcessor:
             elif choice == "5":
                 self.generate_lineplot()
             elif choice == "6":
+                self.analyze_weather_data()
+            elif choice == "7":
                 print("Exiting program...")
                 break
             else:
                 print("Invalid choice. Please try again.")
 
+
+def build_parser():
+    """
+    Builds the command line parser; one subcommand per menu entry.
+    :return: argparse.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(description="Download, update, view and plot Winnipeg weather data. "
+                                                 "Starts the interactive menu when no command is given.")
+    parser.add_argument("--db", default=DB_PATH, help="Database file (default: weather.db next to this script)")
+    parser.add_argument("--base-url", default=None, help="Daily data page of the climate site")
+    parser.add_argument("--archive", default=None,
+                        help="Read view/boxplot/lineplot/analyze data from this memory-mapped archive directory")
+    parser.add_argument("--log-file", default=LOG_FILE, help="Log file (default: weather_process.log next to this script)")
+    parser.add_argument("--metrics", default=None, help="Write the run's timings and counters to this JSON file")
+    parser.add_argument("--prometheus", default=None, help="Write the run's metrics to this Prometheus text file")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    download = commands.add_parser("download", help="Download the full history back to an end month")
+    download.add_argument("--end-year", type=int, default=1996, help="Oldest year to download (default: 1996)")
+    download.add_argument("--end-month", type=int, default=1, help="Oldest month of the end year (default: 1)")
+    download.add_argument("--restart", action="store_true", help="Ignore the checkpoints of an earlier download")
+    download.add_argument("--location", default="Winnipeg", help="Location to download (default: Winnipeg)")
+    download.add_argument("--station-id", type=int, default=None,
+                          help="Climate station ID of the location, registering it if it is new")
+    download.add_argument("--pipeline", choices=("threads", "async"), default="threads",
+                          help="threads: store month by month; async: overlap download, parse and "
+                               "batched storage (default: threads)")
+    download.add_argument("--parse-processes", type=int, default=None, metavar="N",
+                          help="Parse pages in N worker processes (with --pipeline async)")
+
+    update = commands.add_parser("update", help="Scrape the months missing since the last sync")
+    update.add_argument("--end-year", type=int, default=1996, help="End year of the full download if the database is empty")
+    update.add_argument("--end-month", type=int, default=1, help="End month of the full download if the database is empty")
+
+    view = commands.add_parser("view", help="Print stored records, or export them to CSV")
+    view.add_argument("--location", default="Winnipeg")
+    view.add_argument("--from", dest="start_date", default=None, help="First date to show (YYYY-MM-DD)")
+    view.add_argument("--pages", type=int, default=1, help="Number of pages to print (default: 1)")
+    view.add_argument("--page-size", type=int, default=30, help="Records per page (default: 30)")
+    view.add_argument("--csv", default=None, help="Export every record of the location to this CSV file instead")
+
+    boxplot = commands.add_parser("boxplot", help="Plot the monthly temperature distribution over a range of years")
+    boxplot.add_argument("--start-year", type=int, required=True)
+    boxplot.add_argument("--end-year", type=int, required=True)
+    boxplot.add_argument("--location", default="Winnipeg")
+    boxplot.add_argument("--output", default=None, help="Save to a PNG/SVG file instead of opening a window")
+
+    lineplot = commands.add_parser("lineplot", help="Plot the daily mean temperatures of a month")
+    lineplot.add_argument("--year", type=int, required=True)
+    lineplot.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="{1-12}")
+    lineplot.add_argument("--location", default="Winnipeg")
+    lineplot.add_argument("--output", default=None, help="Save to a PNG/SVG file instead of opening a window")
+
+    analyze = commands.add_parser("analyze", help="Print yearly anomalies, degree days and records")
+    analyze.add_argument("--location", default="Winnipeg")
+    analyze.add_argument("--start-year", type=int, default=None, help="First year to report (default: all)")
+    analyze.add_argument("--end-year", type=int, default=None, help="Last year to report (default: all)")
+    analyze.add_argument("--base-start", type=int, default=1991, help="First year of the normals (default: 1991)")
+    analyze.add_argument("--base-end", type=int, default=2020, help="Last year of the normals (default: 2020)")
+    analyze.add_argument("--base-temp", type=float, default=18.0, help="Degree-day base temperature (default: 18)")
+    analyze.add_argument("--output", default=None, help="Also save an anomaly plot to a PNG/SVG file")
+
+    summary = commands.add_parser("summary", help="Print yearly or monthly statistics from the rollup tables")
+    summary.add_argument("--location", default="Winnipeg")
+    summary.add_argument("--start-year", type=int, default=None, help="First year to show (default: all)")
+    summary.add_argument("--end-year", type=int, default=None, help="Last year to show (default: all)")
+    summary.add_argument("--monthly", action="store_true", help="One row per month instead of per year")
+
+    export = commands.add_parser("export", help="Write the stored data to a compact columnar archive")
+    export.add_argument("path", help="Archive directory (memory-mappable), .npz file or .parquet file")
+    export.add_argument("--location", action="append", dest="locations", default=None,
+                        help="Location to export (repeatable; default: all)")
+
+    load = commands.add_parser("import", help="Bulk-load an archive written by export")
+    load.add_argument("path", help="Archive directory, .npz file or .parquet file")
+    load.add_argument("--keep-existing", action="store_true", help="Do not overwrite rows that are already stored")
+    return parser
+
+
+def write_metrics(json_path=None, prometheus_path=None):
+    """
+    Logs the timings and counters collected during the run and writes them to the requested files.
+    """
+    summary = metrics.METRICS.summary()
+    timings = ", ".join(f"{name} {timer['total_seconds']:.2f}s/{timer['count']}"
+                        for name, timer in summary["timers"].items())
+    logging.info("Run metrics: %s; counters: %s", timings or "none", summary["counters"])
+    if json_path:
+        metrics.METRICS.write_json(json_path)
+    if prometheus_path:
+        metrics.METRICS.write_prometheus(prometheus_path)
+
+
+def main(argv=None):
+    """
+    Runs a subcommand, or the interactive menu when none is given.
+    :param argv: Argument list (defaults to sys.argv[1:]).
+    :return: Process exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "parse_processes", None) and args.pipeline != "async":
+        parser.error("--parse-processes requires --pipeline async")
+    configure_logging(args.log_file)
+    processor = WeatherProcessor(args.db, args.base_url, args.archive)
+    try:
+        if args.command is None:
+            processor.menu()
+            return 0
+        if getattr(args, "output", None):
+            # Files are rendered without a display; the backend must be chosen before pyplot is imported
+            import matplotlib
+            matplotlib.use("Agg")
+        if args.command == "download":
+            succeeded = processor.download_full_weather_data(args.end_year, args.end_month, args.restart,
+                                                             args.pipeline, args.parse_processes, args.location,
+                                                             args.station_id)
+        elif args.command == "update":
+            succeeded = processor.update_weather_data(args.end_year, args.end_month)
+        elif args.command == "view":
+            if args.csv:
+                processor.export_weather_data(args.csv, args.location)
+                succeeded = True
+            else:
+                succeeded = processor.print_weather_data(args.location, args.start_date, args.pages, args.page_size)
+        elif args.command == "boxplot":
+            succeeded = processor.generate_boxplot(args.start_year, args.end_year, args.location, args.output)
+        elif args.command == "lineplot":
+            succeeded = processor.generate_lineplot(args.year, args.month, args.location, args.output)
+        elif args.command == "analyze":
+            succeeded = processor.analyze_weather_data(args.location, args.start_year, args.end_year, args.base_start,
+                                                       args.base_end, args.base_temp, args.output)
+        elif args.command == "summary":
+            succeeded = processor.summarize_weather_data(args.location, args.start_year, args.end_year, args.monthly)
+        elif args.command == "export":
+            succeeded = processor.export_archive(args.path, args.locations)
+        else:
+            succeeded = processor.import_archive(args.path, "ignore" if args.keep_existing else "update")
+    finally:
+        processor.close()
+        write_metrics(args.metrics, args.prometheus)
+    return 0 if succeeded else 1
+
+
 if __name__ == "__main__":
-    PROCESSOR = WeatherProcessor()
-    PROCESSOR.menu()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Columnar in-memory time series of a location's daily temperatures.
+The history is loaded once into contiguous NumPy arrays (a datetime64[D] date
+array plus float32 min/max/mean arrays, NaN where a reading is missing), so
+selecting years or months and grouping by month are vectorized operations
+instead of per-row string splitting.
+"""
+import numpy as np
+from climate_analytics import period_means
+
+MONTHS = range(1, 13)
+
+
+class WeatherSeries:
+    """
+    Daily temperatures of one location, sorted by date.
+    Slicing methods return views that share memory with the parent series.
+    """
+
+    def __init__(self, dates, min_temp, max_temp, mean_temp, location=None):
+        """
+        :param dates: Sorted array-like of dates (datetime64[D] or ISO strings).
+        :param min_temp: Array-like of minimum temperatures (None/NaN for missing).
+        :param max_temp: Array-like of maximum temperatures.
+        :param mean_temp: Array-like of mean temperatures.
+        :param location: Location name the series belongs to.
+        """
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.min_temp = np.asarray(min_temp, dtype=np.float32)
+        self.max_temp = np.asarray(max_temp, dtype=np.float32)
+        self.mean_temp = np.asarray(mean_temp, dtype=np.float32)
+        self.location = location
+
+    @classmethod
+    def from_records(cls, records, location=None):
+        """
+        Builds a series from rows in the DBOperations.fetch_data layout
+        (id, sample_date, location, min_temp, max_temp, avg_temp), ordered by date.
+        """
+        if not records:
+            return cls([], [], [], [], location)
+        _, dates, _, min_temp, max_temp, mean_temp = zip(*records)
+        return cls(dates, np.array(min_temp, dtype=float), np.array(max_temp, dtype=float),
+                   np.array(mean_temp, dtype=float), location)
+
+    @classmethod
+    def from_db(cls, db, location="Winnipeg"):
+        """
+        Loads the full history of a location from a DBOperations instance (as an ObservationBatch,
+        without building a record per day), or from an ArchiveReader, whose mapped columns are used directly.
+        """
+        if hasattr(db, "series"):
+            return db.series(location)
+        if hasattr(db, "fetch_observations"):
+            return db.fetch_observations(location).to_series(location)
+        return cls.from_records(db.fetch_data(location), location)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _slice(self, start, stop):
+        return WeatherSeries(self.dates[start:stop], self.min_temp[start:stop], self.max_temp[start:stop],
+                             self.mean_temp[start:stop], self.location)
+
+    def column(self, name):
+        """
+        :param name: "min", "max" or "mean".
+        :return: The temperature array for that column.
+        """
+        return {"min": self.min_temp, "max": self.max_temp, "mean": self.mean_temp}[name]
+
+    @property
+    def years(self):
+        return self.dates.astype("datetime64[Y]").astype(np.int32) + 1970
+
+    @property
+    def months(self):
+        return self.dates.astype("datetime64[M]").astype(np.int32) % 12 + 1
+
+    @property
+    def days(self):
+        return (self.dates - self.dates.astype("datetime64[M]")).astype(np.int32) + 1
+
+    def between(self, start_date, end_date):
+        """
+        Selects the days between two dates (inclusive) with a binary search on the sorted dates.
+        :param start_date: First date (date, datetime64 or ISO string).
+        :param end_date: Last date.
+        :return: A WeatherSeries view.
+        """
+        start = np.searchsorted(self.dates, np.datetime64(start_date, "D"), side="left")
+        stop = np.searchsorted(self.dates, np.datetime64(end_date, "D"), side="right")
+        return self._slice(start, stop)
+
+    def year_range(self, start_year, end_year):
+        """
+        Selects whole years (inclusive).
+        :return: A WeatherSeries view.
+        """
+        return self.between(f"{start_year:04d}-01-01", f"{end_year:04d}-12-31")
+
+    def month(self, year, month):
+        """
+        Selects a single month.
+        :return: A WeatherSeries view.
+        """
+        first = np.datetime64(f"{year:04d}-{month:02d}", "M")
+        return self.between(first.astype("datetime64[D]"), (first + 1).astype("datetime64[D]") - 1)
+
+    def group_by_month(self, column="mean"):
+        """
+        Groups the values of a column by calendar month in one vectorized pass, dropping missing values.
+        :param column: "min", "max" or "mean".
+        :return: Dictionary mapping month number (1-12) to an array of values.
+        """
+        values = self.column(column)
+        months = self.months
+        present = ~np.isnan(values)
+        values, months = values[present], months[present]
+        order = np.argsort(months, kind="stable")
+        bounds = np.searchsorted(months[order], np.arange(1, 14))
+        grouped = values[order]
+        return {month: grouped[bounds[month - 1]:bounds[month]] for month in MONTHS}
+
+    def resample(self, freq="M", column="mean"):
+        """
+        Averages a column per calendar month or year, ignoring missing values.
+        :param freq: "M" for monthly or "Y" for yearly periods.
+        :param column: "min", "max" or "mean".
+        :return: (periods, means) arrays; periods are datetime64[M] or datetime64[Y],
+        means are NaN for periods without data.
+        """
+        return period_means(self.dates, self.column(column), freq)